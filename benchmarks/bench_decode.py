@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Decode Benchmark
+Simulator steps/second with and without the pre-decoded instruction cache.
+The "without" case is the simulator at BASELINE_COMMIT, read from git at
+runtime, so this needs a clone with history.
+
+Usage: python benchmarks/bench_decode.py [program.s] [--reps N]
+"""
+
+import contextlib
+import functools
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'sw-toolchain', 'asm'))
+sys.path.insert(0, os.path.join(ROOT, 'sw-toolchain', 'sim'))
+
+from assembler import FluxAssembler
+from simulator import FluxSimulator
+
+
+# The tree before the pre-decoded instruction cache: its simulator decodes
+# into a dict on every step and dispatches through an if/elif chain
+BASELINE_COMMIT = 'e35d405'
+BASELINE_PATH = 'sw-toolchain/sim/simulator.py'
+
+
+@functools.lru_cache(maxsize=None)
+def load_baseline():
+    """The simulator module as of BASELINE_COMMIT, read with git show
+
+    Raises:
+        RuntimeError: git or the commit is not available (e.g. outside a clone)
+    """
+    try:
+        source = subprocess.run(['git', 'show', f"{BASELINE_COMMIT}:{BASELINE_PATH}"], cwd=ROOT,
+                                check=True, capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f"Cannot read {BASELINE_PATH} at {BASELINE_COMMIT} from git: {e}") from None
+    spec = importlib.util.spec_from_loader('baseline_simulator', loader=None)
+    module = importlib.util.module_from_spec(spec)
+    exec(compile(source, f"{BASELINE_COMMIT}:{BASELINE_PATH}", 'exec'), module.__dict__)
+    return module
+
+
+def assemble(path):
+    """Assemble a .s file in-process and return its machine code"""
+    with open(path, 'r') as f:
+        source = f.read()
+    return FluxAssembler().assemble(source)
+
+
+def run_steps(sim, words, reps):
+    """Steps/second of sim.run() over words, reps times from PC 0"""
+    sim.instructions = list(words)
+    steps = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(reps):
+            sim.pc[0] = 0
+            sim.halted = False
+            before = sim.stats['instructions_executed']
+            sim.run(thread=0, max_steps=1 << 30)
+            steps += sim.stats['instructions_executed'] - before + sim.halted
+    return steps / (time.perf_counter() - start)
+
+
+def bench_decode_per_step(words, reps):
+    """Decode on every step: the simulator at BASELINE_COMMIT"""
+    return run_steps(load_baseline().FluxSimulator(), words, reps)
+
+
+def bench_predecoded(words, reps):
+    """Pre-decoded instruction cache (the current simulator)"""
+    return run_steps(FluxSimulator(), words, reps)
+
+
+def main():
+    args = sys.argv[1:]
+    reps = 5000
+    if '--reps' in args:
+        i = args.index('--reps')
+        reps = int(args[i + 1])
+        del args[i:i + 2]
+    program = args[0] if args else os.path.join(ROOT, 'sw-toolchain', 'examples', 'loop.s')
+
+    words = assemble(program)
+    print(f"{os.path.basename(program)}: {len(words)} instructions, {reps} runs")
+
+    before = bench_decode_per_step(words, reps)
+    after = bench_predecoded(words, reps)
+
+    print(f"  decode per step : {before:12,.0f} steps/s")
+    print(f"  pre-decoded     : {after:12,.0f} steps/s ({after / before:.1f}×)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Toolchain Benchmark Suite
+Throughput of the assembler, simulator, software rasterizer and firmware
+driver, saved as JSON and compared against a baseline
+
+Usage:
+    python benchmarks/suite.py run [--out results.json] [--quick] [--only GROUP,...]
+    python benchmarks/suite.py compare baseline.json results.json [--threshold 0.10]
+
+run writes benchmarks/results/latest.json unless --out is given. --only
+selects groups: asm, sim, load, decode, raster, firmware. compare prints the change
+of every benchmark and exits with status 1 if any rate dropped by more
+than the threshold (a fraction, default 0.10).
+
+Every benchmark reports a rate (higher is better). Each rate is the best
+of several timed runs, and each run repeats the work until it has taken
+at least min_time seconds.
+"""
+
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'sw-toolchain', 'asm'))
+sys.path.insert(0, os.path.join(ROOT, 'sw-toolchain', 'sim'))
+sys.path.insert(0, os.path.join(ROOT, 'examples'))
+sys.path.insert(0, os.path.join(ROOT, 'hw-tools', 'firmware'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from assembler import FluxAssembler
+from simulator import FluxSimulator
+
+RESULTS_VERSION = 1
+DEFAULT_OUT = os.path.join(ROOT, 'benchmarks', 'results', 'latest.json')
+EXAMPLES = ('vecadd', 'loop', 'dotprod', 'conditional')
+
+
+def measure(fn: Callable[[], int], min_time: float, repeats: int) -> float:
+    """Best rate (work per second) over repeats runs of fn
+
+    fn does one unit of the benchmark and returns the work it did (lines,
+    instructions, pixels, bytes). A run calls it until min_time has passed.
+    """
+    best = 0.0
+    for _ in range(repeats):
+        work = 0
+        start = time.perf_counter()
+        while True:
+            work += fn()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, work / elapsed)
+    return best
+
+
+# === Assembler ===
+
+def generate_source(lines: int) -> str:
+    """A large .s file: every instruction format, labels, branches, comments"""
+    body = [
+        "    LOAD R1, 0(R10)        # A",
+        "    LOAD R2, 16(R11)",
+        "    ADD R3, R1, R2",
+        "    SUB R4, R3, R1",
+        "    MUL R5, R4, R2",
+        "    DIV R6, R5, R3",
+        "    ADDI R7, R7, 1",
+        "    LI R8, 0x100",
+        "    STORE R6, 0(R12)",
+        "    BNE R7, R8, block{n}",
+        "",
+        "    # next block",
+    ]
+    out = []
+    n = 0
+    while len(out) < lines:
+        out.append(f"block{n}:")
+        out.extend(line.format(n=n) for line in body)
+        n += 1
+    out.append("    HALT")
+    return '\n'.join(out[:lines - 1] + out[-1:])
+
+
+def bench_assembler(min_time, repeats, lines=20000):
+    source = generate_source(lines)
+    count = source.count('\n') + 1
+
+    def once():
+        FluxAssembler().assemble(source)
+        return count
+
+    lines = source.split('\n')
+
+    def stream():
+        FluxAssembler().assemble_stream(lines)
+        return count
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        FluxAssembler().assemble_cached(source, cache_dir)
+
+        def cached():
+            FluxAssembler().assemble_cached(source, cache_dir)
+            return count
+
+        return {
+            'asm.lines': (measure(once, min_time, repeats), 'lines/s'),
+            'asm.stream': (measure(stream, min_time, repeats), 'lines/s'),
+            'asm.cached': (measure(cached, min_time, repeats), 'lines/s'),
+        }
+
+
+# === Simulator ===
+
+def load_example(name: str):
+    """Assemble examples/<name>.s and set up the vecadd-style inputs"""
+    with open(os.path.join(ROOT, 'sw-toolchain', 'examples', f"{name}.s"), 'r') as f:
+        words = FluxAssembler().assemble(f.read())
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = FluxSimulator()
+        sim.instructions = words
+        sim.init_memory(0x1000, [1.0, 2.0, 3.0, 4.0])
+        sim.init_memory(0x2000, [5.0, 6.0, 7.0, 8.0])
+    sim.write_reg(0, 10, [0x1000, 0, 0, 0])
+    sim.write_reg(0, 11, [0x2000, 0, 0, 0])
+    sim.write_reg(0, 12, [0x3000, 0, 0, 0])
+    return sim
+
+
+def bench_simulator(min_time, repeats):
+    results = {}
+    for name in EXAMPLES:
+        sim = load_example(name)
+        for mode, jit in (('interp', False), ('jit', True)):
+            def once(sim=sim, jit=jit):
+                sim.pc[0] = 0
+                sim.halted = False
+                before = sim.step
+                sim.run(thread=0, max_steps=1 << 20, jit=jit)
+                return sim.step - before
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                rate = measure(once, min_time, repeats)
+            results[f"sim.{name}.{mode}"] = (rate, 'instr/s')
+    return results
+
+
+def bench_loader(min_time, repeats, lines=20000):
+    """Program loading from .hex, .bin and .img files (the assembler benchmark's source)"""
+    assembler = FluxAssembler()
+    assembler.data = [[0x10000, bytearray(1 << 20)]]
+    words = assembler.assemble(generate_source(lines))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, 'kernel')
+        assembler.write_hex(words, base + '.hex')
+        assembler.write_binary(words, base + '.bin')
+        assembler.write_image(words, base + '.img')
+        for ext, method in (('hex', 'load_program'), ('bin', 'load_binary'), ('img', 'load_image')):
+            def once(ext=ext, method=method):
+                sim = FluxSimulator(num_threads=1, memory_size=0x10000 + (1 << 20))
+                getattr(sim, method)(f"{base}.{ext}")
+                return len(words)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                rate = measure(once, min_time, repeats)
+            results[f"load.{ext}"] = (rate, 'words/s')
+    return results
+
+
+def bench_decode(min_time, repeats):
+    """The baseline simulator's decode-on-every-step loop on loop.s (the
+    reference for sim.loop.interp); skipped without git history"""
+    import bench_decode
+
+    words = bench_decode.assemble(os.path.join(ROOT, 'sw-toolchain', 'examples', 'loop.s'))
+    try:
+        bench_decode.load_baseline()
+    except RuntimeError as e:
+        print(f"(decode skipped: {e})")
+        return {}
+    rate = max(bench_decode.bench_decode_per_step(words, 200) for _ in range(repeats))
+    return {'decode.loop.per_step': (rate, 'instr/s')}
+
+
+# === Rasterizer ===
+
+TRIANGLES = (
+    ((10, 10), (630, 40), (320, 470)),     # large
+    ((100, 300), (200, 100), (300, 300)),  # medium
+    ((500, 400), (520, 420), (480, 430)),  # small
+)
+
+
+def bench_rasterizer(min_time, repeats):
+    from math_demo import Framebuffer, rasterize_triangle
+
+    fb = Framebuffer(640, 480)
+
+    def once():
+        tested = 0
+        for color, (v0, v1, v2) in enumerate(TRIANGLES, 1):
+            tested += rasterize_triangle(fb, v0, v1, v2, color)[0]
+        return tested
+
+    return {'raster.pixels': (measure(once, min_time, repeats), 'pixels/s')}
+
+
+# === Firmware driver ===
+
+def bench_firmware(min_time, repeats, floats=4096):
+    from firmware_driver import FluxGPU
+    from loopback import LoopbackPort
+
+    port = LoopbackPort()
+    with contextlib.redirect_stdout(io.StringIO()):
+        gpu = FluxGPU(interface='uart', port=port)
+    data = [float(i) for i in range(floats)]
+    program = [0x002081B3] * 1024
+
+    def once():
+        before = port.bytes_written + port.bytes_read
+        gpu._send_program(program)
+        gpu.write_memory(0x1000, data)
+        result = gpu.read_memory(0x1000, floats)
+        assert result == data, "loopback read back different data"
+        return port.bytes_written + port.bytes_read - before
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        rate = measure(once, min_time, repeats)
+    return {'firmware.bytes': (rate, 'bytes/s')}
+
+
+# Benchmark groups; result names start with the group name
+BENCHMARKS = {
+    'asm': bench_assembler,
+    'sim': bench_simulator,
+    'load': bench_loader,
+    'decode': bench_decode,
+    'raster': bench_rasterizer,
+    'firmware': bench_firmware,
+}
+
+
+def run(only: str = None, quick: bool = False) -> Dict:
+    """Run the suite; returns the JSON-ready results document
+
+    Args:
+        only: Comma-separated groups to run (default: all)
+        quick: Single short runs (smoke test, noisy)
+    """
+    groups = only.split(',') if only else list(BENCHMARKS)
+    unknown = set(groups) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmark group(s): {', '.join(sorted(unknown))}")
+    min_time, repeats = (0.05, 1) if quick else (0.3, 3)
+    results = {}
+    for group in groups:
+        for name, (value, unit) in BENCHMARKS[group](min_time, repeats).items():
+            results[name] = {'value': value, 'unit': unit}
+            print(f"{name:<28} {value:16,.0f} {unit}")
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': quick,
+        'results': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.10):
+    """Print per-benchmark changes; returns the names that regressed"""
+    regressions = []
+    print(f"{'Benchmark':<28} {'Baseline':>14} {'Current':>14}  Change")
+    for name in sorted(set(baseline['results']) | set(current['results'])):
+        old = baseline['results'].get(name)
+        new = current['results'].get(name)
+        if old is None or new is None:
+            missing = 'baseline' if old is None else 'current'
+            print(f"{name:<28} (not in {missing})")
+            continue
+        change = new['value'] / old['value'] - 1.0 if old['value'] else 0.0
+        flag = ''
+        if change < -threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<28} {old['value']:14,.0f} {new['value']:14,.0f}  {change * 100:+6.1f}%{flag}")
+    return regressions
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('run', 'compare'):
+        print(__doc__.strip().split('\n\n')[1])
+        sys.exit(1)
+
+    def option(name, default=None):
+        if name in args:
+            i = args.index(name)
+            value = args[i + 1]
+            del args[i:i + 2]
+            return value
+        return default
+
+    if args[0] == 'run':
+        quick = '--quick' in args
+        out = option('--out', DEFAULT_OUT)
+        document = run(only=option('--only'), quick=quick)
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"✓ Results written to {out}")
+    else:
+        threshold = float(option('--threshold', 0.10))
+        if len(args) != 3:
+            print("Usage: python benchmarks/suite.py compare baseline.json results.json [--threshold 0.10]")
+            sys.exit(1)
+        with open(args[1], 'r') as f:
+            baseline = json.load(f)
+        with open(args[2], 'r') as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, threshold)
+        if regressions:
+            print(f"✗ {len(regressions)} regression(s) beyond {threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"✓ No regressions beyond {threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,26 +6,38 @@
 the flux GPU via UART or simulation interface.
 """
 
+import asyncio
+import os
 import struct
 import time
 import sys
 
+SIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'sw-toolchain', 'sim')
+ASM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'sw-toolchain', 'asm')
+
+WRITE_MEM_MAX = 0xFFFF  # FP32 values per WRITE_MEM packet (16-bit count field)
+
 class FluxGPU:
     """
     Main driver class for flux GPU
     """
     
-    def __init__(self, interface='simulation'):
+    def __init__(self, interface='simulation', port=None):
         """
         Initialize GPU driver
         
         Args:
             interface: 'simulation', 'uart', or 'pcie'
+            port: Open transport for 'uart'/'pcie' (any object with
+                  write(bytes) and read(n)); 'uart' opens /dev/ttyUSB0
+                  if not given
         """
         self.interface = interface
         self.halted = False
         
-        if interface == 'uart':
+        if port is not None:
+            self.port = port
+        elif interface == 'uart':
             import serial
             self.port = serial.Serial('/dev/ttyUSB0', 115200, timeout=1)
         elif interface == 'simulation':
@@ -55,6 +67,54 @@ def load_program(self, hex_file):
         print(f"✓ Loaded {len(instructions)} instructions from {hex_file}")
         return len(instructions)
     
+    def load_image(self, image):
+        """
+        Load a program image (FluxAssembler.assemble_to_image() output or
+        an .img path): program, data segments and entry point
+        
+        Args:
+            image: Image bytes, or the path of an .img file
+        
+        Returns:
+            Number of instructions loaded
+        
+        Raises:
+            ValueError: A data segment is not whole FP32 words or does not
+                        fit in simulated memory, or (hardware) the entry
+                        point is not 0
+        """
+        if isinstance(image, str):
+            with open(image, 'rb') as f:
+                image = f.read()
+        
+        assembler = _assembler()
+        instructions = assembler.read_image(image)
+        for addr, data in assembler.data:
+            if len(data) % 4:
+                raise ValueError(f"Data segment at {addr:#x} is {len(data)} bytes, not a multiple of 4")
+            if self.interface == 'simulation' and addr + len(data) > len(self.memory):
+                raise ValueError(f"Data segment {addr:#x}-{addr + len(data):#x} does not fit in "
+                                 f"{len(self.memory)} bytes of memory")
+        
+        if self.interface == 'simulation':
+            self.instructions = instructions
+            for addr, data in assembler.data:
+                self.memory[addr:addr + len(data)] = data
+            self.pc = assembler.entry
+        else:
+            if assembler.entry != 0:
+                raise ValueError(f"Hardware starts at 0, image entry is {assembler.entry:#x}")
+            self._send_program(instructions)
+            for addr, data in assembler.data:
+                # One WRITE_MEM packet holds at most WRITE_MEM_MAX values
+                for offset in range(0, len(data), WRITE_MEM_MAX * 4):
+                    chunk = data[offset:offset + WRITE_MEM_MAX * 4]
+                    self._send_write_memory(addr + offset, list(struct.unpack(f'<{len(chunk) // 4}f', chunk)))
+        
+        data_size = sum(len(data) for _, data in assembler.data)
+        print(f"✓ Loaded {len(instructions)} instructions, {data_size} data bytes from image")
+        return len(instructions)
+    
     def set_register(self, thread_id, reg_id, value):
         """
         Set register value
@@ -123,23 +183,61 @@ def start_execution(self, thread_mask=0x00000001):
         """
         if self.interface == 'simulation':
             # Use software simulator
-            from sw_toolchain.sim.simulator import FluxSimulator
-            sim = FluxSimulator()
-            sim.instructions = self.instructions
-            sim.regfile[0] = self.registers[0]
-            sim.memory = self.memory
+            sim = self._create_simulator()
             sim.run(thread=0, verbose=False)
-            
-            # Copy results back
-            self.registers[0] = sim.regfile[0]
-            self.memory = sim.memory
-            self.halted = sim.halted
+            self._copy_simulator_results(sim)
         else:
             self._send_start_command(thread_mask)
             self._wait_for_halt()
         
         print("✓ Execution complete")
     
+    async def start_execution_async(self, thread_mask=0x00000001, yield_every=10000,
+                                    progress=None, max_steps=1000):
+        """
+        start_execution() as a coroutine
+        
+        In simulation mode the simulator yields to the event loop every
+        yield_every instructions; on hardware the halt poll sleeps with
+        asyncio. Cancelling the task stops the run (memory and registers
+        keep whatever the program wrote so far).
+        
+        Args:
+            thread_mask: Bitmap of threads to execute (bit 0 = thread 0)
+            yield_every: Simulated instructions between yields
+            progress: Called as progress(sim, steps) after every chunk
+                      (simulation only)
+            max_steps: Simulated instruction limit
+        """
+        if self.interface == 'simulation':
+            sim = self._create_simulator()
+            try:
+                await sim.run_async(thread=0, max_steps=max_steps,
+                                    yield_every=yield_every, progress=progress)
+            finally:
+                self._copy_simulator_results(sim)
+        else:
+            self._send_start_command(thread_mask)
+            await self._wait_for_halt_async()
+        
+        print("✓ Execution complete")
+    
+    def _create_simulator(self):
+        """Simulator sharing this driver's memory and thread 0 registers"""
+        if SIM_DIR not in sys.path:
+            sys.path.insert(0, SIM_DIR)
+        from simulator import FluxSimulator
+        sim = FluxSimulator()
+        sim.instructions = self.instructions
+        sim.regfile[0] = self.registers[0]
+        sim.memory = self.memory  # Zero-copy: stores land in self.memory
+        sim.pc[0] = self.pc
+        return sim
+    
+    def _copy_simulator_results(self, sim):
+        self.registers[0] = sim.regfile[0]
+        self.halted = sim.halted
+    
     def get_register(self, thread_id, reg_id):
         """Read register value after execution"""
         if self.interface == 'simulation':
@@ -267,6 +365,24 @@ def _wait_for_halt(self, timeout=5.0):
         
         raise TimeoutError("GPU did not halt within timeout")
     
+    async def _wait_for_halt_async(self, timeout=5.0):
+        """_wait_for_halt() that sleeps with asyncio between polls"""
+        start_time = time.time()
+        
+        while time.time() - start_time < timeout:
+            packet = bytearray([0xAA, 0xB1])  # HALT_CHECK
+            packet.append(sum(packet[1:]) & 0xFF)
+            self.port.write(packet)
+            
+            response = self.port.read(1)
+            if response == b'\x01':  # Halted
+                self.halted = True
+                return
+            
+            await asyncio.sleep(0.01)  # 10ms poll
+        
+        raise TimeoutError("GPU did not halt within timeout")
+    
     def close(self):
         """Close connection"""
         if self.interface == 'uart':
@@ -274,7 +390,14 @@ def close(self):
 
 # === High-Level Helper Functions ===
 
-def run_program(assembly_file, interface='simulation', show_output=True):
+def _assembler():
+    """New FluxAssembler from sw-toolchain/asm"""
+    if ASM_DIR not in sys.path:
+        sys.path.insert(0, ASM_DIR)
+    from assembler import FluxAssembler
+    return FluxAssembler()
+
+def run_program(assembly_file, interface='simulation', show_output=True, cached=False):
     """
     Complete workflow: Assemble → Load → Execute → Show Results
     
@@ -282,27 +405,27 @@ def run_program(assembly_file, interface='simulation', show_output=True):
         assembly_file: Path to .s assembly file
         interface: 'simulation', 'uart', or 'pcie'
         show_output: Print results
+        cached: Assemble through the on-disk assembly cache
+                (FluxAssembler.assemble_cached, ~/.cache/flux/asm)
     
     Returns:
         FluxGPU object with results
     """
-    import os
-    
-    # Step 1: Assemble
+    # Step 1: Assemble (in-process and in memory, optionally through the assembly cache)
     print(f"\n=== Assembling {assembly_file} ===")
-    asm_cmd = f"python sw-toolchain/asm/assembler.py {assembly_file}"
-    ret = os.system(asm_cmd)
-    if ret != 0:
-        raise RuntimeError("Assembly failed")
-    
-    hex_file = assembly_file.replace('.s', '.hex')
+    with open(assembly_file, 'r') as f:
+        source = f.read()
+    try:
+        image = _assembler().assemble_to_image(source, cached=cached)
+    except Exception as e:
+        raise RuntimeError(f"Assembly failed: {e}") from e
     
     # Step 2: Initialize GPU
     gpu = FluxGPU(interface=interface)
     
     # Step 3: Load program
     print(f"\n=== Loading Program ===")
-    gpu.load_program(hex_file)
+    gpu.load_image(image)
     
     # Step 4: Setup (example for vector add)
     print(f"\n=== Initializing Data ===")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+flux Firmware Loopback Transport
+Stands in for the UART/PCIe port so FluxGPU's hardware path can run
+without a board (benchmarks and tests)
+
+Usage:
+    gpu = FluxGPU(interface='uart', port=LoopbackPort())
+"""
+
+import struct
+
+
+class LoopbackPort:
+    """In-memory transport that answers FluxGPU packets like the firmware
+    would (LOAD_PROG ack, WRITE_MEM/READ_MEM on a local memory, HALT_CHECK)"""
+
+    def __init__(self, memory_size: int = 64 * 1024):
+        self.memory = bytearray(memory_size)
+        self.pending = bytearray()
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    def write(self, packet):
+        self.bytes_written += len(packet)
+        command = packet[1]
+        if command == 0x80:    # LOAD_PROG
+            self.pending += b'\x06'
+        elif command == 0x90:  # WRITE_MEM
+            addr, count = struct.unpack_from('<IH', packet, 2)
+            self.memory[addr:addr + 4 * count] = packet[8:8 + 4 * count]
+        elif command == 0xC0:  # READ_MEM
+            addr, count = struct.unpack_from('<IH', packet, 2)
+            self.pending += self.memory[addr:addr + 4 * count]
+        elif command == 0xB1:  # HALT_CHECK
+            self.pending += b'\x01'
+
+    def read(self, n):
+        data = bytes(self.pending[:n])
+        del self.pending[:n]
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        pass
@@ -28,9 +28,7 @@ main:
     LI R13, 200      # V1 Y
     
     # Load vertex 2
-    LI R14, 300      # V
-
-2 X
+    LI R14, 300      # V2 X
     LI R15, 400      # V2 Y
     
     # Load color (red)
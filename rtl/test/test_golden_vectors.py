@@ -0,0 +1,203 @@
+"""
+Replay the simulator's golden vectors against simd_alu and shader_core
+
+Generate the vectors first (requires NumPy):
+    python sw-toolchain/sim/fuzz.py --out rtl/test/golden
+
+then run one test per toplevel, e.g.:
+    make TOPLEVEL=simd_alu MODULE=test_golden_vectors TESTCASE=test_simd_alu_golden
+    make TOPLEVEL=shader_core MODULE=test_golden_vectors TESTCASE=test_shader_core_golden
+
+Set FLUX_GOLDEN to read the vectors from another directory. The file
+format is described in sw-toolchain/sim/fuzz.py. Files are read in
+chunks and unpacked with struct, so the testbench needs no NumPy. Values
+stay as 128-bit integers (lane 0 in the low bits, like the RTL buses) and
+are compared per chunk, not one assert per vector.
+
+Each chunk is turned into a schedule of one input row per clock cycle up
+front. A driver coroutine streams the rows (inputs change on the falling
+edge, and only signals whose value changes are written) while a monitor
+coroutine samples the output in the read-only phase after each rising
+edge it is told to. The per-cycle Python work is just those writes and
+awaits. The replay still takes one clock per ALU vector and per
+shader_core cycle, since that is the rate the RTL accepts them.
+"""
+
+import os
+import struct
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import FallingEdge, ReadOnly, RisingEdge
+
+GOLDEN_DIR = os.environ.get('FLUX_GOLDEN', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden'))
+ALU_FILE = os.path.join(GOLDEN_DIR, 'simd_alu.bin')
+CORE_FILE = os.path.join(GOLDEN_DIR, 'shader_core.bin')
+
+GOLDEN_MAGIC = b'FLUXGOLD'
+HEADER = struct.Struct('<8sIIII')       # magic, version, kind, count, regs
+ALU_RECORD = struct.Struct('<I16s16s16s')  # alu_op, a, b, result (4x FP32 each)
+PROGRAM = struct.Struct('<II')          # words, instances
+KIND_ALU, KIND_PROGRAM = 1, 2
+CHUNK = 4096  # records per read
+
+OPCODE_LOAD, OPCODE_STORE, OPCODE_R_TYPE = 0x03, 0x23, 0x33
+MAX_REPORTED = 10
+
+
+def read_header(f, kind):
+    magic, version, file_kind, count, regs = HEADER.unpack(f.read(HEADER.size))
+    assert magic == GOLDEN_MAGIC and version == 1, f"{f.name}: not a golden vector file"
+    assert file_kind == kind, f"{f.name}: kind {file_kind}, expected {kind}"
+    return count, regs
+
+
+def lanes_match(expected, got):
+    """Bit-exact per lane, except that any NaN matches any NaN"""
+    if expected == got:
+        return True
+    for i in range(4):
+        e = (expected >> (32 * i)) & 0xFFFFFFFF
+        g = (got >> (32 * i)) & 0xFFFFFFFF
+        if e != g and not ((e & 0x7FFFFFFF) > 0x7F800000 and (g & 0x7FFFFFFF) > 0x7F800000):
+            return False
+    return True
+
+
+def check(dut, expected, got, where, failures):
+    """Compare a chunk of results; record (and log) mismatches"""
+    for i, (e, g) in enumerate(zip(expected, got)):
+        if e != g and not lanes_match(e, g):
+            if len(failures) < MAX_REPORTED:
+                dut._log.error(f"{where(i)}: expected {e:032x}, got {g:032x}")
+            failures.append(where(i))
+
+
+async def monitor(clk, probe, samples, got):
+    """Append probe's value to got after every rising edge whose entry in
+    samples is true (one entry per cycle)"""
+    rising, settled = RisingEdge(clk), ReadOnly()
+    for sample in samples:
+        await rising
+        if sample:
+            await settled
+            got.append(probe.value)
+
+
+async def stream(clk, signals, rows, probe, samples):
+    """Drive one chunk and return the sampled outputs as integers
+
+    Starts (and ends) on a falling edge. Row i holds the values of signals
+    during cycle i; samples[i] says whether probe is read after that
+    cycle's rising edge.
+    """
+    got = []
+    falling = FallingEdge(clk)
+    watcher = cocotb.start_soon(monitor(clk, probe, samples, got))
+    last = [None] * len(signals)
+    for row in rows:
+        for i, value in enumerate(row):
+            if value != last[i]:
+                signals[i].value = last[i] = value
+        await falling
+    await watcher
+    return [int(v) for v in got]
+
+
+async def reset(dut):
+    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    dut.rst_n.value = 0
+    dut.enable.value = 0
+    await RisingEdge(dut.clk)
+    dut.rst_n.value = 1
+    await RisingEdge(dut.clk)
+    await FallingEdge(dut.clk)
+
+
+@cocotb.test(skip=not os.path.exists(ALU_FILE))
+async def test_simd_alu_golden(dut):
+    """Stream simd_alu.bin through the ALU, one vector per cycle"""
+    await reset(dut)
+    signals = (dut.alu_op, dut.operand_a, dut.operand_b)
+    failures = []
+    checked = 0
+
+    with open(ALU_FILE, 'rb') as f:
+        count, _ = read_header(f, KIND_ALU)
+        while checked < count:
+            data = f.read(ALU_RECORD.size * CHUNK)
+            records = [(op, int.from_bytes(a, 'little'), int.from_bytes(b, 'little'),
+                        int.from_bytes(r, 'little')) for op, a, b, r in ALU_RECORD.iter_unpack(data)]
+
+            dut.enable.value = 1
+            got = await stream(dut.clk, signals, [r[:3] for r in records], dut.result,
+                               [True] * len(records))
+            dut.enable.value = 0
+
+            base = checked
+            check(dut, [r for _, _, _, r in records], got,
+                  lambda i: f"vector {base + i} (op {records[i][0]})", failures)
+            checked += len(records)
+
+    dut._log.info(f"{checked:,} vectors checked, {len(failures)} mismatches")
+    assert not failures, f"{len(failures)} of {checked} simd_alu vectors mismatched"
+
+
+@cocotb.test(skip=not os.path.exists(CORE_FILE))
+async def test_shader_core_golden(dut):
+    """Replay shader_core.bin: every program once per instance
+
+    LOAD data is driven on mem_rd_data and written back on the same
+    edge. R-type results are written back one edge after the ALU latches
+    them, so the instruction is held for a second cycle with enable low.
+    STORE data is read from mem_wr_data and compared with the simulator's
+    stores.
+    """
+    dut.instruction.value = 0
+    dut.thread_id.value = 0
+    dut.mem_rd_data.value = 0
+    await reset(dut)
+    signals = (dut.thread_id, dut.instruction, dut.mem_rd_data, dut.enable)
+    failures = []
+    instructions = 0
+
+    with open(CORE_FILE, 'rb') as f:
+        programs, regs = read_header(f, KIND_PROGRAM)
+        for p in range(programs):
+            num_words, num_instances = PROGRAM.unpack(f.read(PROGRAM.size))
+            words = struct.unpack(f'<{num_words}I', f.read(4 * num_words))
+            ops = [w & 0x7F for w in words]
+            per_instance = 2 * regs * 16  # loads, then expected stores
+
+            first = 0
+            while first < num_instances:
+                n = min(CHUNK, num_instances - first)
+                data = f.read(per_instance * n)
+                expected, rows, samples = [], [], []
+                rd_data = 0
+                for i in range(n):
+                    row = data[i * per_instance:(i + 1) * per_instance]
+                    loads = iter([int.from_bytes(row[16 * r:16 * r + 16], 'little')
+                                  for r in range(regs)])
+                    expected += [int.from_bytes(row[16 * r:16 * r + 16], 'little')
+                                 for r in range(regs, 2 * regs)]
+                    thread = (first + i) % 32
+                    for word, op in zip(words, ops):
+                        if op == OPCODE_LOAD:
+                            rd_data = next(loads)
+                        rows.append((thread, word, rd_data, 1))
+                        samples.append(op == OPCODE_STORE)
+                        if op == OPCODE_R_TYPE:
+                            rows.append((thread, word, rd_data, 0))  # write-back
+                            samples.append(False)
+
+                got = await stream(dut.clk, signals, rows, dut.mem_wr_data, samples)
+                dut.enable.value = 0
+                check(dut, expected, got,
+                      lambda i: f"program {p} instance {first + i // regs} store {i % regs}", failures)
+                instructions += n * num_words
+                first += n
+
+    dut._log.info(f"{programs:,} programs, {instructions:,} instructions checked, "
+                  f"{len(failures)} mismatched stores")
+    assert not failures, f"{len(failures)} shader_core stores mismatched"
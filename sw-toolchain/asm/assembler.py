@@ -4,9 +4,116 @@
 Converts assembly language to machine code for the flux ISA
 """
 
-import sys
+import os
 import re
-from typing import List, Dict, Tuple
+import sys
+import ast
+import json
+import operator
+import struct
+import glob
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+
+import imageformat
+from imageformat import IMAGE_MAGIC, IMAGE_VERSION, IMAGE_HEADER, IMAGE_SEGMENT, IMAGE_ALIGN
+
+# Bump whenever the output for a given source can change (encodings,
+# directives, image layout): it is part of the assembly cache key, along
+# with a hash of this file and imageformat.py so unversioned edits miss the
+# cache too
+ASSEMBLER_VERSION = 4
+
+# Assembly cache directory (assemble_cached), overridden by FLUX_ASM_CACHE
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'flux', 'asm')
+
+# Operand separators besides whitespace: LOAD R5, 16(R4) -> LOAD R5 16 R4
+SEPARATORS = str.maketrans(',()', '   ')
+
+# Line expansion (FluxAssembler.expand): lines without any of these
+# characters pass through untouched while no macros or constants exist
+EXPANSION_CHARS = re.compile(r'[-+*/%<>&|^~.]')
+REGISTER = re.compile(r'R\d+', re.IGNORECASE)
+MEMORY_OPERAND = re.compile(r'(.*?)\(\s*(R\d+)\s*\)', re.IGNORECASE)
+INTEGER = re.compile(r'0[xX][0-9a-fA-F]+|-?\d+')  # Forms parse_immediate() accepts as-is
+IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+MAX_EXPANSION_DEPTH = 64  # Nested macro/.rept expansions (catches recursive macros)
+IMM_MIN, IMM_MAX = -2048, 2047  # Signed 12-bit I/S-type immediate field
+
+def _divide(a: int, b: int) -> int:
+    """Integer division truncating toward zero, as in C (-7 / 2 == -3)"""
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+def _remainder(a: int, b: int) -> int:
+    """Remainder matching _divide (takes the sign of a, as in C)"""
+    return a - b * _divide(a, b)
+
+# Operators allowed in expressions; / (and //) and % truncate toward zero
+BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: _divide, ast.FloorDiv: _divide, ast.Mod: _remainder,
+    ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+    ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor,
+}
+UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Invert: operator.invert}
+
+def _split_arguments(text: str) -> List[str]:
+    """Comma-separated macro arguments, split only outside parentheses"""
+    args, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return args
+
+def _le_words(machine_code) -> bytes:
+    """Words as little-endian 32-bit bytes"""
+    words = array('I', machine_code)
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words.tobytes()
+
+def _write_atomic(path: str, data: bytes):
+    """Write via a temporary file in the same directory and os.replace, so
+    readers see the old file or the complete new one"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+_source_digest = None
+
+def _assembler_digest() -> str:
+    """SHA-256 of the assembler's own source and the image format (read once
+    per process)"""
+    global _source_digest
+    if _source_digest is None:
+        digest = hashlib.sha256()
+        for path in (__file__, imageformat.__file__):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _source_digest = digest.hexdigest()
+    return _source_digest
+
+class ListingObserver:
+    """Prints each emitted word with its source (the CLI listing)"""
+    
+    def on_emit(self, addr: int, word: int, source: str):
+        print(f"0x{addr:08x}: 0x{word:08x}  # {source}")
 
 class FluxAssembler:
     def __init__(self):
@@ -16,7 +123,7 @@ def __init__(self):
             'ADDI': 0x13, 'LI': 0x13,
             'LOAD': 0x03, 'STORE': 0x23,
             'BEQ': 0x63, 'BNE': 0x63,
-            'JAL': 0x6F, 'JALR': 0x67,
+            'JAL': 0x6F, 'JALR': 0x67, 'RET': 0x67,
             'NOP': 0x13, 'HALT': 0x7F
         }
         
@@ -33,6 +140,28 @@ def __init__(self):
         
         self.labels = {}  # Label name -> address
         self.instructions = []  # List of (address, instruction_str)
+        self.line_numbers = []  # Source line (1-based) of each instruction
+        
+        # Data segments from .data ADDR: [address, bytearray] each
+        self.data = []
+        self.section = 'text'
+        self.entry_label = None  # .entry label
+        self.entry = 0  # Entry address after assemble()
+        
+        # Line expansion: .set/.equ constants and .macro definitions
+        # (name -> (parameters, body lines))
+        self.constants = {}
+        self.macros = {}
+        self.macro_count = 0  # Invocations so far, for \@ in macro bodies
+        
+        # Streaming mode only (assemble_stream): the code being emitted and
+        # label -> [(index, branch tuple)] forward references to backpatch
+        self.code = None
+        self.fixups = {}
+        
+        # Observers with an on_emit(addr, word, source) hook, called for
+        # every emitted word; none keeps assemble() silent
+        self.observers = []
         
     def parse_register(self, reg_str: str) -> int:
         """Parse register name (R0-R31) to number"""
@@ -42,18 +171,25 @@ def parse_register(self, reg_str: str) -> int:
         raise ValueError(f"Invalid register: {reg_str}")
     
     def parse_immediate(self, imm_str: str) -> int:
-        """Parse immediate value (decimal or hex)"""
+        """Parse immediate value (decimal or hex)
+        
+        Decimal values, which is what constants and expressions evaluate
+        to, must fit the signed 12-bit field. Hex literals are bit patterns
+        and only their low 12 bits are encoded.
+        
+        Raises:
+            ValueError: Decimal value outside [IMM_MIN, IMM_MAX]
+        """
         imm_str = imm_str.strip()
         if imm_str.startswith('0x') or imm_str.startswith('0X'):
             return int(imm_str, 16)
-        elif imm_str.startswith('-'):
-            val = int(imm_str)
-            # Sign extend to 12 bits for I-type
-            if val < 0:
-                return (1 << 12) + val
-            return val
-        else:
-            return int(imm_str)
+        val = int(imm_str)
+        if not IMM_MIN <= val <= IMM_MAX:
+            raise ValueError(f"Immediate {val} out of range [{IMM_MIN}, {IMM_MAX}]")
+        # Sign extend to 12 bits for I-type
+        if val < 0:
+            return (1 << 12) + val
+        return val
     
     def encode_r_type(self, mnemonic: str, rd: int, rs1: int, rs2: int) -> int:
         """Encode R-type instruction"""
@@ -102,6 +238,19 @@ def encode_b_type(self, mnemonic: str, rs1: int, rs2: int, offset: int) -> int:
         instr = opcode | (imm11 << 7) | (imm_4_1 << 8) | (funct3_val << 12) | (rs1 << 15) | (rs2 << 20) | (imm_10_5 << 25) | (imm12 << 31)
         return instr
     
+    def encode_j_type(self, mnemonic: str, rd: int, offset: int) -> int:
+        """Encode J-type instruction (JAL)"""
+        opcode = self.opcodes[mnemonic]
+        
+        # J-type immediate encoding: imm[20|10:1|11|19:12]
+        imm20 = (offset >> 20) & 1
+        imm_10_1 = (offset >> 1) & 0x3FF
+        imm11 = (offset >> 11) & 1
+        imm_19_12 = (offset >> 12) & 0xFF
+        
+        instr = opcode | (rd << 7) | (imm_19_12 << 12) | (imm11 << 20) | (imm_10_1 << 21) | (imm20 << 31)
+        return instr
+    
     def assemble_line(self, line: str, addr: int) -> Tuple[int, str]:
         """Assemble a single line of assembly"""
         # Remove comments
@@ -115,20 +264,29 @@ def assemble_line(self, line: str, addr: int) -> Tuple[int, str]:
         # Check for label
         if ':' in line:
             label, rest = line.split(':', 1)
-            self.labels[label.strip()] = addr
+            if self.section == 'data':
+                segment_addr, data = self.data[-1]
+                self.define_label(label.strip(), segment_addr + len(data))
+            else:
+                self.define_label(label.strip(), addr)
             line = rest.strip()
             if not line:
                 return None, ""
         
         # Parse instruction
-        parts = re.split(r'[,\s()]+', line)
-        parts = [p for p in parts if p]  # Remove empty strings
+        parts = line.translate(SEPARATORS).split()
         
         if not parts:
             return None, ""
         
         mnemonic = parts[0].upper()
         
+        if mnemonic.startswith('.'):
+            self.assemble_directive(parts[0].lower(), parts[1:])
+            return None, ""
+        if self.section == 'data':
+            raise ValueError(f"Instruction in .data section: {line}")
+        
         # Handle different instruction formats
         if mnemonic in ['ADD', 'SUB', 'MUL', 'DIV']:
             # R-type: ADD R3, R1, R2
@@ -151,12 +309,16 @@ def assemble_line(self, line: str, addr: int) -> Tuple[int, str]:
             return self.encode_i_type('ADDI', rd, 0, imm), line
         
         elif mnemonic == 'LOAD':
-            # M-type: LOAD R5, 16(R4) or LOAD R5, offset, R4
+            # M-type: LOAD R5, 16(R4), LOAD R5, offset, R4 or LOAD R5, address
             rd = self.parse_register(parts[1])
             if '(' in line:
                 # Format: offset(base)
                 offset = self.parse_immediate(parts[2])
                 rs1 = self.parse_register(parts[3])
+            elif len(parts) == 3:
+                # Format: rd, address (base R0)
+                offset = self.parse_immediate(parts[2])
+                rs1 = 0
             else:
                 # Format: rd, offset, rs1
                 offset = self.parse_immediate(parts[2])
@@ -164,11 +326,14 @@ def assemble_line(self, line: str, addr: int) -> Tuple[int, str]:
             return self.encode_i_type('LOAD', rd, rs1, offset), line
         
         elif mnemonic == 'STORE':
-            # M-type: STORE R3, 0(R12) or STORE R3, offset, R12
+            # M-type: STORE R3, 0(R12), STORE R3, offset, R12 or STORE R3, address
             rs2 = self.parse_register(parts[1])
             if '(' in line:
                 offset = self.parse_immediate(parts[2])
                 rs1 = self.parse_register(parts[3])
+            elif len(parts) == 3:
+                offset = self.parse_immediate(parts[2])
+                rs1 = 0
             else:
                 offset = self.parse_immediate(parts[2])
                 rs1 = self.parse_register(parts[3])
@@ -181,6 +346,33 @@ def assemble_line(self, line: str, addr: int) -> Tuple[int, str]:
             # Label will be resolved in second pass
             return (mnemonic, rs1, rs2, parts[3]), line
         
+        elif mnemonic == 'JAL':
+            # J-type: JAL label (links R31) or JAL R5, label
+            if len(parts) > 2:
+                rd = self.parse_register(parts[1])
+                label = parts[2]
+            else:
+                rd = 31
+                label = parts[1]
+            # Label will be resolved in second pass
+            return (mnemonic, rd, None, label), line
+        
+        elif mnemonic == 'JALR':
+            # I-type: JALR R0, R31, 0 or JALR R5 (links R31, offset 0)
+            if len(parts) > 2:
+                rd = self.parse_register(parts[1])
+                rs1 = self.parse_register(parts[2])
+                imm = self.parse_immediate(parts[3]) if len(parts) > 3 else 0
+            else:
+                rd = 31
+                rs1 = self.parse_register(parts[1])
+                imm = 0
+            return self.encode_i_type('JALR', rd, rs1, imm), line
+        
+        elif mnemonic == 'RET':
+            # Pseudo: RET -> JALR R0, R31, 0
+            return self.encode_i_type('JALR', 0, 31, 0), line
+        
         elif mnemonic == 'NOP':
             # NOP: ADDI R0, R0, 0
             return self.encode_i_type('ADDI', 0, 0, 0), line
@@ -191,66 +383,532 @@ def assemble_line(self, line: str, addr: int) -> Tuple[int, str]:
         else:
             raise ValueError(f"Unknown instruction: {mnemonic}")
     
+    def assemble_directive(self, directive: str, args: List[str]):
+        """Handle .text, .data [ADDR], .word, .float, .space N and .entry label
+        
+        .data without an address continues after the previous data segment
+        (at 0 for the first one).
+        """
+        if directive == '.text':
+            self.section = 'text'
+        elif directive == '.data':
+            self.section = 'data'
+            if args:
+                addr = int(args[0], 0)
+            else:
+                addr = self.data[-1][0] + len(self.data[-1][1]) if self.data else 0
+            self.data.append([addr, bytearray()])
+        elif directive == '.entry':
+            self.entry_label = args[0]
+        elif directive in ('.word', '.float', '.space'):
+            if self.section != 'data':
+                raise ValueError(f"{directive} outside a .data section")
+            data = self.data[-1][1]
+            if directive == '.word':
+                data += struct.pack(f'<{len(args)}I', *(int(v, 0) & 0xFFFFFFFF for v in args))
+            elif directive == '.float':
+                data += struct.pack(f'<{len(args)}f', *(float(v) for v in args))
+            else:
+                data += bytes(int(args[0], 0))
+        else:
+            raise ValueError(f"Unknown directive: {directive}")
+    
+    def expand(self, lines: Iterable[str], depth: int = 0,
+               origin: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Line expansion layer in front of assemble_line()
+        
+        Handles .macro NAME [params] / .endm (parameters used as \\param in
+        the body, \\@ gives a number unique to each invocation), .rept N /
+        .endr, .set/.equ NAME, value, and integer expressions in operands
+        (numbers, constants, + - * / % << >> & | ^ ~ and parentheses).
+        Bare identifiers that are not constants are left alone as labels.
+        
+        Args:
+            lines: Source lines
+            depth: Current macro/.rept expansion depth
+            origin: Source line number to report for every line (set when
+                expanding a macro or .rept body)
+        
+        Yields:
+            (source line number, expanded line); lines produced by a macro
+            or .rept carry the number of the line that expanded them
+        """
+        if depth > MAX_EXPANSION_DEPTH:
+            raise ValueError(f"Line {origin}: macro/.rept expansion nested deeper than "
+                             f"{MAX_EXPANSION_DEPTH} levels (recursive macro?)")
+        block = None  # [directive, argument, body lines, nesting depth] being collected
+        for line_no, line in enumerate(lines, 1):
+            if origin is not None:
+                line_no = origin
+            if block is None and not self.macros and not self.constants \
+                    and not EXPANSION_CHARS.search(line):
+                yield line_no, line
+                continue
+            
+            code = line.split('#', 1)[0].strip()
+            label = ''
+            if ':' in code:
+                label, code = (part.strip() for part in code.split(':', 1))
+            word, rest = (code.split(None, 1) + ['', ''])[:2]
+            directive = word.lower()
+            
+            if block is not None:
+                if directive in ('.macro', '.rept'):
+                    block[3] += 1
+                elif directive in ('.endm', '.endr') and block[3]:
+                    block[3] -= 1
+                elif directive in ('.endm', '.endr'):
+                    kind, argument, body, _ = block
+                    block = None
+                    if kind == '.macro':
+                        name, *params = argument.replace(',', ' ').split()
+                        self.macros[name] = (params, body)
+                    else:
+                        for _ in range(self.evaluate(argument)):
+                            yield from self.expand(body, depth + 1, line_no)
+                    continue
+                block[2].append(line)
+                continue
+            
+            if label and (directive in ('.macro', '.rept', '.set', '.equ') or word in self.macros):
+                yield line_no, f"{label}:"
+            if directive in ('.macro', '.rept'):
+                if not rest.strip():
+                    raise ValueError(f"{directive} needs an argument")
+                block = [directive, rest.strip(), [], 0]
+            elif directive in ('.endm', '.endr'):
+                raise ValueError(f"{directive} without .macro/.rept")
+            elif directive in ('.set', '.equ'):
+                name, _, value = rest.replace(',', ' ', 1).strip().partition(' ')
+                if not IDENTIFIER.fullmatch(name) or not value.strip():
+                    raise ValueError(f"Invalid {directive}: {code}")
+                if name in self.labels:
+                    raise ValueError(f"Line {line_no}: {directive} {name} conflicts with a label")
+                self.constants[name] = self.evaluate(value)
+            elif word in self.macros:
+                yield from self.expand(self.expand_macro(word, rest), depth + 1, line_no)
+            else:
+                yield line_no, self.substitute(line, label, word, rest)
+        
+        if block is not None:
+            raise ValueError(f"{block[0]} without {'.endm' if block[0] == '.macro' else '.endr'}")
+    
+    def expand_macro(self, name: str, args: str) -> List[str]:
+        """Body of macro name with its parameters replaced by args"""
+        params, body = self.macros[name]
+        values = _split_arguments(args) if args.strip() else []
+        if len(values) != len(params):
+            raise ValueError(f"Macro {name} takes {len(params)} argument(s), got {len(values)}")
+        self.macro_count += 1
+        # Longest names first, so \a does not replace the start of \ab
+        pairs = sorted(zip(params, values), key=lambda p: -len(p[0]))
+        pairs.append(('@', str(self.macro_count)))
+        expanded = []
+        for text in body:
+            for param, value in pairs:
+                text = text.replace('\\' + param, value)
+            expanded.append(text)
+        return expanded
+    
+    def substitute(self, line: str, label: str, word: str, operands: str) -> str:
+        """line with constants and expressions in its operands replaced by
+        their values (line itself if nothing changes)"""
+        if not operands.strip() or word.lower() in ('.float', '.entry'):
+            return line
+        values = [self.operand_value(op.strip()) for op in operands.split(',')]
+        if values == [op.strip() for op in operands.split(',')]:
+            return line
+        prefix = f"{label}: " if label else ''
+        return f"{prefix}{word} {', '.join(values)}"
+    
+    def operand_value(self, operand: str) -> str:
+        """Operand with any expression evaluated (registers, plain numbers
+        and labels are returned unchanged)"""
+        if REGISTER.fullmatch(operand) or INTEGER.fullmatch(operand):
+            return operand
+        memory = MEMORY_OPERAND.fullmatch(operand)
+        if memory and memory.group(1).strip():
+            return f"{self.operand_value(memory.group(1).strip())}({memory.group(2)})"
+        if IDENTIFIER.fullmatch(operand) and operand not in self.constants:
+            return operand  # Label
+        return str(self.evaluate(operand))
+    
+    def evaluate(self, expression: str) -> int:
+        """Integer value of an expression over numbers and .set constants"""
+        expression = expression.strip()
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError:
+            raise ValueError(f"Invalid expression: {expression}") from None
+        
+        def value(node):
+            if isinstance(node, ast.Constant) and type(node.value) is int:
+                return node.value
+            if isinstance(node, ast.Name):
+                if node.id not in self.constants:
+                    raise ValueError(f"Undefined symbol: {node.id}")
+                return self.constants[node.id]
+            if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+                return BINARY_OPS[type(node.op)](value(node.left), value(node.right))
+            if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPS:
+                return UNARY_OPS[type(node.op)](value(node.operand))
+            raise ValueError(f"Unsupported expression: {expression}")
+        
+        try:
+            return value(tree.body)
+        except ZeroDivisionError:
+            raise ValueError(f"Division by zero: {expression}") from None
+    
+    def define_label(self, label: str, addr: int):
+        """Record a label; in streaming mode, backpatch the branches waiting for it"""
+        if label in self.constants:
+            raise ValueError(f"Label {label} conflicts with a .set/.equ constant")
+        if label in self.labels:
+            raise ValueError(f"Duplicate label: {label} (a label inside .rept is defined "
+                             f"once per copy; use a macro with \\@)")
+        self.labels[label] = addr
+        pending = self.fixups.pop(label, None)
+        if pending:
+            code = self.code
+            emit = [o.on_emit for o in self.observers]
+            for index, instr in pending:
+                code[index] = word = self.encode_branch(instr, index * 4, addr)
+                for hook in emit:
+                    hook(index * 4, word, f"{instr[0]} -> {label}")
+    
+    def encode_branch(self, instr: Tuple, addr: int, target_addr: int) -> int:
+        """Encode a (mnemonic, rs1/rd, rs2, label) branch/jump at addr"""
+        mnemonic, rs1, rs2, _ = instr
+        offset = target_addr - addr
+        if mnemonic == 'JAL':
+            return self.encode_j_type(mnemonic, rs1, offset)
+        return self.encode_b_type(mnemonic, rs1, rs2, offset)
+    
+    def add_observer(self, observer):
+        self.observers.append(observer)
+    
     def assemble(self, source: str) -> List[int]:
         """Assemble source code and return list of machine code words"""
         lines = source.split('\n')
         
         # First pass: collect labels
         addr = 0
-        for line in lines:
-            result, orig = self.assemble_line(line, addr)
+        for line_no, line in self.expand(lines):
+            try:
+                result, orig = self.assemble_line(line, addr)
+            except ValueError as e:
+                raise ValueError(f"Line {line_no}: {e}") from None
             if result is not None:
                 self.instructions.append((addr, result, orig))
+                self.line_numbers.append(line_no)
                 addr += 4  # Each instruction is 4 bytes
         
         # Second pass: resolve labels and generate final code
         machine_code = []
+        emit = [o.on_emit for o in self.observers]
         for addr, instr, orig in self.instructions:
             if isinstance(instr, tuple):
-                # Branch instruction with label
-                mnemonic, rs1, rs2, label = instr
-                target_addr = self.labels.get(label)
+                # Branch/jump instruction with label
+                target_addr = self.labels.get(instr[3])
                 if target_addr is None:
-                    raise ValueError(f"Undefined label: {label}")
-                offset = target_addr - addr
-                instr = self.encode_b_type(mnemonic, rs1, rs2, offset)
+                    raise ValueError(f"Undefined label: {instr[3]}")
+                instr = self.encode_branch(instr, addr, target_addr)
             
             machine_code.append(instr)
-            print(f"0x{addr:08x}: 0x{instr:08x}  # {orig}")
+            for hook in emit:
+                hook(addr, instr, orig)
         
+        self._resolve_entry()
         return machine_code
     
+    def assemble_stream(self, lines: Iterable[str]) -> array:
+        """Single-pass assembly of lines from a file or any iterator
+        
+        Each line is encoded straight into an array('I') (4 bytes per word)
+        and nothing else is kept per line. A branch to a label that is not
+        defined yet is emitted as a placeholder and backpatched when the
+        label appears. Observers see a forward branch when it is patched.
+        
+        Args:
+            lines: Source lines, e.g. an open file or a code generator
+        
+        Returns:
+            Machine code words
+        """
+        self.code = code = array('I')
+        self.fixups = fixups = {}
+        assemble_line = self.assemble_line
+        labels = self.labels
+        emit = [o.on_emit for o in self.observers]
+        
+        for line_no, line in self.expand(lines):
+            addr = len(code) * 4
+            try:
+                result, orig = assemble_line(line, addr)
+            except ValueError as e:
+                raise ValueError(f"Line {line_no}: {e}") from None
+            if result is None:
+                continue
+            if isinstance(result, tuple):
+                target_addr = labels.get(result[3])
+                if target_addr is None:
+                    fixups.setdefault(result[3], []).append((len(code), result))
+                    code.append(0)
+                    continue
+                result = self.encode_branch(result, addr, target_addr)
+            code.append(result)
+            for hook in emit:
+                hook(addr, result, orig)
+        
+        if fixups:
+            raise ValueError(f"Undefined label: {next(iter(fixups))}")
+        self._resolve_entry()
+        return code
+    
+    def assemble_file(self, filename: str) -> array:
+        """assemble_stream() over a source file, read line by line"""
+        with open(filename, 'r') as f:
+            return self.assemble_stream(f)
+    
+    def _resolve_entry(self):
+        if self.entry_label is not None:
+            if self.entry_label not in self.labels:
+                raise ValueError(f"Undefined entry label: {self.entry_label}")
+            self.entry = self.labels[self.entry_label]
+    
     def write_binary(self, machine_code: List[int], filename: str):
         """Write machine code to binary file"""
         with open(filename, 'wb') as f:
-            for word in machine_code:
-                # Write as little-endian 32-bit words
-                f.write(word.to_bytes(4, byteorder='little'))
+            f.write(_le_words(machine_code))
     
     def write_hex(self, machine_code: List[int], filename: str):
         """Write machine code to hex file (for simulation)"""
         with open(filename, 'w') as f:
             for word in machine_code:
                 f.write(f"{word:08x}\n")
+    
+    def build_image(self, machine_code: List[int]) -> bytes:
+        """Program image: machine code, .data segments, labels and entry point"""
+        def align(offset):
+            return -(-offset // IMAGE_ALIGN) * IMAGE_ALIGN
+        
+        symbols = json.dumps(self.labels).encode()
+        text = _le_words(machine_code)
+        
+        offset = align(IMAGE_HEADER.size + len(self.data) * IMAGE_SEGMENT.size + len(symbols))
+        sections = [(offset, text)]
+        segments = b''
+        for addr, data in self.data:
+            offset = align(offset + len(sections[-1][1]))
+            sections.append((offset, data))
+            segments += IMAGE_SEGMENT.pack(addr, offset, len(data))
+        
+        image = bytearray(align(offset + len(sections[-1][1])))
+        IMAGE_HEADER.pack_into(image, 0, IMAGE_MAGIC, IMAGE_VERSION, self.entry, len(self.data),
+                               len(symbols), sections[0][0], len(text))
+        table = segments + symbols
+        image[IMAGE_HEADER.size:IMAGE_HEADER.size + len(table)] = table
+        for section_offset, section in sections:
+            image[section_offset:section_offset + len(section)] = section
+        return bytes(image)
+    
+    def read_image(self, image: bytes) -> List[int]:
+        """Machine code from a build_image() image; restores labels, .data
+        segments and the entry point"""
+        if image[:8] != IMAGE_MAGIC or len(image) < IMAGE_HEADER.size:
+            raise ValueError("Not a flux program image")
+        magic, version, entry, segments, symbols_len, text_offset, text_size = \
+            IMAGE_HEADER.unpack_from(image)
+        if version != IMAGE_VERSION:
+            raise ValueError(f"Unsupported image version {version} (expected {IMAGE_VERSION})")
+        table = IMAGE_HEADER.size + segments * IMAGE_SEGMENT.size
+        data = [[addr, bytearray(image[offset:offset + size])]
+                for addr, offset, size in IMAGE_SEGMENT.iter_unpack(image[IMAGE_HEADER.size:table])]
+        labels = json.loads(image[table:table + symbols_len])
+        machine_code = list(struct.unpack_from(f'<{text_size // 4}I', image, text_offset))
+        self.data, self.labels, self.entry = data, labels, entry
+        return machine_code
+    
+    def assemble_cached(self, source: str, cache_dir: str = None) -> List[int]:
+        """assemble() through an on-disk cache
+        
+        Entries are program images named by the SHA-256 of ASSEMBLER_VERSION,
+        the assembler's source and the program source. A hit returns the
+        words and restores labels, .data and entry without parsing
+        (observers are not called). A hit does not restore instructions or
+        line_numbers (they are left empty); callers that map PCs back to
+        source lines, like the profiler, use assemble(). A miss assembles
+        and stores the image atomically, so concurrent launches can share
+        the directory.
+        
+        Args:
+            source: Assembly source text
+            cache_dir: Cache directory (default: $FLUX_ASM_CACHE or DEFAULT_CACHE_DIR)
+        """
+        cache_dir = cache_dir or os.environ.get('FLUX_ASM_CACHE') or DEFAULT_CACHE_DIR
+        key = hashlib.sha256(f"{ASSEMBLER_VERSION}\0{_assembler_digest()}\0{source}".encode()).hexdigest()
+        path = os.path.join(cache_dir, f"{key}.img")
+        try:
+            with open(path, 'rb') as f:
+                machine_code = self.read_image(f.read())
+            self.instructions, self.line_numbers = [], []
+            return machine_code
+        except (OSError, ValueError, struct.error):
+            pass  # Miss (or an unreadable entry, which is replaced)
+        
+        machine_code = self.assemble(source)
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_atomic(path, self.build_image(machine_code))
+        return machine_code
+    
+    def assemble_to_image(self, source: str, cached: bool = False) -> bytes:
+        """Assemble source straight to a program image in memory
+        
+        Args:
+            source: Assembly source text
+            cached: Go through assemble_cached()
+        """
+        machine_code = self.assemble_cached(source) if cached else self.assemble(source)
+        return self.build_image(machine_code)
+    
+    def write_image(self, machine_code: List[int], filename: str):
+        """Write a program image (see build_image) for FluxSimulator.load_image"""
+        with open(filename, 'wb') as f:
+            f.write(self.build_image(machine_code))
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python assembler.py <input.s> [output.bin]")
+def expand_sources(patterns: List[str]) -> List[str]:
+    """.s files from directories (every *.s inside), globs and plain paths"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths += sorted(glob.glob(os.path.join(pattern, '*.s')))
+        else:
+            paths += sorted(glob.glob(pattern)) or [pattern]
+    return list(dict.fromkeys(paths))  # Drop duplicates, keep order
+
+def _assemble_job(input_file: str, output_base: str, image: bool) -> Tuple[str, int, int, str]:
+    """Batch worker: assemble one file in a single pass and write its outputs atomically
+    
+    Returns:
+        (input_file, source lines, instructions, error message or None)
+    """
+    try:
+        assembler = FluxAssembler()
+        with open(input_file, 'r') as f:
+            lines = f.read().split('\n')
+        machine_code = assembler.assemble_stream(lines)
+        _write_atomic(f"{output_base}.bin", _le_words(machine_code))
+        _write_atomic(f"{output_base}.hex", ''.join(f"{word:08x}\n" for word in machine_code).encode())
+        if image:
+            _write_atomic(f"{output_base}.img", assembler.build_image(machine_code))
+        return input_file, len(lines), len(machine_code), None
+    except Exception as e:
+        return input_file, 0, 0, str(e)
+
+def assemble_batch(sources: List[str], out_dir: str = None, image: bool = False,
+                   workers: int = None) -> List[Tuple[str, int, int, str]]:
+    """Assemble many files across a process pool
+    
+    Args:
+        sources: .s paths (see expand_sources)
+        out_dir: Output directory (default: next to each source)
+        image: Also write .img program images
+        workers: Worker processes (default: CPU count; 1 runs in-process)
+    
+    Returns:
+        One (input_file, lines, instructions, error) per source, in order
+    
+    Raises:
+        ValueError: Two sources would write the same output files
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = []
+    owners = {}  # Normalized output base -> source writing it
+    for path in sources:
+        base = path.rsplit('.', 1)[0]
+        if out_dir:
+            base = os.path.join(out_dir, os.path.basename(base))
+        key = os.path.normcase(os.path.abspath(base))
+        if key in owners:
+            raise ValueError(f"{owners[key]} and {path} would both write {base}.bin")
+        owners[key] = path
+        jobs.append((path, base, image))
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    
+    if workers == 1 or len(jobs) == 1:
+        return [_assemble_job(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_assemble_job, *zip(*jobs), chunksize=max(1, len(jobs) // (workers * 4))))
+
+def batch_main(args: List[str]):
+    """python assembler.py --batch <dir|glob|file>... [--out DIR] [--workers N] [--image]"""
+    def option(name):
+        if name in args:
+            i = args.index(name)
+            value = args[i + 1]
+            del args[i:i + 2]
+            return value
+        return None
+    
+    out_dir = option('--out')
+    workers = option('--workers')
+    image = '--image' in args
+    sources = expand_sources([a for a in args if not a.startswith('--')])
+    if not sources:
+        print("✗ No .s files found")
         sys.exit(1)
     
-    input_file = sys.argv[1]
-    output_base = sys.argv[2] if len(sys.argv) > 2 else input_file.rsplit('.', 1)[0]
+    start = time.perf_counter()
+    try:
+        results = assemble_batch(sources, out_dir=out_dir, image=image,
+                                 workers=int(workers) if workers else None)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
     
-    with open(input_file, 'r') as f:
-        source = f.read()
+    failed = [(path, error) for path, _, _, error in results if error is not None]
+    for path, error in failed:
+        print(f"✗ {path}: {error}")
+    files = len(results) - len(failed)
+    lines = sum(r[1] for r in results)
+    instructions = sum(r[2] for r in results)
+    print(f"✓ Assembled {files}/{len(results)} files: {lines:,} lines, {instructions:,} instructions "
+          f"in {elapsed:.2f}s ({files / elapsed:,.1f} files/s, {lines / elapsed:,.0f} lines/s)")
+    if failed:
+        sys.exit(1)
+
+def main():
+    if '--batch' in sys.argv:
+        batch_main([a for a in sys.argv[1:] if a != '--batch'])
+        return
+    
+    args = [a for a in sys.argv[1:] if a not in ('--image', '--stream')]
+    if not args:
+        print("Usage: python assembler.py <input.s> [output_base] [--image] [--stream]")
+        print("   or: python assembler.py --batch <dir|glob|file>... [--out DIR] [--workers N] [--image]")
+        print("  --stream: single pass, line by line, no listing (large generated kernels)")
+        sys.exit(1)
+    
+    input_file = args[0]
+    output_base = args[1] if len(args) > 1 else input_file.rsplit('.', 1)[0]
+    image = '--image' in sys.argv
+    stream = '--stream' in sys.argv
     
     assembler = FluxAssembler()
+    if not stream:
+        assembler.add_observer(ListingObserver())
     
     print(f"Assembling {input_file}...")
     print("=" * 60)
     
     try:
-        machine_code = assembler.assemble(source)
+        if stream:
+            machine_code = assembler.assemble_file(input_file)
+        else:
+            with open(input_file, 'r') as f:
+                machine_code = assembler.assemble(f.read())
         
         print("=" * 60)
         print(f"✓ Assembly successful: {len(machine_code)} instructions")
@@ -261,6 +919,9 @@ def main():
         
         print(f"✓ Binary written to: {output_base}.bin")
         print(f"✓ Hex written to: {output_base}.hex")
+        if image:
+            assembler.write_image(machine_code, f"{output_base}.img")
+            print(f"✓ Image written to: {output_base}.img")
         
     except Exception as e:
         print(f"✗ Assembly failed: {e}")
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+flux Program Image Format
+Layout shared by FluxAssembler.build_image and FluxSimulator.load_image
+
+An image is IMAGE_HEADER, one IMAGE_SEGMENT per .data segment, the symbol
+table as JSON, then the text and each data segment at an IMAGE_ALIGN-aligned
+offset (so the loader can use them straight from an mmap).
+"""
+
+import struct
+
+IMAGE_MAGIC = b'FLUXIMG\0'
+IMAGE_VERSION = 1
+IMAGE_HEADER = struct.Struct('<8sIIIIQQ')  # magic, version, entry, segments, symbols len, text off/size
+IMAGE_SEGMENT = struct.Struct('<QQQ')      # load address, file offset, size
+IMAGE_ALIGN = 64
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+flux Memory Access Log
+Records every LOAD/STORE the simulator executes. Requires NumPy.
+
+Accesses are packed into a fixed-size binary ring buffer (one struct per
+access). Without an output directory the log keeps only the most recent
+`capacity` accesses. With one, each full buffer is flushed as a chunk and
+appended column by column to a set of .npy files:
+
+    access_log/step.npy    uint64  simulator step of the access
+    access_log/thread.npy  uint32  thread ID
+    access_log/pc.npy      uint32  PC of the LOAD/STORE
+    access_log/addr.npy    int64   byte address
+    access_log/size.npy    uint32  bytes accessed
+    access_log/write.npy   uint8   1 for STORE, 0 for LOAD
+
+Memory use is bounded by the buffer, however long the run. Each .npy
+file is written with a fixed-size header that close() fills in with the
+final length, so load_access_log() can memory-map it. One .npy per
+column (rather than an .npz archive, which NumPy cannot memory-map)
+lets a notebook read just the columns it needs.
+
+The log is an observer (see observer.py) that records on_mem_access.
+"""
+
+import os
+import struct
+from typing import Dict
+
+import numpy as np
+
+from observer import Observer
+
+# One packed record per access, and the matching NumPy dtype
+RECORD = struct.Struct('<QIIqIB')
+RECORD_DTYPE = np.dtype([('step', '<u8'), ('thread', '<u4'), ('pc', '<u4'),
+                         ('addr', '<i8'), ('size', '<u4'), ('write', 'u1')])
+COLUMNS = RECORD_DTYPE.names
+
+# .npy header size reserved so the final shape can be written in place
+NPY_HEADER_SIZE = 128
+
+
+def _npy_header(dtype: np.dtype, count: int) -> bytes:
+    """Version 1.0 .npy header for a 1-D array, padded to NPY_HEADER_SIZE"""
+    header = f"{{'descr': '{dtype.str}', 'fortran_order': False, 'shape': ({count},), }}"
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+class AccessLog(Observer):
+    def __init__(self, path: str = None, capacity: int = 1 << 16):
+        """
+        Args:
+            path: Output directory for the column files (None: in-memory ring only)
+            capacity: Accesses held in the ring buffer (flush chunk size)
+        """
+        self.path = path
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        self.records = np.frombuffer(self.buffer, dtype=RECORD_DTYPE)
+        self.pos = 0            # next slot in the ring
+        self.wrapped = False    # in-memory ring has overwritten old accesses
+        self.total = 0          # accesses recorded
+        self.flushed = 0        # accesses written to disk
+
+        self._files = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._files = {}
+            for name in COLUMNS:
+                f = open(os.path.join(path, f"{name}.npy"), 'wb')
+                f.write(_npy_header(RECORD_DTYPE[name], 0))
+                self._files[name] = f
+
+    def record(self, step: int, thread: int, pc: int, addr: int, size: int, write: bool):
+        """Append one access"""
+        RECORD.pack_into(self.buffer, self.pos * RECORD.size, step, thread, pc, addr, size, write)
+        self.total += 1
+        self.pos += 1
+        if self.pos == self.capacity:
+            self._wrap()
+
+    def record_many(self, step: int, threads, pc: int, addrs, size: int, write: bool):
+        """Append one access per thread (warp-wide LOAD/STORE)"""
+        n = len(threads)
+        done = 0
+        while done < n:
+            count = min(n - done, self.capacity - self.pos)
+            chunk = self.records[self.pos:self.pos + count]
+            chunk['step'] = step
+            chunk['thread'] = threads[done:done + count]
+            chunk['pc'] = pc
+            chunk['addr'] = addrs[done:done + count]
+            chunk['size'] = size
+            chunk['write'] = write
+            done += count
+            self.total += count
+            self.pos += count
+            if self.pos == self.capacity:
+                self._wrap()
+
+    def on_mem_access(self, sim, thread, pc, addr, size, write):
+        if isinstance(thread, int):
+            self.record(sim.step, thread, pc, addr, size, write)
+        else:
+            self.record_many(sim.step, thread, pc, addr, size, write)
+
+    def _wrap(self):
+        """Buffer full: flush it to disk, or start overwriting the oldest accesses"""
+        if self._files is not None:
+            self.flush()
+        else:
+            self.pos = 0
+            self.wrapped = True
+
+    def flush(self):
+        """Append the buffered accesses to the column files"""
+        if self._files is None or not self.pos:
+            return
+        chunk = self.records[:self.pos]
+        for name, f in self._files.items():
+            f.write(np.ascontiguousarray(chunk[name]).tobytes())
+        self.flushed += self.pos
+        self.pos = 0
+
+    def close(self):
+        """Flush and write the final length into every column header"""
+        if self._files is None:
+            return
+        self.flush()
+        for name, f in self._files.items():
+            f.seek(0)
+            f.write(_npy_header(RECORD_DTYPE[name], self.flushed))
+            f.close()
+        self._files = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def events(self) -> np.ndarray:
+        """Accesses held in the buffer, oldest first (a copy)"""
+        if self.wrapped:
+            return np.concatenate((self.records[self.pos:], self.records[:self.pos]))
+        return self.records[:self.pos].copy()
+
+
+def load_access_log(path: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """Column arrays of a log written by AccessLog (memory-mapped by default)"""
+    mode = 'r' if mmap else None
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in COLUMNS}
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+flux Cache Model
+Set-associative cache hierarchy between the shader core and data memory
+
+Only tags are modelled. Data always lives in FluxSimulator.memory, so
+attaching a hierarchy never changes results, only the statistics and
+the latency of each access. Every level is write-back and
+write-allocate. Dirty victims are written to the next level, and the
+last level writes them to memory.
+
+The default hierarchy follows docs/theory/memory_systems.md: 128-byte
+lines, a 128KB L1 (~30 cycles), a 4MB L2 (~100 cycles) and memory
+(~200 cycles).
+"""
+
+from collections import OrderedDict
+from typing import Dict, List
+
+
+class Cache:
+    """One set-associative cache level"""
+
+    POLICIES = ('lru', 'fifo')
+
+    def __init__(self, name: str, size: int, line_size: int = 128, assoc: int = 4,
+                 policy: str = 'lru', latency: int = 1):
+        """
+        Args:
+            name: Level name used in reports ('L1', 'L2', ...)
+            size: Capacity in bytes
+            line_size: Line size in bytes (power of two)
+            assoc: Ways per set
+            policy: Eviction policy, 'lru' or 'fifo'
+            latency: Hit latency in cycles
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy} (expected one of {self.POLICIES})")
+        if line_size <= 0 or line_size & (line_size - 1):
+            raise ValueError(f"Line size must be a power of two: {line_size}")
+        if size % (line_size * assoc):
+            raise ValueError(f"{name}: size {size} is not a multiple of line_size × assoc")
+
+        self.name = name
+        self.size = size
+        self.line_size = line_size
+        self.assoc = assoc
+        self.policy = policy
+        self.latency = latency
+        self.num_sets = size // (line_size * assoc)
+        self.offset_bits = line_size.bit_length() - 1
+
+        # One OrderedDict per set: line number -> dirty flag. Oldest entry
+        # first; for LRU a hit moves the line to the end.
+        self.sets = [OrderedDict() for _ in range(self.num_sets)]
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            'reads': 0, 'writes': 0,
+            'hits': 0, 'misses': 0,
+            'evictions': 0, 'writebacks': 0,
+        }
+
+    def invalidate(self):
+        """Drop every line (dirty data is already in memory)"""
+        for s in self.sets:
+            s.clear()
+
+    def lookup(self, line: int, write: bool):
+        """Access one line.
+
+        Returns:
+            (hit, victim) where victim is (line, dirty) of the evicted
+            line, or None
+        """
+        stats = self.stats
+        stats['writes' if write else 'reads'] += 1
+        ways = self.sets[line % self.num_sets]
+
+        dirty = ways.get(line)
+        if dirty is not None:
+            stats['hits'] += 1
+            if self.policy == 'lru':
+                ways.move_to_end(line)
+            if write and not dirty:
+                ways[line] = True
+            return True, None
+
+        stats['misses'] += 1
+        victim = None
+        if len(ways) >= self.assoc:
+            victim = ways.popitem(last=False)
+            stats['evictions'] += 1
+            if victim[1]:
+                stats['writebacks'] += 1
+        ways[line] = write
+        return False, victim
+
+
+class CacheHierarchy:
+    """Chain of cache levels in front of memory"""
+
+    def __init__(self, levels: List[Cache], memory_latency: int = 200):
+        """
+        Args:
+            levels: Cache levels, closest to the core first
+            memory_latency: Cycles for an access that misses every level
+        """
+        self.levels = levels
+        self.memory_latency = memory_latency
+        self.memory_stats = {'reads': 0, 'writes': 0}
+        # Latency of the most recent access (read by the timing model)
+        self.last_latency = 0
+
+    @classmethod
+    def default(cls, policy: str = 'lru') -> 'CacheHierarchy':
+        """L1 128KB/4-way + L2 4MB/16-way, 128-byte lines"""
+        return cls([Cache('L1', 128 * 1024, 128, 4, policy, latency=30),
+                    Cache('L2', 4 * 1024 * 1024, 128, 16, policy, latency=100)],
+                   memory_latency=200)
+
+    def access(self, addr: int, size: int = 16, write: bool = False) -> int:
+        """Access size bytes at addr through the hierarchy.
+
+        Returns:
+            Latency in cycles (the slowest line if the access spans lines)
+        """
+        shift = self.levels[0].offset_bits if self.levels else 0
+        latency = 0
+        for line in range(max(addr, 0) >> shift, (max(addr, 0) + size - 1 >> shift) + 1):
+            latency = max(latency, self._access_line(0, line << shift, write))
+        self.last_latency = latency
+        return latency
+
+    def _access_line(self, level: int, addr: int, write: bool) -> int:
+        """Access the line holding addr starting at the given level"""
+        if level == len(self.levels):
+            self.memory_stats['writes' if write else 'reads'] += 1
+            return self.memory_latency
+
+        cache = self.levels[level]
+        hit, victim = cache.lookup(addr >> cache.offset_bits, write)
+        if victim is not None and victim[1]:
+            # Write the dirty victim back to the next level
+            self._access_line(level + 1, victim[0] << cache.offset_bits, True)
+        if hit:
+            return cache.latency
+        # Fill the line from the next level
+        return cache.latency + self._access_line(level + 1, addr, False)
+
+    def reset_stats(self):
+        for cache in self.levels:
+            cache.reset_stats()
+        self.memory_stats = {'reads': 0, 'writes': 0}
+
+    def invalidate(self):
+        for cache in self.levels:
+            cache.invalidate()
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per-level statistics (with hit rate), plus memory traffic"""
+        report = {}
+        for cache in self.levels:
+            s = dict(cache.stats)
+            accesses = s['hits'] + s['misses']
+            s['hit_rate'] = s['hits'] / accesses if accesses else 0.0
+            report[cache.name] = s
+        report['memory'] = dict(self.memory_stats)
+        return report
+
+    def print_stats(self):
+        """Print per-level hit/miss/eviction/writeback counts"""
+        print("\n=== Cache ===")
+        print("Level     Reads    Writes      Hits    Misses  Hit rate  Evictions  Writebacks")
+        for name, s in self.summary().items():
+            if name == 'memory':
+                print(f"{'Memory':<6}{s['reads']:9d} {s['writes']:9d}")
+                continue
+            print(f"{name:<6}{s['reads']:9d} {s['writes']:9d} {s['hits']:9d} {s['misses']:9d}"
+                  f"  {s['hit_rate']:7.1%}  {s['evictions']:9d}  {s['writebacks']:10d}")
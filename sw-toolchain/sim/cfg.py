@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+flux Control-Flow Analysis
+Basic-block discovery over pre-decoded programs
+"""
+
+from typing import List, Tuple
+
+# Mnemonics that end a basic block
+TERMINATORS = {'BEQ', 'BNE', 'JAL', 'JALR', 'HALT'}
+
+
+def block_end(program, start_idx: int) -> int:
+    """Index one past the last instruction of the block starting at start_idx"""
+    idx = start_idx
+    while idx < len(program):
+        idx += 1
+        if program[idx - 1].mnemonic in TERMINATORS:
+            break
+    return idx
+
+
+def branch_target(d, idx: int):
+    """Static target index of a branch/jump at idx, or None if not PC-relative"""
+    if d.mnemonic in ('BEQ', 'BNE'):
+        return idx + d.imm_b // 4
+    if d.mnemonic == 'JAL':
+        return idx + d.imm_j // 4
+    return None
+
+
+def find_blocks(program) -> List[Tuple[int, int]]:
+    """Split a program into basic blocks.
+
+    Returns:
+        Sorted list of (start_idx, end_idx) instruction index ranges
+    """
+    leaders = {0} if program else set()
+    for idx, d in enumerate(program):
+        if d.mnemonic in TERMINATORS:
+            leaders.add(idx + 1)
+            target = branch_target(d, idx)
+            if target is not None:
+                leaders.add(target)
+
+    starts = sorted(i for i in leaders if 0 <= i < len(program))
+    ends = starts[1:] + [len(program)]
+    return list(zip(starts, ends))
+
+
+def successors(program, idx: int, exit_idx: int) -> List[int]:
+    """Static successor indices of instruction idx (exit_idx for HALT/JALR/fall-off)"""
+    d = program[idx]
+    m = d.mnemonic
+    if m in ('HALT', 'JALR'):
+        return [exit_idx]
+    targets = []
+    if m != 'JAL':
+        targets.append(idx + 1)
+    target = branch_target(d, idx)
+    if target is not None:
+        targets.append(target)
+    return [t if 0 <= t < len(program) else exit_idx for t in targets]
+
+
+def immediate_postdominators(program) -> List[int]:
+    """Immediate post-dominator of every instruction.
+
+    Uses the Cooper-Harvey-Kennedy dominator algorithm on the reversed
+    CFG, with a virtual exit node at index len(program). HALT, JALR
+    (unknown target) and falling off the end all lead to the exit.
+
+    Returns:
+        List indexed by instruction; the value is an instruction index,
+        or len(program) when the only post-dominator is the exit
+    """
+    exit_idx = len(program)
+    succs = [successors(program, i, exit_idx) for i in range(exit_idx)]
+    preds = [[] for _ in range(exit_idx + 1)]
+    for i, targets in enumerate(succs):
+        for t in targets:
+            preds[t].append(i)
+
+    # Reverse postorder of the reversed CFG, starting from the exit
+    order = []
+    seen = [False] * (exit_idx + 1)
+    stack = [(exit_idx, iter(preds[exit_idx]))]
+    seen[exit_idx] = True
+    while stack:
+        node, it = stack[-1]
+        for p in it:
+            if not seen[p]:
+                seen[p] = True
+                stack.append((p, iter(preds[p])))
+                break
+        else:
+            order.append(node)
+            stack.pop()
+    order.reverse()
+    rank = {node: i for i, node in enumerate(order)}
+
+    ipdom = [None] * (exit_idx + 1)
+    ipdom[exit_idx] = exit_idx
+    changed = True
+    while changed:
+        changed = False
+        for node in order[1:]:
+            new = None
+            for s in succs[node]:
+                if ipdom[s] is None:
+                    continue
+                if new is None:
+                    new = s
+                    continue
+                a, b = s, new
+                while a != b:
+                    while rank[a] > rank[b]:
+                        a = ipdom[a]
+                    while rank[b] > rank[a]:
+                        b = ipdom[b]
+                new = a
+            if new is not None and ipdom[node] != new:
+                ipdom[node] = new
+                changed = True
+
+    # Nodes that cannot reach the exit (infinite loops) only reconverge at exit
+    return [exit_idx if p is None else p for p in ipdom[:exit_idx]]
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+flux Differential Fuzzer
+Random programs run in the simulator, written as golden vectors for the RTL
+
+Requires NumPy. Two vector files are written, both replayed by
+rtl/test/test_golden_vectors.py:
+
+    simd_alu.bin     one random (op, a, b) per record, for simd_alu
+    shader_core.bin  random straight-line programs, each run over many
+                     random register states, for shader_core
+
+The expected values come from the simulator's warp engine. Every
+program runs over all its instances at once (batch.run_batch), so
+generating millions of checked instructions takes seconds.
+
+Programs only use what shader_core implements the same way as the
+simulator: LOAD, STORE, ADD/SUB/MUL/DIV and HALT. The RTL has no PC, so
+there are no branches, and it broadcasts ADDI's integer immediate as
+FP32 bits, so there is no ADDI. A program loads R1..Rn, runs random
+R-type instructions over them, stores R1..Rn and halts. A DIV by zero
+gives 0.0 in the simulator but inf/NaN in IEEE hardware, so instances
+that divide by zero are dropped.
+
+File format (little-endian):
+    header   HEADER: magic, version, kind, record count, registers
+    simd_alu.bin     ALU_RECORD per record: alu_op, a[4], b[4], result[4]
+    shader_core.bin  per program: PROGRAM (words, instances), the words,
+                     then per instance loads[regs][4] and stores[regs][4]
+FP32 values are stored as their bit patterns, lane 0 first.
+"""
+
+import os
+import struct
+import sys
+import time
+from typing import Tuple
+
+import numpy as np
+
+from batch import run_batch
+from observer import Observer
+
+GOLDEN_MAGIC = b'FLUXGOLD'
+GOLDEN_VERSION = 1
+HEADER = struct.Struct('<8sIIII')      # magic, version, kind, count, regs
+KIND_ALU, KIND_PROGRAM = 1, 2
+
+ALU_RECORD = struct.Struct('<I4I4I4I')  # alu_op, a, b, expected result
+ALU_DTYPE = np.dtype([('op', '<u4'), ('a', '<u4', 4), ('b', '<u4', 4), ('result', '<u4', 4)])
+PROGRAM = struct.Struct('<II')         # words, instances
+
+# simd_alu alu_op codes and R-type encodings (funct7, funct3)
+ALU_OPS = {'ADD': 0, 'SUB': 1, 'MUL': 2, 'DIV': 3}
+R_TYPE = {'ADD': (0x00, 0), 'SUB': (0x20, 0), 'MUL': (0x01, 0), 'DIV': (0x01, 4)}
+
+OUTPUT_BASE = 0x100   # stores of a program go here, loads come from 0
+ADDRESS_SPACE = 0x200
+
+
+def encode_r(mnemonic: str, rd: int, rs1: int, rs2: int) -> int:
+    funct7, funct3 = R_TYPE[mnemonic]
+    return (funct7 << 25) | (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | 0x33
+
+
+def encode_load(rd: int, offset: int) -> int:
+    """LOAD rd, offset(R0)"""
+    return (offset << 20) | (0x2 << 12) | (rd << 7) | 0x03
+
+
+def encode_store(rs2: int, offset: int) -> int:
+    """STORE rs2, offset(R0)"""
+    return ((offset >> 5) << 25) | (rs2 << 20) | (0x2 << 12) | ((offset & 0x1F) << 7) | 0x23
+
+
+HALT = 0x7F
+
+
+def random_floats(rng: np.random.Generator, shape, exponent_range: int = 20) -> np.ndarray:
+    """Finite, nonzero FP32 values with random sign and mantissa and an
+    exponent within exponent_range of 1.0"""
+    sign = rng.integers(0, 2, shape, dtype=np.uint32) << 31
+    exponent = rng.integers(127 - exponent_range, 128 + exponent_range, shape, dtype=np.uint32) << 23
+    mantissa = rng.integers(0, 1 << 23, shape, dtype=np.uint32)
+    return (sign | exponent | mantissa).view(np.float32)
+
+
+def random_program(rng: np.random.Generator, length: int, regs: int) -> np.ndarray:
+    """Load R1..R{regs}, run length random R-type instructions, store, halt
+
+    rs2 always differs from rs1: SUB Rx, Rx would zero a register in every
+    instance, and the next DIV by it would drop them all.
+    """
+    ops = list(R_TYPE)
+    words = [encode_load(r, 16 * (r - 1)) for r in range(1, regs + 1)]
+    op = rng.integers(0, len(ops), length)
+    rd, rs1 = rng.integers(1, regs + 1, (2, length))
+    rs2 = (rs1 - 1 + rng.integers(1, regs, length)) % regs + 1
+    for i in range(length):
+        words.append(encode_r(ops[op[i]], int(rd[i]), int(rs1[i]), int(rs2[i])))
+    words += [encode_store(r, OUTPUT_BASE + 16 * (r - 1)) for r in range(1, regs + 1)]
+    words.append(HALT)
+    return np.array(words, dtype=np.uint32)
+
+
+class ZeroDivisor(Observer):
+    """Flags threads that execute a DIV with a zero divisor lane"""
+
+    def __init__(self, count: int):
+        self.flagged = np.zeros(count, dtype=bool)
+
+    def on_fetch(self, sim, thread, pc, d):
+        if d.mnemonic == 'DIV':
+            divisor = sim.regfile[thread, d.rs2]
+            self.flagged[thread[(divisor == 0).any(axis=1)]] = True
+
+
+def _run(words, loads: np.ndarray, outputs: int, observers=()) -> np.ndarray:
+    """Run words over every row of loads ((N, k) float32 at address 0) and
+    return the first outputs floats stored at OUTPUT_BASE"""
+    with np.errstate(all='ignore'):  # inf/NaN results are golden values too
+        return run_batch([int(w) for w in words], {0: loads}, output=(OUTPUT_BASE, outputs),
+                         address_space=ADDRESS_SPACE, batch_size=len(loads),
+                         max_steps=len(words) + 1, observers=observers)
+
+
+class GoldenWriter:
+    """Streams records into a vector file; the header count is filled in on close"""
+
+    def __init__(self, path: str, kind: int, regs: int = 0):
+        self.kind = kind
+        self.regs = regs
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(GOLDEN_MAGIC, GOLDEN_VERSION, kind, 0, regs))
+
+    def write_alu(self, records: np.ndarray):
+        self._file.write(records.astype(ALU_DTYPE, copy=False).tobytes())
+        self.count += len(records)
+
+    def write_program(self, words: np.ndarray, loads: np.ndarray, stores: np.ndarray):
+        self._file.write(PROGRAM.pack(len(words), len(loads)))
+        self._file.write(words.astype('<u4').tobytes())
+        instances = np.concatenate((loads.view(np.uint32), stores.view(np.uint32)), axis=1)
+        self._file.write(instances.astype('<u4', copy=False).tobytes())
+        self.count += 1
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(HEADER.pack(GOLDEN_MAGIC, GOLDEN_VERSION, self.kind, self.count, self.regs))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def fuzz_alu(path: str, count: int, seed: int = 0, chunk: int = 1 << 16) -> int:
+    """Write count random simd_alu vectors; returns the number written"""
+    rng = np.random.default_rng(seed)
+    ops = list(ALU_OPS)
+    with GoldenWriter(path, KIND_ALU) as out:
+        for first in range(0, count, chunk):
+            n = min(chunk, count - first)
+            records = np.zeros(n, dtype=ALU_DTYPE)
+            op = rng.integers(0, len(ops), n)
+            a = random_floats(rng, (n, 4))
+            b = random_floats(rng, (n, 4))
+            for i, mnemonic in enumerate(ops):
+                rows = np.flatnonzero(op == i)
+                if not len(rows):
+                    continue
+                # LOAD R1, LOAD R2, <op> R3, R1, R2, STORE R3, HALT over every row
+                words = [encode_load(1, 0), encode_load(2, 16), encode_r(mnemonic, 3, 1, 2),
+                         encode_store(3, OUTPUT_BASE), HALT]
+                result = _run(words, np.concatenate((a[rows], b[rows]), axis=1), 4)
+                records['result'][rows] = result.view(np.uint32)
+                records['op'][rows] = ALU_OPS[mnemonic]
+            records['a'] = a.view(np.uint32)
+            records['b'] = b.view(np.uint32)
+            out.write_alu(records)
+        return out.count
+
+
+def fuzz_programs(path: str, programs: int, instances: int = 256, length: int = 32,
+                  regs: int = 8, seed: int = 0) -> Tuple[int, int]:
+    """Write random shader_core programs with golden results
+
+    Returns:
+        (programs, instructions): programs written and the instructions the
+        replay checks (words × instances, summed)
+    """
+    if not 2 <= regs <= 16:
+        raise ValueError(f"regs must be 2..16 (loads/stores fit below {ADDRESS_SPACE:#x}): {regs}")
+    rng = np.random.default_rng(seed)
+    instructions = 0
+    with GoldenWriter(path, KIND_PROGRAM, regs) as out:
+        for _ in range(programs):
+            words = random_program(rng, length, regs)
+            loads = random_floats(rng, (instances, regs * 4))
+            zero_divisor = ZeroDivisor(instances)
+            stores = _run(words, loads, regs * 4, observers=[zero_divisor])
+            keep = ~zero_divisor.flagged
+            out.write_program(words, loads[keep], stores[keep])
+            instructions += len(words) * int(keep.sum())
+        return out.count, instructions
+
+
+def main():
+    """Generate nightly golden vectors: python fuzz.py --out DIR [options]"""
+    def option(name, default):
+        return type(default)(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+    out_dir = option('--out', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                           '..', '..', 'rtl', 'test', 'golden'))
+    alu = option('--alu', 1000000)
+    programs = option('--programs', 1000)
+    instances = option('--instances', 256)
+    length = option('--length', 32)
+    seed = option('--seed', 0)
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    alu_count = fuzz_alu(os.path.join(out_dir, 'simd_alu.bin'), alu, seed=seed)
+    alu_time = time.perf_counter() - start
+    print(f"simd_alu.bin:    {alu_count:,} vectors in {alu_time:.2f}s "
+          f"({alu_count / alu_time:,.0f} vectors/s)")
+
+    start = time.perf_counter()
+    count, instructions = fuzz_programs(os.path.join(out_dir, 'shader_core.bin'), programs,
+                                        instances=instances, length=length, seed=seed)
+    elapsed = time.perf_counter() - start
+    print(f"shader_core.bin: {count:,} programs, {instructions:,} instructions in {elapsed:.2f}s "
+          f"({instructions / elapsed:,.0f} instructions/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+flux Basic-Block Translator
+Compiles straight-line runs of pre-decoded instructions into Python functions
+
+Each block runs from a start PC up to and including the first
+BEQ/BNE/JAL/JALR/HALT. It is translated once into Python source, compiled
+with compile() and cached by start PC in FluxSimulator. A block function
+takes (sim, regs) for one thread and returns the next PC.
+"""
+
+from cfg import TERMINATORS
+
+# Longest block translated in one piece (keeps max_steps granularity sane)
+MAX_BLOCK_LEN = 256
+
+
+class TranslatedBlock:
+    """Compiled basic block"""
+    __slots__ = ('start_pc', 'length', 'fn', 'source')
+
+    def __init__(self, start_pc, length, fn, source):
+        self.start_pc = start_pc
+        self.length = length
+        self.fn = fn
+        self.source = source
+
+
+def _lanes(expr):
+    """Expand a per-lane expression template (uses {i}) into a 4-element list"""
+    return '[' + ', '.join(expr.format(i=i) for i in range(4)) + ']'
+
+
+def _translate(d, pc):
+    """Python statements for one instruction at pc"""
+    m = d.mnemonic
+    rd, rs1, rs2 = d.rd, d.rs1, d.rs2
+
+    if m in ('ADD', 'SUB', 'MUL'):
+        op = {'ADD': '+', 'SUB': '-', 'MUL': '*'}[m]
+        if not rd:
+            return []
+        return [f"a = regs[{rs1}]; b = regs[{rs2}]",
+                f"regs[{rd}] = " + _lanes(f"a[{{i}}] {op} b[{{i}}]")]
+    if m == 'DIV':
+        if not rd:
+            return []
+        return [f"regs[{rd}] = [x / y if y != 0 else 0.0 for x, y in zip(regs[{rs1}], regs[{rs2}])]"]
+    if m == 'RZERO':
+        return [f"regs[{rd}] = [0.0, 0.0, 0.0, 0.0]"] if rd else []
+    if m == 'ADDI':
+        if not rd:
+            return []
+        imm = float(d.imm_i)
+        return [f"a = regs[{rs1}]",
+                f"regs[{rd}] = " + _lanes(f"a[{{i}}] + {imm!r}")]
+    if m == 'LOAD':
+        load = f"read_memory(int(regs[{rs1}][0]) + {d.imm_i})"
+        return [f"regs[{rd}] = {load}" if rd else load]
+    if m == 'STORE':
+        return [f"write_memory(int(regs[{rs1}][0]) + {d.imm_s}, regs[{rs2}])"]
+    if m == 'BEQ':
+        return [f"return {pc + d.imm_b} if regs[{rs1}][0] == regs[{rs2}][0] else {pc + 4}"]
+    if m == 'BNE':
+        return [f"return {pc + d.imm_b} if regs[{rs1}][0] != regs[{rs2}][0] else {pc + 4}"]
+    if m in ('JAL', 'JALR'):
+        target = f"int(regs[{rs1}][0]) + {d.imm_i}" if m == 'JALR' else str(pc + d.imm_j)
+        lines = [f"target = {target}"]
+        if rd:
+            lines.append(f"regs[{rd}] = {_lanes(repr(float(pc + 4)))}")
+        return lines + ["return target"]
+    if m == 'HALT':
+        return ["sim.halted = True", f"return {pc + 4}"]
+    return []  # UNKNOWN: no effect
+
+
+def translate_block(program, start_pc: int) -> TranslatedBlock:
+    """Translate the basic block starting at start_pc"""
+    start_idx = start_pc // 4
+    body = []
+    pc = start_pc
+    idx = start_idx
+    while idx < len(program) and idx - start_idx < MAX_BLOCK_LEN:
+        d = program[idx]
+        body.append(f"# 0x{pc:04x}: {d.mnemonic}")
+        body.extend(_translate(d, pc))
+        pc += 4
+        idx += 1
+        if d.mnemonic in TERMINATORS:
+            break
+    else:
+        # Fell off the block limit or end of program
+        body.append(f"return {pc}")
+
+    source = "\n".join(
+        ["def block(sim, regs):",
+         "    read_memory = sim.read_memory",
+         "    write_memory = sim.write_memory"] +
+        ["    " + line for line in body]) + "\n"
+
+    namespace = {}
+    exec(compile(source, f"<flux block 0x{start_pc:04x}>", "exec"), namespace)
+    return TranslatedBlock(start_pc, idx - start_idx, namespace['block'], source)
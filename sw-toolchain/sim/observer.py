@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+flux Observer API
+Hooks for tracing, profiling and coverage tools
+
+Subclass Observer, override the hooks you need and register it with
+FluxSimulator.add_observer(). A run only calls hooks that a registered
+observer overrides. With no observers (and no timing model), run()
+takes the plain interpreter or block-JIT loop, which has no hook checks
+at all.
+
+Hooks, in the order they fire for one instruction:
+    on_fetch(sim, thread, pc, d)                   before it executes
+    on_mem_access(sim, thread, pc, addr, size, write)   LOAD/STORE, before the access
+    on_branch(sim, thread, pc, d, taken)           BEQ/BNE/JAL/JALR, after it executes
+    on_halt(sim, thread, pc)                       HALT
+    on_retire(sim, thread, pc, d, next_pc)         after it executes
+
+In warp mode, each hook fires once per warp instruction. thread is then
+the array of active thread indices, and addr/taken are per-thread arrays
+aligned with it. sim.step holds the step number of the instruction.
+"""
+
+HOOKS = ('on_fetch', 'on_retire', 'on_mem_access', 'on_branch', 'on_halt')
+
+
+class Observer:
+    """Base class: every hook is a no-op"""
+
+    def on_fetch(self, sim, thread, pc: int, d):
+        pass
+
+    def on_retire(self, sim, thread, pc: int, d, next_pc: int):
+        pass
+
+    def on_mem_access(self, sim, thread, pc: int, addr, size: int, write: bool):
+        pass
+
+    def on_branch(self, sim, thread, pc: int, d, taken):
+        pass
+
+    def on_halt(self, sim, thread, pc: int):
+        pass
+
+
+def hooks(observers, name: str):
+    """Bound hook methods of the observers that override name"""
+    base = getattr(Observer, name)
+    return [getattr(o, name) for o in observers
+            if getattr(type(o), name, base) is not base]
+
+
+class TraceObserver(Observer):
+    """Prints each fetched instruction (the simulator's --verbose output)"""
+
+    def on_fetch(self, sim, thread, pc, d):
+        if isinstance(thread, int):
+            print(f"PC={pc:04x} INSTR={d.word:08x}")
+        else:
+            print(f"PC={pc:04x} INSTR={d.word:08x} ACTIVE={len(thread)}")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+flux Hot-Spot Profiler
+Per-PC execution counts with source-line attribution
+
+Counters live in preallocated arrays indexed by instruction (PC / 4):
+    counts[i]     times instruction i was issued
+    taken[i]      BEQ/BNE at i taken (threads, in warp mode)
+    not_taken[i]  BEQ/BNE at i not taken
+Per-opcode totals are derived from counts when reporting. Given the .s
+file, the report maps every PC back to its source line and prints the
+source with counts in the margin, like `perf annotate`.
+
+The profiler is an observer (see observer.py): register it with
+FluxSimulator(profiler=...) or add_observer().
+"""
+
+import os
+import sys
+from array import array
+from typing import Dict, List
+
+from observer import Observer
+
+BRANCHES = ('BEQ', 'BNE')
+
+# Assembler directory, put on sys.path the first time source_lines() runs
+ASM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'asm')
+
+
+class Profiler(Observer):
+    def __init__(self, size: int = 0):
+        """
+        Args:
+            size: Instructions to preallocate counters for (grown on demand)
+        """
+        self.counts = array('Q')
+        self.taken = array('Q')
+        self.not_taken = array('Q')
+        self.ensure(size)
+
+    def ensure(self, size: int):
+        """Grow the counter arrays to hold at least size instructions"""
+        extra = size - len(self.counts)
+        if extra > 0:
+            zeros = array('Q', bytes(8 * extra))
+            self.counts.extend(zeros)
+            self.taken.extend(zeros)
+            self.not_taken.extend(zeros)
+
+    def on_retire(self, sim, thread, pc, d, next_pc):
+        i = pc >> 2
+        if i >= len(self.counts):
+            self.ensure(len(sim._program()))
+        self.counts[i] += 1
+
+    def on_branch(self, sim, thread, pc, d, taken):
+        if d.mnemonic not in BRANCHES:
+            return
+        i = pc >> 2
+        if i >= len(self.counts):
+            self.ensure(len(sim._program()))
+        if isinstance(thread, int):
+            if taken:
+                self.taken[i] += 1
+            else:
+                self.not_taken[i] += 1
+        else:
+            # Warp mode: taken is per active thread
+            n = int(taken.sum())
+            self.taken[i] += n
+            self.not_taken[i] += len(taken) - n
+
+    def reset(self):
+        for counters in (self.counts, self.taken, self.not_taken):
+            counters[:] = array('Q', bytes(8 * len(counters)))
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def opcode_totals(self, program) -> Dict[str, int]:
+        """Issued instructions per mnemonic, most frequent first"""
+        totals = {}
+        for d, count in zip(program, self.counts):
+            if count:
+                totals[d.mnemonic] = totals.get(d.mnemonic, 0) + count
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+    def hot_spots(self, top: int = 10) -> List[int]:
+        """Instruction indices with the highest counts"""
+        hot = sorted((i for i, c in enumerate(self.counts) if c), key=lambda i: -self.counts[i])
+        return hot[:top]
+
+    def print_report(self, sim, source: str = None, top: int = 10):
+        """Print opcode totals, hottest PCs, branch outcomes and (with the
+        .s file) the annotated source
+
+        Args:
+            sim: Simulator whose program was profiled
+            source: Assembly file the program was built from
+            top: Number of hot PCs to list
+        """
+        program = sim._program()
+        total = self.total
+        lines = source_lines(source) if source else {}
+        pct = lambda n: 100.0 * n / total if total else 0.0
+
+        print("\n=== Profile ===")
+        print(f"Instructions issued: {total}")
+
+        print("\nOpcode     Count  Percent")
+        for mnemonic, count in self.opcode_totals(program).items():
+            print(f"{mnemonic:<6} {count:9d}  {pct(count):6.2f}%")
+
+        print("\nPC      Count  Percent  Instruction")
+        for i in self.hot_spots(top):
+            where = f"  ; line {lines[i][0]}" if i in lines else ''
+            print(f"0x{i * 4:04x} {self.counts[i]:7d}  {pct(self.counts[i]):6.2f}%  "
+                  f"{sim.disassemble(program[i], i * 4)}{where}")
+
+        branches = [i for i, d in enumerate(program[:len(self.counts)])
+                    if d.mnemonic in BRANCHES and self.taken[i] + self.not_taken[i]]
+        if branches:
+            print("\nPC        Taken  Not taken  Taken %")
+            for i in branches:
+                taken, not_taken = self.taken[i], self.not_taken[i]
+                print(f"0x{i * 4:04x} {taken:8d}  {not_taken:9d}  {100.0 * taken / (taken + not_taken):6.1f}%")
+
+        if source:
+            self.print_annotated(source, lines, total)
+
+    def print_annotated(self, source: str, lines: Dict = None, total: int = None):
+        """Print the .s file with each instruction line's share of the profile"""
+        lines = source_lines(source) if lines is None else lines
+        total = self.total if total is None else total
+        by_line = {}
+        for i, (line_no, _) in lines.items():
+            if i < len(self.counts):
+                by_line[line_no] = by_line.get(line_no, 0) + self.counts[i]
+
+        with open(source, 'r') as f:
+            text = f.read().split('\n')
+
+        print(f"\n Percent |    Count | Source: {os.path.basename(source)}")
+        print("---------+----------+" + "-" * 40)
+        for line_no, line in enumerate(text, 1):
+            if line_no == len(text) and not line:
+                break
+            count = by_line.get(line_no)
+            if count is None:
+                print(f"         |          | {line}")
+            else:
+                percent = 100.0 * count / total if total else 0.0
+                print(f"{percent:7.2f}% | {count:8d} | {line}")
+
+
+def source_lines(source: str) -> Dict[int, tuple]:
+    """Map instruction index -> (source line number, text) by assembling source"""
+    if ASM_DIR not in sys.path:
+        sys.path.insert(0, ASM_DIR)
+    from assembler import FluxAssembler
+
+    with open(source, 'r') as f:
+        text = f.read()
+    assembler = FluxAssembler()
+    assembler.assemble(text)
+    return {i: (line_no, orig) for i, ((_, _, orig), line_no)
+            in enumerate(zip(assembler.instructions, assembler.line_numbers))}
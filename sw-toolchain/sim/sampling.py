@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+flux Sampled Simulation
+SimPoint-style cycle estimation for long single-thread runs. Requires NumPy.
+
+1. Profile: a functional run split into fixed-length intervals records
+   each interval's basic-block vector (BBV), i.e. instructions executed
+   per basic block. Loop iterations that do the same work get the same
+   BBV, so a long loop collapses into one phase.
+2. Cluster: k-means over the normalized BBVs groups intervals into
+   phases. The interval closest to each centroid represents its phase.
+3. Sample: from the starting state (restored from a checkpoint), the
+   run fast-forwards with the block JIT. The pipeline/cache timing
+   model only runs for a warm-up window plus each representative
+   interval.
+4. Extrapolate: every interval is charged the CPI of its phase's
+   representative.
+"""
+
+import contextlib
+import os
+import tempfile
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from cfg import find_blocks
+from profiler import Profiler
+from timing import PipelineTiming
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the per-run banners of FluxSimulator.run()"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def collect_bbvs(sim, thread: int, interval: int, max_steps: int):
+    """Run functionally, recording one basic-block vector per interval
+
+    Returns:
+        (bbvs, lengths): (intervals, blocks) array of instruction counts and
+        the number of instructions in each interval
+    """
+    program = sim._program()
+    blocks = find_blocks(program)
+    block_of = np.zeros(len(program), dtype=np.int64)
+    for b, (start, end) in enumerate(blocks):
+        block_of[start:end] = b
+
+    profiler = Profiler(len(program))
+    sim.add_observer(profiler)
+    bbvs, lengths = [], []
+    previous = np.zeros(len(program))
+    total = 0
+    try:
+        with _quiet():
+            while not sim.halted and total < max_steps:
+                before = sim.step
+                sim.run(thread, max_steps=min(interval, max_steps - total))
+                steps = sim.step - before
+                if not steps:
+                    break
+                counts = np.frombuffer(profiler.counts, dtype=np.uint64)[:len(program)].astype(np.float64)
+                bbvs.append(np.bincount(block_of, weights=counts - previous, minlength=len(blocks)))
+                lengths.append(steps)
+                previous = counts
+                total += steps
+    finally:
+        sim.remove_observer(profiler)
+    return np.array(bbvs).reshape(len(bbvs), len(blocks)), lengths
+
+
+def kmeans(points: np.ndarray, k: int, iterations: int = 50, seed: int = 0):
+    """k-means with k-means++ seeding
+
+    Returns:
+        (labels, centroids, sse)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        dist = np.min([((points - c) ** 2).sum(axis=1) for c in centroids], axis=0)
+        if dist.sum() == 0:
+            break
+        centroids.append(points[rng.choice(len(points), p=dist / dist.sum())])
+    centroids = np.array(centroids)
+
+    for _ in range(iterations):
+        dist = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        labels = dist.argmin(axis=1)
+        moved = np.array([points[labels == c].mean(axis=0) if np.any(labels == c) else centroids[c]
+                          for c in range(len(centroids))])
+        if np.allclose(moved, centroids):
+            break
+        centroids = moved
+    dist = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    labels = dist.argmin(axis=1)
+    return labels, centroids, float(dist[np.arange(len(points)), labels].sum())
+
+
+def choose_phases(bbvs: np.ndarray, max_clusters: int = 8, tolerance: float = 0.1):
+    """Cluster intervals into phases and pick one representative per phase
+
+    Uses the smallest k whose clustering error is within tolerance of the
+    error with a single cluster.
+
+    Returns:
+        (labels, representatives): phase of every interval, and the
+        representative interval index of each phase
+    """
+    totals = bbvs.sum(axis=1, keepdims=True)
+    points = bbvs / np.where(totals == 0, 1, totals)
+    labels, centroids, base = kmeans(points, 1)
+    if base > 0:
+        for k in range(2, min(max_clusters, len(points)) + 1):
+            labels, centroids, sse = kmeans(points, k)
+            if sse <= tolerance * base:
+                break
+
+    representatives = []
+    for c in range(len(centroids)):
+        members = np.flatnonzero(labels == c)
+        if len(members):
+            dist = ((points[members] - centroids[c]) ** 2).sum(axis=1)
+            representatives.append(int(members[dist.argmin()]))
+    return labels, representatives
+
+
+def run_sampled(sim, thread: int = 0, interval: int = 10000, warmup: int = 2000,
+                max_clusters: int = 8, max_steps: int = 10 ** 9,
+                timing: Callable[[], PipelineTiming] = PipelineTiming,
+                cache: Callable = None) -> Dict:
+    """Estimate the cycle count of a run by sampled detailed simulation
+
+    Args:
+        sim: Simulator with the program and initial state loaded (scalar mode)
+        thread: Thread to run
+        interval: Instructions per interval
+        warmup: Detailed instructions run before each sample to warm the
+                pipeline and caches (not measured)
+        max_clusters: Upper bound on the number of phases
+        max_steps: Step limit of the whole run
+        timing: Factory for the pipeline timing model of each sample
+        cache: Factory for the cache hierarchy of each sample (None: no cache)
+
+    Returns:
+        Dict with the estimate and the chosen samples. The simulator is
+        left in the state of the completed functional run; its own cache
+        (if any) is detached throughout and its statistics are untouched.
+    """
+    # The caller's cache stays detached for the whole estimate, so neither
+    # the profiling run nor the fast-forwards touch its statistics
+    saved_cache = sim.cache
+    sim.cache = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            start_ckpt = os.path.join(tmp, 'start.ckpt')
+            end_ckpt = os.path.join(tmp, 'end.ckpt')
+            sim.save_checkpoint(start_ckpt)
+
+            # 1-2. Functional profile and phase selection
+            bbvs, lengths = collect_bbvs(sim, thread, interval, max_steps)
+            if not lengths:
+                return {'instructions': 0, 'estimated_cycles': 0, 'estimated_cpi': 0.0, 'samples': []}
+            sim.save_checkpoint(end_ckpt)
+            labels, representatives = choose_phases(bbvs, max_clusters)
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(int)
+
+            # 3. Fast-forward to each sample, simulate it in detail
+            sim.load_checkpoint(start_ckpt)
+            position = 0
+            detailed = 0
+            cpi = {}
+            with _quiet():
+                for rep in sorted(representatives):
+                    start = int(starts[rep])
+                    warm_start = max(position, start - warmup)
+                    sim.cache = None
+                    if warm_start > position:
+                        sim.run(thread, max_steps=warm_start - position, jit=True)
+
+                    model = timing()
+                    sim.cache = cache() if cache is not None else None
+                    if start > warm_start:
+                        sim.run(thread, max_steps=start - warm_start, timing=model)
+                    cycles, instructions = model.stats['cycles'], model.stats['instructions']
+                    sim.run(thread, max_steps=lengths[rep], timing=model)
+                    measured = model.stats['instructions'] - instructions
+                    cpi[rep] = (model.stats['cycles'] - cycles) / measured if measured else 0.0
+                    detailed += model.stats['instructions']
+                    position = start + lengths[rep]
+
+            # Leave the simulator as the full functional run left it
+            sim.load_checkpoint(end_ckpt)
+    finally:
+        sim.cache = saved_cache
+
+    # 4. Extrapolate: every interval at its phase representative's CPI
+    phase_cpi = {int(labels[rep]): cpi[rep] for rep in representatives}
+    estimated = sum(length * phase_cpi[int(label)] for length, label in zip(lengths, labels))
+    total = int(sum(lengths))
+    weights = np.bincount(labels, weights=lengths) / total
+    samples: List[Dict] = [{
+        'interval': rep, 'start': int(starts[rep]), 'length': lengths[rep],
+        'phase': int(labels[rep]), 'weight': float(weights[labels[rep]]), 'cpi': cpi[rep],
+    } for rep in sorted(representatives)]
+
+    result = {
+        'instructions': total,
+        'intervals': len(lengths),
+        'phases': len(representatives),
+        'detailed_instructions': detailed,
+        'estimated_cycles': int(round(estimated)),
+        'estimated_cpi': estimated / total,
+        'samples': samples,
+    }
+    sim.stats['estimated_cycles'] = result['estimated_cycles']
+    return result
@@ -4,20 +4,112 @@
 Software model of the shader core for rapid testing
 """
 
+import asyncio
+import os
 import sys
+import json
+import mmap
 import struct
+import tempfile
+from array import array
 from typing import List, Dict
 
+# The program image format is shared with the assembler
+ASM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'asm')
+if ASM_DIR not in sys.path:
+    sys.path.append(ASM_DIR)
+from imageformat import IMAGE_MAGIC, IMAGE_VERSION, IMAGE_HEADER, IMAGE_SEGMENT
+
+# FP32 memory accessors
+FP32 = struct.Struct('f')
+FP32X4 = struct.Struct('4f')
+
+# Mnemonic lookup used by the decoder (see FluxSimulator.HANDLERS)
+OPCODES = {
+    0x13: 'ADDI', 0x03: 'LOAD', 0x23: 'STORE',
+    0x6F: 'JAL', 0x67: 'JALR', 0x7F: 'HALT',
+}
+R_TYPE_OPS = {  # (funct3, funct7) -> mnemonic
+    (0, 0x00): 'ADD', (0, 0x20): 'SUB', (0, 0x01): 'MUL', (4, 0x01): 'DIV',
+}
+BRANCH_OPS = {0: 'BEQ', 1: 'BNE'}  # funct3 -> mnemonic
+BRANCH_MNEMONICS = ('BEQ', 'BNE', 'JAL', 'JALR')  # on_branch hook
+
+# Checkpoint file: prefix, JSON state, then the memory image at a
+# page-aligned offset (so restore can mmap it) and the register file
+CHECKPOINT_MAGIC = b'FLUXCKPT'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_PREFIX = struct.Struct('<8sIIQQQ')  # magic, version, state len, mem off/size, regs off
+CHECKPOINT_CHUNK = 1 << 20
+
+
+def _words(data) -> array:
+    """Little-endian 32-bit words from a bytes-like object"""
+    words = array('I')
+    words.frombytes(data)
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+class DecodedInstr:
+    """Instruction decoded once at load time, with its pre-bound handler"""
+    __slots__ = ('word', 'opcode', 'rd', 'rs1', 'rs2', 'funct3', 'funct7',
+                 'imm_i', 'imm_s', 'imm_b', 'imm_j', 'mnemonic', 'handler')
+
+class InstructionMemory(list):
+    """Instruction word list that counts rewrites, so decode/JIT caches can be invalidated"""
+    def __init__(self, words=()):
+        super().__init__(words)
+        self.version = 0
+
+def _mutator(name):
+    method = getattr(list, name)
+    def wrapper(self, *args):
+        self.version += 1
+        return method(self, *args)
+    wrapper.__name__ = name
+    return wrapper
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', 'append', 'extend',
+              'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(InstructionMemory, _name, _mutator(_name))
+
 class FluxSimulator:
-    def __init__(self, num_threads=32, num_regs=32):
+    def __init__(self, num_threads=32, num_regs=32, warp_mode=False,
+                 memory_size=64 * 1024, strict_memory=False, cache=None, access_log=None,
+                 profiler=None):
+        """
+        Args:
+            num_threads: Threads (one warp)
+            num_regs: Registers per thread
+            warp_mode: Run all threads in lockstep with NumPy (see run_warp)
+            memory_size: Data memory size in bytes (up to multiple GB)
+            strict_memory: Raise IndexError on out-of-bounds accesses
+                           instead of reading 0.0 / dropping writes
+            cache: cache.CacheHierarchy that every LOAD/STORE goes through
+                   (statistics and latency only)
+            access_log: accesslog.AccessLog that records every LOAD/STORE
+            profiler: profiler.Profiler that counts every issued instruction
+                      (both are registered as observers)
+        """
         self.num_threads = num_threads
         self.num_regs = num_regs
         
         # Register file: [thread][reg] = [lane0, lane1, lane2, lane3] (4× FP32)
-        self.regfile = [[[0.0] * 4 for _ in range(num_regs)] for _ in range(num_threads)]
+        # (in warp mode, the WarpEngine creates it as one NumPy array)
+        self.regfile = None if warp_mode else [[[0.0] * 4 for _ in range(num_regs)]
+                                               for _ in range(num_threads)]
+        
+        # Memory: anonymous mmap, so the OS only backs pages once they are
+        # touched. Also exposed as an FP32 view (mem_f32).
+        self.memory = mmap.mmap(-1, memory_size)
+        self.strict_memory = strict_memory
+        self.cache = cache
+        self.access_log = access_log
+        self.profiler = profiler
         
-        # Memory (simplified, 64KB)
-        self.memory = bytearray(64 * 1024)
+        # Observers (see observer.py); none means no hook overhead at all
+        self.observers = [o for o in (access_log, profiler) if o is not None]
         
         # Program counter per thread
         self.pc = [0] * num_threads
@@ -25,71 +117,209 @@ def __init__(self, num_threads=32, num_regs=32):
         # Execution mask (for divergence)
         self.exec_mask = [True] * num_threads
         
-        # Instruction memory
-        self.instructions = []
+        # Instruction memory (raw words), its pre-decoded form and translated blocks
+        self._instructions = InstructionMemory()
+        self._decoded = None
+        self._decoded_version = -1
+        self._blocks = {}
+        self._blocks_version = -1
+        
+        # Label -> address and data segments (address, size) from the last load_image()
+        self.symbols = {}
+        self.segments = []
         
         # Halted flag
         self.halted = False
         
+        # Steps (instructions issued, including HALT) over all runs
+        self.step = 0
+        
         # Statistics
         self.stats = {
             'instructions_executed': 0,
             'memory_reads': 0,
             'memory_writes': 0,
         }
+        
+        # Warp mode: NumPy register file, all threads run in lockstep
+        self.warp = None
+        if warp_mode:
+            from warp import WarpEngine
+            self.warp = WarpEngine(self)
+    
+    @property
+    def instructions(self) -> List[int]:
+        """Instruction memory (raw 32-bit words)"""
+        return self._instructions
+    
+    @instructions.setter
+    def instructions(self, words: List[int]):
+        self._instructions = InstructionMemory(words)
+        # The new list's version restarts at 0, so drop caches keyed by it
+        self._decoded = None
+        self._blocks = {}
+        self._blocks_version = -1
     
     def load_program(self, filename: str):
         """Load program from hex file"""
         with open(filename, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    self.instructions.append(int(line, 16))
+            self.instructions.extend([int(word, 16) for word in f.read().split()])
+        self._program()
         print(f"Loaded {len(self.instructions)} instructions")
     
     def load_binary(self, filename: str):
         """Load program from binary file"""
         with open(filename, 'rb') as f:
             data = f.read()
-            for i in range(0, len(data), 4):
-                word = int.from_bytes(data[i:i+4], byteorder='little')
-                self.instructions.append(word)
+        self.instructions.extend(_words(data + bytes(-len(data) % 4)))
+        self._program()
         print(f"Loaded {len(self.instructions)} instructions")
     
+    def load_image(self, filename: str) -> Dict[str, int]:
+        """Load a program image file: text into instruction memory, data
+        segments into memory, PCs set to the entry point
+        
+        The file is mapped, not read: each section is one slice copy.
+        
+        Returns:
+            Symbol table (label -> address), also kept in self.symbols
+        
+        Raises:
+            ValueError: Not an image, or a data segment that is not whole
+                        FP32 words or does not fit in memory_size
+        """
+        with open(filename, 'rb') as f:
+            header = f.read(IMAGE_HEADER.size)
+            if len(header) < IMAGE_HEADER.size or header[:8] != IMAGE_MAGIC:
+                raise ValueError(f"Not a flux program image: {filename}")
+            image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return self.load_image_bytes(image)
+        finally:
+            image.close()
+    
+    def load_image_bytes(self, image) -> Dict[str, int]:
+        """load_image() from memory (bytes, bytearray, mmap), e.g. the output
+        of FluxAssembler.assemble_to_image()"""
+        view = memoryview(image)
+        try:
+            if len(view) < IMAGE_HEADER.size or view[:8] != IMAGE_MAGIC:
+                raise ValueError("Not a flux program image")
+            magic, version, entry, segments, symbols_len, text_offset, text_size = \
+                IMAGE_HEADER.unpack_from(view)
+            if version != IMAGE_VERSION:
+                raise ValueError(f"Unsupported image version {version} (expected {IMAGE_VERSION})")
+            table = IMAGE_HEADER.size + segments * IMAGE_SEGMENT.size
+            entries = list(IMAGE_SEGMENT.iter_unpack(view[IMAGE_HEADER.size:table]))
+            for addr, _, size in entries:
+                if size % 4:
+                    raise ValueError(f"Data segment at {addr:#x} is {size} bytes, not a multiple of 4")
+                if addr + size > self._memory_size:
+                    raise ValueError(f"Data segment {addr:#x}-{addr + size:#x} does not fit in "
+                                     f"{self._memory_size} bytes of memory")
+            self.instructions = _words(view[text_offset:text_offset + text_size])
+            for addr, offset, size in entries:
+                self.init_memory(addr, view[offset:offset + size])
+            self.segments = [(addr, size) for addr, _, size in entries]
+            self.symbols = json.loads(bytes(view[table:table + symbols_len]))
+        finally:
+            view.release()
+        
+        self.pc = [entry] * self.num_threads
+        self._program()
+        return self.symbols
+    
     def decode(self, instr: int) -> Dict:
         """Decode instruction"""
-        opcode = instr & 0x7F
-        rd = (instr >> 7) & 0x1F
-        funct3 = (instr >> 12) & 0x7
-        rs1 = (instr >> 15) & 0x1F
-        rs2 = (instr >> 20) & 0x1F
-        funct7 = (instr >> 25) & 0x7F
+        d = self.predecode(instr)
+        return {
+            'opcode': d.opcode,
+            'rd': d.rd, 'rs1': d.rs1, 'rs2': d.rs2,
+            'funct3': d.funct3, 'funct7': d.funct7,
+            'imm_i': d.imm_i, 'imm_s': d.imm_s, 'imm_b': d.imm_b,
+            'imm_j': d.imm_j
+        }
+    
+    def predecode(self, instr: int) -> 'DecodedInstr':
+        """Decode instruction once into a DecodedInstr with its handler"""
+        d = DecodedInstr()
+        d.word = instr
+        d.opcode = opcode = instr & 0x7F
+        d.rd = (instr >> 7) & 0x1F
+        d.funct3 = funct3 = (instr >> 12) & 0x7
+        d.rs1 = (instr >> 15) & 0x1F
+        d.rs2 = (instr >> 20) & 0x1F
+        d.funct7 = funct7 = (instr >> 25) & 0x7F
         
         # I-type immediate (sign-extended)
-        imm_i = (instr >> 20)
-        if imm_i & 0x800:  # Sign bit
-            imm_i |= 0xFFFFF000
-        imm_i = struct.unpack('i', struct.pack('I', imm_i & 0xFFFFFFFF))[0]
+        imm_i = (instr >> 20) & 0xFFF
+        d.imm_i = imm_i - 0x1000 if imm_i & 0x800 else imm_i
         
         # S-type immediate
-        imm_s = ((instr >> 25) << 5) | ((instr >> 7) & 0x1F)
-        if imm_s & 0x800:
-            imm_s |= 0xFFFFF000
-        imm_s = struct.unpack('i', struct.pack('I', imm_s & 0xFFFFFFFF))[0]
+        imm_s = (((instr >> 25) & 0x7F) << 5) | ((instr >> 7) & 0x1F)
+        d.imm_s = imm_s - 0x1000 if imm_s & 0x800 else imm_s
         
         # B-type immediate
         imm_b = (((instr >> 31) & 1) << 12) | (((instr >> 7) & 1) << 11) | \
                 (((instr >> 25) & 0x3F) << 5) | (((instr >> 8) & 0xF) << 1)
-        if imm_b & 0x1000:
-            imm_b |= 0xFFFFE000
-        imm_b = struct.unpack('i', struct.pack('I', imm_b & 0xFFFFFFFF))[0]
+        d.imm_b = imm_b - 0x2000 if imm_b & 0x1000 else imm_b
         
-        return {
-            'opcode': opcode,
-            'rd': rd, 'rs1': rs1, 'rs2': rs2,
-            'funct3': funct3, 'funct7': funct7,
-            'imm_i': imm_i, 'imm_s': imm_s, 'imm_b': imm_b
-        }
+        # J-type immediate
+        imm_j = (((instr >> 31) & 1) << 20) | (((instr >> 12) & 0xFF) << 12) | \
+                (((instr >> 20) & 1) << 11) | (((instr >> 21) & 0x3FF) << 1)
+        d.imm_j = imm_j - 0x200000 if imm_j & 0x100000 else imm_j
+        
+        # Dispatch: resolve mnemonic and handler once
+        if opcode == 0x33:
+            d.mnemonic = R_TYPE_OPS.get((funct3, funct7), 'RZERO')
+        elif opcode == 0x63:
+            d.mnemonic = BRANCH_OPS.get(funct3, 'UNKNOWN')
+        else:
+            d.mnemonic = OPCODES.get(opcode, 'UNKNOWN')
+        d.handler = self.HANDLERS[d.mnemonic]
+        return d
+    
+    def disassemble(self, d: 'DecodedInstr', pc: int = None) -> str:
+        """Assembly text of a decoded instruction (branch targets absolute if pc given)"""
+        m = d.mnemonic
+        if m in ('ADD', 'SUB', 'MUL', 'DIV'):
+            return f"{m} R{d.rd}, R{d.rs1}, R{d.rs2}"
+        if m == 'ADDI':
+            return f"ADDI R{d.rd}, R{d.rs1}, {d.imm_i}"
+        if m == 'LOAD':
+            return f"LOAD R{d.rd}, {d.imm_i}(R{d.rs1})"
+        if m == 'STORE':
+            return f"STORE R{d.rs2}, {d.imm_s}(R{d.rs1})"
+        if m in ('BEQ', 'BNE'):
+            target = f"0x{pc + d.imm_b:04x}" if pc is not None else f"{d.imm_b:+d}"
+            return f"{m} R{d.rs1}, R{d.rs2}, {target}"
+        if m == 'JAL':
+            target = f"0x{pc + d.imm_j:04x}" if pc is not None else f"{d.imm_j:+d}"
+            return f"JAL R{d.rd}, {target}"
+        if m == 'JALR':
+            return f"JALR R{d.rd}, R{d.rs1}, {d.imm_i}"
+        if m == 'HALT':
+            return "HALT"
+        return f".word 0x{d.word:08x}"
+    
+    def _program(self) -> List['DecodedInstr']:
+        """Pre-decoded instruction memory, rebuilt if instructions changed"""
+        words = self._instructions
+        if self._decoded is None or self._decoded_version != words.version:
+            # Decode each distinct word once; entries are read-only, so
+            # repeated words share one DecodedInstr
+            predecode = self.predecode
+            unique = {}
+            self._decoded = [unique.get(w) or unique.setdefault(w, predecode(w)) for w in words]
+            self._decoded_version = words.version
+        return self._decoded
+    
+    def _translated_blocks(self) -> Dict:
+        """Translated block cache (start PC -> TranslatedBlock), emptied on rewrite"""
+        if self._blocks_version != self._instructions.version:
+            self._blocks = {}
+            self._blocks_version = self._instructions.version
+        return self._blocks
     
     def read_reg(self, thread: int, reg: int) -> List[float]:
         """Read register value"""
@@ -102,130 +332,521 @@ def write_reg(self, thread: int, reg: int, value: List[float]):
         if reg != 0:  # R0 is read-only
             self.regfile[thread][reg] = value.copy()
     
+    @property
+    def memory(self):
+        """Simulator data memory (any writable buffer: bytearray, mmap, shared memory)"""
+        return self._memory
+    
+    @memory.setter
+    def memory(self, buf):
+        self._memory = buf
+        self._memory_size = len(buf)
+        # Zero-copy FP32 view used by LOAD/STORE (trailing partial word excluded)
+        self.mem_f32 = memoryview(buf).cast('B')[:len(buf) // 4 * 4].cast('f')
+    
     def read_memory(self, addr: int) -> List[float]:
         """Read 4× FP32 from memory"""
-        result = []
-        for i in range(4):
-            offset = addr + i * 4
-            if offset + 4 <= len(self.memory):
-                raw = self.memory[offset:offset+4]
-                val = struct.unpack('f', bytes(raw))[0]
-                result.append(val)
-            else:
-                result.append(0.0)
+        if self.cache is not None:
+            self.cache.access(addr, 16, False)
+        if not addr & 3 and 0 <= addr <= self._memory_size - 16:
+            i = addr >> 2
+            result = self.mem_f32[i:i+4].tolist()
+        else:
+            # Unaligned or partly out of range: per lane, missing lanes read 0.0
+            self._check_bounds(addr)
+            result = []
+            for i in range(4):
+                offset = addr + i * 4
+                if 0 <= offset <= self._memory_size - 4:
+                    result.append(FP32.unpack_from(self._memory, offset)[0])
+                else:
+                    result.append(0.0)
         self.stats['memory_reads'] += 1
         return result
     
     def write_memory(self, addr: int, value: List[float]):
         """Write 4× FP32 to memory"""
-        for i in range(4):
-            offset = addr + i * 4
-            if offset + 4 <= len(self.memory):
-                raw = struct.pack('f', value[i])
-                self.memory[offset:offset+4] = raw
+        if self.cache is not None:
+            self.cache.access(addr, 16, True)
+        if 0 <= addr <= self._memory_size - 16:
+            FP32X4.pack_into(self._memory, addr, *value)
+        else:
+            self._check_bounds(addr)
+            for i in range(4):
+                offset = addr + i * 4
+                if 0 <= offset <= self._memory_size - 4:
+                    FP32.pack_into(self._memory, offset, value[i])
         self.stats['memory_writes'] += 1
     
-    def init_memory(self, addr: int, values: List[float]):
-        """Initialize memory with test data"""
-        for i, val in enumerate(values):
-            offset = addr + i * 4
-            if offset + 4 <= len(self.memory):
-                raw = struct.pack('f', val)
-                self.memory[offset:offset+4] = raw
+    def _check_bounds(self, addr: int, size: int = 16):
+        """Fault on out-of-bounds access when strict_memory is set"""
+        if self.strict_memory and not 0 <= addr <= self._memory_size - size:
+            raise IndexError(f"Memory access out of bounds: {addr:#x} "
+                             f"(+{size} bytes, memory size {self._memory_size:#x})")
+    
+    def init_memory(self, addr: int, values):
+        """Initialize memory with test data
+        
+        Args:
+            addr: Start address
+            values: List of floats, a float32 NumPy array / array('f'), or raw bytes
+        """
+        try:
+            view = memoryview(values)
+        except TypeError:
+            view = None
+        if view is None or view.format not in ('f', 'B', 'b', 'c') or not view.c_contiguous:
+            view = memoryview(array('f', values))
+        raw = view.cast('B')
+        self._check_bounds(addr, len(raw))
+        
+        # Whole FP32 words that fit in memory, as one slice copy
+        count = max(0, min(len(raw), self._memory_size - addr)) // 4 * 4
+        self._memory[addr:addr+count] = raw[:count]
+    
+    def save_checkpoint(self, path: str):
+        """Save registers, memory, PCs, masks, program and stats to a file
+        
+        All-zero 1MB chunks of memory are left as holes, so a mostly
+        untouched multi-GB memory gives a small (sparse) file.
+        Attached cache/access_log/profiler models are not saved.
+        """
+        warp = self.warp
+        state = {
+            'num_threads': self.num_threads,
+            'num_regs': self.num_regs,
+            'warp_mode': warp is not None,
+            'strict_memory': self.strict_memory,
+            'pc': [int(pc) for pc in self.pc],
+            'exec_mask': [bool(m) for m in self.exec_mask],
+            'halted': self.halted,
+            'step': self.step,
+            'stats': self.stats,
+            'instructions': list(self._instructions),
+        }
+        if warp is not None:
+            regs = warp.regfile_bytes()
+            state['warp'] = warp.get_state()
+        else:
+            regs = array('d', (v for thread in self.regfile for reg in thread for v in reg)).tobytes()
+        
+        header = json.dumps(state).encode()
+        granularity = mmap.ALLOCATIONGRANULARITY
+        mem_offset = -(-(CHECKPOINT_PREFIX.size + len(header)) // granularity) * granularity
+        mem_size = self._memory_size
+        regs_offset = mem_offset + mem_size
+        
+        memory = self._memory
+        zeros = bytes(CHECKPOINT_CHUNK)
+        # Written to a temporary file and renamed: memory may be mapped from
+        # the checkpoint being replaced (load_checkpoint), so it must not be
+        # truncated while it is read
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(CHECKPOINT_PREFIX.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(header),
+                                               mem_offset, mem_size, regs_offset))
+                f.write(header)
+                for offset in range(0, mem_size, CHECKPOINT_CHUNK):
+                    chunk = memory[offset:offset + CHECKPOINT_CHUNK]
+                    if chunk != zeros[:len(chunk)]:
+                        f.seek(mem_offset + offset)
+                        f.write(chunk)
+                f.seek(regs_offset)
+                f.write(regs)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    
+    def load_checkpoint(self, path: str):
+        """Restore the state saved by save_checkpoint()
+        
+        Memory is mapped copy-on-write from the file, so restoring does not
+        depend on the memory size. Pages are read only when touched and
+        writes never reach the checkpoint.
+        """
+        with open(path, 'rb') as f:
+            magic, version, header_len, mem_offset, mem_size, regs_offset = \
+                CHECKPOINT_PREFIX.unpack(f.read(CHECKPOINT_PREFIX.size))
+            if magic != CHECKPOINT_MAGIC:
+                raise ValueError(f"Not a flux checkpoint: {path}")
+            if version != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported checkpoint version {version} (expected {CHECKPOINT_VERSION})")
+            state = json.loads(f.read(header_len))
+            f.seek(regs_offset)
+            regs = f.read()
+            memory = mmap.mmap(f.fileno(), mem_size, access=mmap.ACCESS_COPY,
+                               offset=mem_offset) if mem_size else bytearray()
+        
+        self.num_threads = state['num_threads']
+        self.num_regs = state['num_regs']
+        self.strict_memory = state['strict_memory']
+        self.memory = memory
+        self.instructions = state['instructions']
+        self.pc = state['pc']
+        self.halted = state['halted']
+        self.step = state['step']
+        self.stats = state['stats']
+        
+        if state['warp_mode']:
+            if self.warp is None or self.warp.regfile_shape() != (self.num_threads, self.num_regs, 4):
+                from warp import WarpEngine
+                self.warp = WarpEngine(self)
+            self.warp.set_state(state['warp'], regs, state['exec_mask'])
+        else:
+            self.warp = None
+            values = array('d', regs)
+            self.regfile = [[values[(t * self.num_regs + r) * 4:(t * self.num_regs + r + 1) * 4].tolist()
+                             for r in range(self.num_regs)] for t in range(self.num_threads)]
+            self.exec_mask = state['exec_mask']
+    
+    # === Instruction handlers (one per mnemonic, see HANDLERS) ===
+    
+    def _op_add(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        a, b = regs[d.rs1], regs[d.rs2]
+        if d.rd:
+            regs[d.rd] = [a[0] + b[0], a[1] + b[1], a[2] + b[2], a[3] + b[3]]
+    
+    def _op_sub(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        a, b = regs[d.rs1], regs[d.rs2]
+        if d.rd:
+            regs[d.rd] = [a[0] - b[0], a[1] - b[1], a[2] - b[2], a[3] - b[3]]
+    
+    def _op_mul(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        a, b = regs[d.rs1], regs[d.rs2]
+        if d.rd:
+            regs[d.rd] = [a[0] * b[0], a[1] * b[1], a[2] * b[2], a[3] * b[3]]
+    
+    def _op_div(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        if d.rd:
+            regs[d.rd] = [a / b if b != 0 else 0.0 for a, b in zip(regs[d.rs1], regs[d.rs2])]
+    
+    def _op_rzero(self, thread: int, d: 'DecodedInstr'):
+        # Unknown R-type function: result is zero
+        if d.rd:
+            self.regfile[thread][d.rd] = [0.0] * 4
+    
+    def _op_addi(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        if d.rd:
+            imm = float(d.imm_i)
+            a = regs[d.rs1]
+            regs[d.rd] = [a[0] + imm, a[1] + imm, a[2] + imm, a[3] + imm]
+    
+    def _op_load(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        addr = int(regs[d.rs1][0]) + d.imm_i  # Use lane 0 for address
+        result = self.read_memory(addr)
+        if d.rd:
+            regs[d.rd] = result
+    
+    def _op_store(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        addr = int(regs[d.rs1][0]) + d.imm_s
+        self.write_memory(addr, regs[d.rs2])
+    
+    def _op_beq(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        if regs[d.rs1][0] == regs[d.rs2][0]:  # Compare lane 0
+            self.pc[thread] += d.imm_b - 4  # -4 because we auto-increment
+    
+    def _op_bne(self, thread: int, d: 'DecodedInstr'):
+        regs = self.regfile[thread]
+        if regs[d.rs1][0] != regs[d.rs2][0]:
+            self.pc[thread] += d.imm_b - 4
+    
+    def _op_jal(self, thread: int, d: 'DecodedInstr'):
+        pc = self.pc[thread]
+        if d.rd:
+            link = float(pc + 4)
+            self.regfile[thread][d.rd] = [link, link, link, link]
+        self.pc[thread] = pc + d.imm_j - 4
+    
+    def _op_jalr(self, thread: int, d: 'DecodedInstr'):
+        pc = self.pc[thread]
+        target = int(self.regfile[thread][d.rs1][0]) + d.imm_i
+        if d.rd:
+            link = float(pc + 4)
+            self.regfile[thread][d.rd] = [link, link, link, link]
+        self.pc[thread] = target - 4
+    
+    def _op_halt(self, thread: int, d: 'DecodedInstr'):
+        self.halted = True
+    
+    def _op_unknown(self, thread: int, d: 'DecodedInstr'):
+        pass
+    
+    HANDLERS = {
+        'ADD': _op_add, 'SUB': _op_sub, 'MUL': _op_mul, 'DIV': _op_div,
+        'RZERO': _op_rzero,
+        'ADDI': _op_addi,
+        'LOAD': _op_load, 'STORE': _op_store,
+        'BEQ': _op_beq, 'BNE': _op_bne,
+        'JAL': _op_jal, 'JALR': _op_jalr,
+        'HALT': _op_halt, 'UNKNOWN': _op_unknown,
+    }
     
     def execute_instruction(self, thread: int, instr: int):
-        """Execute single instruction for one thread"""
-        d = self.decode(instr)
+        """Execute single instruction for one thread (decodes on every call)"""
+        d = self.predecode(instr)
+        d.handler(self, thread, d)
+        if d.mnemonic != 'HALT':
+            self.stats['instructions_executed'] += 1
+    
+    def add_observer(self, observer: 'Observer'):
+        """Register an observer.Observer for all following runs"""
+        self.observers.append(observer)
+    
+    def remove_observer(self, observer: 'Observer'):
+        self.observers.remove(observer)
+    
+    def run(self, thread: int = 0, max_steps: int = 1000, verbose: bool = False,
+            jit: bool = False, timing: 'PipelineTiming' = None):
+        """Run simulation for single thread
         
-        # R-type instructions
-        if d['opcode'] == 0x33:
-            rs1_val = self.read_reg(thread, d['rs1'])
-            rs2_val = self.read_reg(thread, d['rs2'])
+        Args:
+            verbose: Print every instruction (an observer.TraceObserver)
+            jit: Execute translated basic blocks instead of single
+                 instructions (ignored while any observer is attached)
+            timing: timing.PipelineTiming model fed every executed
+                    instruction for this run; adds stats['cycles']
+        """
+        print(f"\n=== Running thread {thread} ===")
+        steps = self._run_steps(thread, max_steps, verbose, jit, timing)
+        
+        if self.halted:
+            print(f"✓ Program halted after {steps} instructions")
+        else:
+            print(f"⚠ Reached max steps ({max_steps})")
+    
+    async def run_async(self, thread: int = 0, max_steps: int = 1000, verbose: bool = False,
+                        jit: bool = False, timing: 'PipelineTiming' = None,
+                        yield_every: int = 10000, progress=None) -> int:
+        """Run like run(), yielding to the asyncio event loop every
+        yield_every instructions
+        
+        Cancelling the task stops the run at the next yield, between two
+        instructions. The simulator is left consistent and a later run()
+        or run_async() resumes from there.
+        
+        Args:
+            yield_every: Instructions between yields
+            progress: Called as progress(sim, steps) after every chunk
+        
+        Returns:
+            Instructions issued (including HALT)
+        """
+        print(f"\n=== Running thread {thread} ===")
+        steps = 0
+        while steps < max_steps and not self.halted:
+            chunk = min(yield_every, max_steps - steps)
+            done = self._run_steps(thread, chunk, verbose, jit, timing)
+            steps += done
+            if progress is not None:
+                progress(self, steps)
+            if done < chunk:
+                break  # Halted or ran off the program
+            await asyncio.sleep(0)
+        
+        if self.halted:
+            print(f"✓ Program halted after {steps} instructions")
+        else:
+            print(f"⚠ Reached max steps ({max_steps})")
+        return steps
+    
+    def _run_steps(self, thread: int, max_steps: int, verbose: bool = False,
+                   jit: bool = False, timing: 'PipelineTiming' = None) -> int:
+        """Execute up to max_steps instructions and update step/stats"""
+        observers = self.observers
+        if verbose:
+            from observer import TraceObserver
+            observers = [TraceObserver()] + observers
+        if timing is not None:
+            observers = observers + [timing]
+            cycles = timing.stats['cycles']
+        
+        # Handlers read R0 like any other register and never write it, so
+        # undo direct register file writes (checkpoints, drivers) to R0
+        self.regfile[thread][0] = [0.0, 0.0, 0.0, 0.0]
+        start_step = self.step
+        if observers:
+            steps = self._run_observed(thread, max_steps, observers)
+        elif jit:
+            steps = self._run_blocks(thread, max_steps)
+        else:
+            steps = self._run_interp(thread, max_steps)
+        self.step = start_step + steps
+        
+        if timing is not None:
+            self.stats['cycles'] = self.stats.get('cycles', 0) + timing.stats['cycles'] - cycles
+        
+        # HALT retires but is not counted as an executed instruction
+        self.stats['instructions_executed'] += steps - 1 if steps and self.halted else steps
+        return steps
+    
+    def _run_interp(self, thread: int, max_steps: int) -> int:
+        """Interpreter loop: one pre-decoded instruction per step"""
+        program = self._program()
+        num_instrs = len(program)
+        pcs = self.pc
+        
+        steps = 0
+        while not self.halted and steps < max_steps:
+            pc_idx = pcs[thread] // 4
             
-            if d['funct3'] == 0 and d['funct7'] == 0:  # ADD
-                result = [a + b for a, b in zip(rs1_val, rs2_val)]
-            elif d['funct3'] == 0 and d['funct7'] == 0x20:  # SUB
-                result = [a - b for a, b in zip(rs1_val, rs2_val)]
-            elif d['funct3'] == 0 and d['funct7'] == 0x01:  # MUL
-                result = [a * b for a, b in zip(rs1_val, rs2_val)]
-            elif d['funct3'] == 4 and d['funct7'] == 0x01:  # DIV
-                result = [a / b if b != 0 else 0.0 for a, b in zip(rs1_val, rs2_val)]
-            else:
-                result = [0.0] * 4
+            if pc_idx >= num_instrs:
+                break
             
-            self.write_reg(thread, d['rd'], result)
-        
-        # I-type (ADDI)
-        elif d['opcode'] == 0x13:
-            rs1_val = self.read_reg(thread, d['rs1'])
-            imm_float = float(d['imm_i'])
-            result = [a + imm_float for a in rs1_val]
-            self.write_reg(thread, d['rd'], result)
-        
-        # LOAD
-        elif d['opcode'] == 0x03:
-            rs1_val = self.read_reg(thread, d['rs1'])
-            addr = int(rs1_val[0]) + d['imm_i']  # Use lane 0 for address
-            result = self.read_memory(addr)
-            self.write_reg(thread, d['rd'], result)
-        
-        # STORE
-        elif d['opcode'] == 0x23:
-            rs1_val = self.read_reg(thread, d['rs1'])
-            rs2_val = self.read_reg(thread, d['rs2'])
-            addr = int(rs1_val[0]) + d['imm_s']
-            self.write_memory(addr, rs2_val)
-        
-        # BEQ
-        elif d['opcode'] == 0x63 and d['funct3'] == 0:
-            rs1_val = self.read_reg(thread, d['rs1'])[0]  # Compare lane 0
-            rs2_val = self.read_reg(thread, d['rs2'])[0]
-            if rs1_val == rs2_val:
-                self.pc[thread] += d['imm_b'] - 4  # -4 because we auto-increment
-        
-        # BNE
-        elif d['opcode'] == 0x63 and d['funct3'] == 1:
-            rs1_val = self.read_reg(thread, d['rs1'])[0]
-            rs2_val = self.read_reg(thread, d['rs2'])[0]
-            if rs1_val != rs2_val:
-                self.pc[thread] += d['imm_b'] - 4
-        
-        # HALT
-        elif d['opcode'] == 0x7F:
-            self.halted = True
-            return
-        
-        self.stats['instructions_executed'] += 1
-    
-    def run(self, thread: int = 0, max_steps: int = 1000, verbose: bool = False):
-        """Run simulation for single thread"""
-        print(f"\n=== Running thread {thread} ===")
+            d = program[pc_idx]
+            d.handler(self, thread, d)
+            
+            pcs[thread] += 4
+            steps += 1
+        
+        return steps
+    
+    def _run_observed(self, thread: int, max_steps: int, observers) -> int:
+        """Interpreter loop that calls the observers' hooks and keeps
+        self.step current; only overridden hooks are called"""
+        from observer import hooks
+        
+        program = self._program()
+        num_instrs = len(program)
+        pcs = self.pc
+        regs = self.regfile[thread]
+        start_step = self.step
+        
+        fetch = hooks(observers, 'on_fetch')
+        retire = hooks(observers, 'on_retire')
+        mem_access = hooks(observers, 'on_mem_access')
+        branch = hooks(observers, 'on_branch')
+        halt = hooks(observers, 'on_halt')
         
         steps = 0
         while not self.halted and steps < max_steps:
-            pc_addr = self.pc[thread]
-            pc_idx = pc_addr // 4
+            pc = pcs[thread]
+            pc_idx = pc // 4
             
-            if pc_idx >= len(self.instructions):
+            if pc_idx >= num_instrs:
                 break
             
-            instr = self.instructions[pc_idx]
+            d = program[pc_idx]
+            m = d.mnemonic
+            self.step = start_step + steps
             
-            if verbose:
-                print(f"PC={pc_addr:04x} INSTR={instr:08x}", end="")
-                
-            self.execute_instruction(thread, instr)
+            for hook in fetch:
+                hook(self, thread, pc, d)
+            if mem_access and (m == 'LOAD' or m == 'STORE'):
+                write = m == 'STORE'
+                addr = int(regs[d.rs1][0]) + (d.imm_s if write else d.imm_i)
+                for hook in mem_access:
+                    hook(self, thread, pc, addr, 16, write)
             
-            if verbose:
-                print()
+            d.handler(self, thread, d)
             
-            self.pc[thread] += 4
+            pcs[thread] += 4
+            next_pc = pcs[thread]
+            if branch and m in BRANCH_MNEMONICS:
+                for hook in branch:
+                    hook(self, thread, pc, d, next_pc != pc + 4)
+            if halt and m == 'HALT':
+                for hook in halt:
+                    hook(self, thread, pc)
+            for hook in retire:
+                hook(self, thread, pc, d, next_pc)
             steps += 1
         
+        return steps
+    
+    def _run_blocks(self, thread: int, max_steps: int) -> int:
+        """Block loop: run whole translated basic blocks, interpreting only
+        when fewer than a block's worth of steps remain"""
+        from jit import translate_block
+        
+        program = self._program()
+        blocks = self._translated_blocks()
+        num_instrs = len(program)
+        pcs = self.pc
+        regs = self.regfile[thread]
+        
+        steps = 0
+        while not self.halted and steps < max_steps:
+            pc = pcs[thread]
+            pc_idx = pc // 4
+            
+            if pc_idx >= num_instrs:
+                break
+            
+            block = blocks.get(pc)
+            if block is None and pc_idx >= 0:
+                block = blocks[pc] = translate_block(program, pc)
+            
+            if block is not None and block.length <= max_steps - steps:
+                pcs[thread] = block.fn(self, regs)
+                steps += block.length
+            else:
+                d = program[pc_idx]
+                d.handler(self, thread, d)
+                pcs[thread] += 4
+                steps += 1
+        
+        return steps
+    
+    def run_sampled(self, thread: int = 0, interval: int = 10000, **kwargs) -> Dict:
+        """Estimate cycles of a long run by sampled detailed simulation
+        (see sampling.run_sampled for the arguments); sets stats['estimated_cycles']"""
+        from sampling import run_sampled
+        
+        print(f"\n=== Sampling thread {thread} ===")
+        result = run_sampled(self, thread, interval, **kwargs)
+        print(f"✓ {result['instructions']} instructions, {result.get('phases', 0)} phases, "
+              f"{result.get('detailed_instructions', 0)} simulated in detail")
+        return result
+    
+    def run_warp(self, max_steps: int = 1000, verbose: bool = False):
+        """Run simulation for all threads in exec_mask in lockstep (warp mode)"""
+        if self.warp is None:
+            raise RuntimeError("run_warp() requires FluxSimulator(warp_mode=True)")
+        
+        active = sum(1 for m in self.exec_mask if m)
+        print(f"\n=== Running warp ({active}/{self.num_threads} threads) ===")
+        
+        steps = self.warp.run(max_steps=max_steps, verbose=verbose)
+        
         if self.halted:
-            print(f"✓ Program halted after {steps} instructions")
+            print(f"✓ Warp halted after {steps} instructions")
+        else:
+            print(f"⚠ Reached max steps ({max_steps})")
+    
+    async def run_warp_async(self, max_steps: int = 1000, verbose: bool = False,
+                             yield_every: int = 1000, progress=None) -> int:
+        """run_warp() that yields to the asyncio event loop every
+        yield_every warp instructions (see run_async)"""
+        if self.warp is None:
+            raise RuntimeError("run_warp_async() requires FluxSimulator(warp_mode=True)")
+        
+        active = sum(1 for m in self.exec_mask if m)
+        print(f"\n=== Running warp ({active}/{self.num_threads} threads) ===")
+        
+        steps = 0
+        while steps < max_steps:
+            steps += self.warp.run(max_steps=min(yield_every, max_steps - steps), verbose=verbose)
+            if progress is not None:
+                progress(self, steps)
+            if not self.warp.stack:
+                break  # Every thread halted or ran off the program
+            await asyncio.sleep(0)
+        
+        if self.halted:
+            print(f"✓ Warp halted after {steps} instructions")
         else:
             print(f"⚠ Reached max steps ({max_steps})")
+        return steps
     
     def print_registers(self, thread: int = 0, show_all: bool = False):
         """Print register contents"""
@@ -238,10 +859,15 @@ def print_registers(self, thread: int = 0, show_all: bool = False):
     def print_memory(self, start: int, count: int = 16):
         """Print memory contents"""
         print(f"\n=== Memory (0x{start:04x} - 0x{start+count*4-1:04x}) ===")
-        for i in range(0, count, 4):
-            addr = start + i * 4
-            values = self.read_memory(addr)
-            print(f"0x{addr:04x}: [{values[0]:8.2f}, {values[1]:8.2f}, {values[2]:8.2f}, {values[3]:8.2f}]")
+        # Detach the cache model so display reads do not show up in its stats
+        cache, self.cache = self.cache, None
+        try:
+            for i in range(0, count, 4):
+                addr = start + i * 4
+                values = self.read_memory(addr)
+                print(f"0x{addr:04x}: [{values[0]:8.2f}, {values[1]:8.2f}, {values[2]:8.2f}, {values[3]:8.2f}]")
+        finally:
+            self.cache = cache
     
     def print_stats(self):
         """Print execution statistics"""
@@ -249,41 +875,118 @@ def print_stats(self):
         print(f"Instructions executed: {self.stats['instructions_executed']}")
         print(f"Memory reads:          {self.stats['memory_reads']}")
         print(f"Memory writes:         {self.stats['memory_writes']}")
+        if 'cycles' in self.stats:
+            print(f"Cycles:                {self.stats['cycles']}")
+        if 'estimated_cycles' in self.stats:
+            print(f"Cycles (estimated):    {self.stats['estimated_cycles']}")
+        
+        if self.warp is not None and self.warp.branch_stats:
+            print("\n=== Branch Divergence ===")
+            print("PC      Executed  Divergent  Serialized  Reconverge")
+            for pc, b in sorted(self.warp.branch_stats.items()):
+                rpc = 'exit' if b['reconverge_pc'] < 0 else f"0x{b['reconverge_pc']:04x}"
+                print(f"0x{pc:04x}  {b['executed']:8d}  {b['divergent']:9d}  {b['serialized']:10d}  {rpc}")
+        
+        if self.warp is not None and self.warp.coalescing:
+            from warp import coalescing_summary
+            print("\n=== Memory Coalescing ===")
+            print("PC      Instr  Requests  Trans/Req  Efficiency")
+            for pc, c in sorted(coalescing_summary(self.warp.coalescing).items()):
+                print(f"0x{pc:04x}  {c['mnemonic']:<5}  {c['requests']:8d}  "
+                      f"{c['transactions_per_request']:9.2f}  {c['efficiency']:10.1%}")
+        
+        if self.cache is not None:
+            self.cache.print_stats()
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python simulator.py <program.hex> [--verbose]")
-        print("   or: python simulator.py <program.bin> [--verbose]")
+        print("Usage: python simulator.py <program.hex> [--verbose] [--warp] [--jit]")
+        print("   or: python simulator.py <program.bin> [--verbose] [--warp] [--jit]")
+        print("   or: python simulator.py <program.img> [--verbose] [--warp] [--jit]")
+        print("       [--timing] [--trace trace.json] [--cache [lru|fifo]] [--access-log DIR]")
+        print("       [--profile [program.s]] [--sample [interval]]")
         sys.exit(1)
     
     program_file = sys.argv[1]
     verbose = '--verbose' in sys.argv or '-v' in sys.argv
+    warp_mode = '--warp' in sys.argv
+    jit = '--jit' in sys.argv
+    trace = sys.argv[sys.argv.index('--trace') + 1] if '--trace' in sys.argv else None
+    timing = None
+    if '--timing' in sys.argv or trace:
+        from timing import PipelineTiming
+        timing = PipelineTiming(trace=trace)
+    
+    cache = None
+    if '--cache' in sys.argv:
+        from cache import CacheHierarchy
+        i = sys.argv.index('--cache') + 1
+        policy = sys.argv[i] if i < len(sys.argv) and sys.argv[i] in ('lru', 'fifo') else 'lru'
+        cache = CacheHierarchy.default(policy)
+    
+    access_log = None
+    if '--access-log' in sys.argv:
+        from accesslog import AccessLog
+        access_log = AccessLog(sys.argv[sys.argv.index('--access-log') + 1])
+    
+    profiler = None
+    source = None
+    if '--profile' in sys.argv:
+        from profiler import Profiler
+        profiler = Profiler()
+        i = sys.argv.index('--profile') + 1
+        if i < len(sys.argv) and sys.argv[i].endswith('.s'):
+            source = sys.argv[i]
+        elif os.path.exists(program_file.rsplit('.', 1)[0] + '.s'):
+            source = program_file.rsplit('.', 1)[0] + '.s'
     
     # Create simulator
-    sim = FluxSimulator()
+    sim = FluxSimulator(warp_mode=warp_mode, cache=cache, access_log=access_log,
+                        profiler=profiler)
     
     # Load program
+    image = program_file.endswith('.img')
     if program_file.endswith('.hex'):
         sim.load_program(program_file)
     elif program_file.endswith('.bin'):
         sim.load_binary(program_file)
+    elif image:
+        sim.load_image(program_file)
+        print(f"Loaded {len(sim.instructions)} instructions, "
+              f"{sum(size for _, size in sim.segments)} data bytes")
     else:
-        print("Error: File must be .hex or .bin")
+        print("Error: File must be .hex, .bin or .img")
         sys.exit(1)
     
-    # Initialize test data (example for vecadd)
+    # Initialize test data (example for vecadd; an image brings its own)
     # A = [1.0, 2.0, 3.0, 4.0] at 0x1000
     # B = [5.0, 6.0, 7.0, 8.0] at 0x2000
-    sim.init_memory(0x1000, [1.0, 2.0, 3.0, 4.0])
-    sim.init_memory(0x2000, [5.0, 6.0, 7.0, 8.0])
+    if not image:
+        sim.init_memory(0x1000, [1.0, 2.0, 3.0, 4.0])
+        sim.init_memory(0x2000, [5.0, 6.0, 7.0, 8.0])
     
-    # Set base addresses in registers
-    sim.write_reg(0, 10, [0x1000, 0, 0, 0])  # R10 = &A
-    sim.write_reg(0, 11, [0x2000, 0, 0, 0])  # R11 = &B
-    sim.write_reg(0, 12, [0x3000, 0, 0, 0])  # R12 = &C
+    # Set base addresses in registers (every thread in warp mode)
+    threads = range(sim.num_threads) if warp_mode else [0]
+    for t in threads:
+        sim.write_reg(t, 10, [0x1000, 0, 0, 0])  # R10 = &A
+        sim.write_reg(t, 11, [0x2000, 0, 0, 0])  # R11 = &B
+        sim.write_reg(t, 12, [0x3000, 0, 0, 0])  # R12 = &C
     
     # Run simulation
-    sim.run(thread=0, verbose=verbose)
+    if warp_mode:
+        sim.run_warp(verbose=verbose)
+    elif '--sample' in sys.argv:
+        i = sys.argv.index('--sample') + 1
+        interval = int(sys.argv[i]) if i < len(sys.argv) and sys.argv[i].isdigit() else 10000
+        sim.run_sampled(thread=0, interval=interval,
+                        cache=CacheHierarchy.default if cache is not None else None)
+    else:
+        sim.run(thread=0, verbose=verbose, jit=jit, timing=timing)
+        if timing is not None:
+            timing.close()
+    
+    if access_log is not None:
+        access_log.close()
     
     # Print results
     sim.print_registers(thread=0)
@@ -298,6 +1001,17 @@ def main():
     sim.print_memory(0x3000, count=4)
     
     sim.print_stats()
+    if timing is not None:
+        t = timing.summary()
+        print(f"CPI:                   {t['cpi']:.2f}")
+        print(f"Data stall cycles:     {t['data_stall_cycles']}")
+        print(f"Control stall cycles:  {t['control_stall_cycles']}")
+        if trace:
+            print(f"Pipeline trace:        {trace}")
+    if profiler is not None:
+        profiler.print_report(sim, source=source)
+    if access_log is not None:
+        print(f"Access log:            {access_log.path} ({access_log.total} accesses)")
 
 if __name__ == "__main__":
     main()
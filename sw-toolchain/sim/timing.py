@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+flux Pipeline Timing Model
+Cycle-level model of the in-order Fetch→Decode→Execute→Memory→Writeback pipeline
+
+The model is trace-driven. The simulator executes each instruction as
+usual and then hands it to PipelineTiming.retire() (its on_retire
+observer hook), which works out the cycle it enters each stage:
+
+- Every stage holds one instruction. An instruction leaves a stage only
+  when the next stage is free, so a stall backs up the stages behind it.
+- ALU results are forwarded at the end of EXEC and LOAD results at the end
+  of MEM. A consumer waits in DECODE until its operands are ready, which
+  is the load-use hazard. STORE data is only needed on entering MEM.
+- Branches and jumps resolve at the end of EXEC. Not-taken is predicted,
+  so a taken branch delays the next fetch until it resolves.
+
+With a trace file, one record per stage per cycle is written in the
+format of docs/notebooks/pipeline_trace.md:
+    {"cycle": 3, "stage": "EXEC", "instr": "ADD R3, R1, R2", "threadId": 0}
+Stall cycles carry "stall": true. Records are written in cycle order as
+soon as no later instruction can produce an earlier cycle, so only the
+instructions in flight are buffered.
+"""
+
+import heapq
+import json
+from typing import Dict
+
+from observer import Observer
+
+STAGES = ('FETCH', 'DECODE', 'EXEC', 'MEM', 'WB')
+FETCH, DECODE, EXEC, MEM, WB = range(5)
+
+# Source registers read in EXEC, per mnemonic (STORE data is read in MEM)
+EXEC_SOURCES = {
+    'ADD': ('rs1', 'rs2'), 'SUB': ('rs1', 'rs2'), 'MUL': ('rs1', 'rs2'),
+    'DIV': ('rs1', 'rs2'), 'ADDI': ('rs1',), 'LOAD': ('rs1',),
+    'STORE': ('rs1',), 'BEQ': ('rs1', 'rs2'), 'BNE': ('rs1', 'rs2'),
+    'JALR': ('rs1',),
+}
+
+# Mnemonics that write rd
+WRITES_RD = {'ADD', 'SUB', 'MUL', 'DIV', 'RZERO', 'ADDI', 'LOAD', 'JAL', 'JALR'}
+
+
+class PipelineTiming(Observer):
+    def __init__(self, alu_latency: int = 1, mul_latency: int = 3, div_latency: int = 10,
+                 mem_latency: int = 2, trace=None):
+        """
+        Args:
+            alu_latency: EXEC cycles for ADD/SUB/ADDI and branches
+            mul_latency: EXEC cycles for MUL
+            div_latency: EXEC cycles for DIV
+            mem_latency: MEM cycles for LOAD/STORE (1 for other instructions);
+                         replaced by the access latency when the simulator
+                         has a cache hierarchy
+            trace: Path or text file object for the JSON trace (None: no trace)
+        """
+        self.exec_latency = {'MUL': mul_latency, 'DIV': div_latency}
+        self.alu_latency = alu_latency
+        self.mem_latency = mem_latency
+
+        # Cycle each stage becomes free (when its last instruction moved on)
+        self.free = [0] * 5
+        # Earliest cycle of the next fetch
+        self.fetch_ready = 0
+        # Cycle each register's pending result can be forwarded
+        self.reg_ready = {}
+
+        self.stats = {
+            'cycles': 0,
+            'instructions': 0,
+            'data_stall_cycles': 0,
+            'control_stall_cycles': 0,
+        }
+
+        # Trace output (incremental JSON array)
+        self._owns_trace = isinstance(trace, str)
+        self._trace = open(trace, 'w') if self._owns_trace else trace
+        self._pending = []  # heap of (cycle, seq, record)
+        self._seq = 0
+        self._first_record = True
+        self._text = {}  # pc -> JSON-encoded disassembly
+        if self._trace is not None:
+            self._trace.write('[')
+
+    def retire(self, sim, thread: int, pc: int, d, next_pc: int):
+        """Account for one executed instruction
+
+        Args:
+            sim: Simulator (used for disassembly in the trace)
+            thread: Thread ID
+            pc: Address of the instruction
+            d: Its DecodedInstr
+            next_pc: PC after it executed (differs from pc+4 when taken)
+        """
+        free = self.free
+        reg_ready = self.reg_ready
+        m = d.mnemonic
+
+        f = max(self.fetch_ready, free[FETCH])
+        dec = max(f + 1, free[DECODE])
+
+        # Operand readiness (forwarding into EXEC)
+        ex_free = max(dec + 1, free[EXEC])
+        ex = ex_free
+        for field in EXEC_SOURCES.get(m, ()):
+            reg = getattr(d, field)
+            if reg:
+                ex = max(ex, reg_ready.get(reg, 0))
+        self.stats['data_stall_cycles'] += ex - ex_free
+        ex_lat = self.exec_latency.get(m, self.alu_latency)
+
+        mem = max(ex + ex_lat, free[MEM])
+        if m == 'STORE' and d.rs2:
+            stall_start = mem
+            mem = max(mem, reg_ready.get(d.rs2, 0))
+            self.stats['data_stall_cycles'] += mem - stall_start
+        mem_lat = 1
+        if m in ('LOAD', 'STORE'):
+            # Latency of this access from the cache model, if one is attached
+            mem_lat = sim.cache.last_latency if sim.cache is not None else self.mem_latency
+
+        wb = max(mem + mem_lat, free[WB])
+        end = wb + 1
+
+        enter = (f, dec, ex, mem, wb)
+        free[FETCH], free[DECODE], free[EXEC], free[MEM], free[WB] = dec, ex, mem, wb, end
+
+        if m in WRITES_RD and d.rd:
+            reg_ready[d.rd] = mem + mem_lat if m == 'LOAD' else ex + ex_lat
+
+        # Taken branch/jump: the next fetch waits for the branch to resolve
+        if next_pc != pc + 4:
+            self.fetch_ready = ex + ex_lat
+            self.stats['control_stall_cycles'] += ex + ex_lat - (f + 1)
+        else:
+            self.fetch_ready = f + 1
+
+        self.stats['instructions'] += 1
+        self.stats['cycles'] = max(self.stats['cycles'], end)
+
+        if self._trace is not None:
+            self._record(sim, thread, pc, d, enter, (dec, ex, mem, wb, end),
+                         (1, 1, ex_lat, mem_lat, 1))
+
+    on_retire = retire
+
+    def _record(self, sim, thread, pc, d, enter, leave, latency):
+        """Queue this instruction's per-cycle records and flush finished cycles"""
+        text = self._text.get(pc)
+        if text is None:
+            text = self._text[pc] = json.dumps(sim.disassemble(d, pc))
+
+        pending = self._pending
+        for stage in range(5):
+            busy_until = enter[stage] + latency[stage]
+            for cycle in range(enter[stage], leave[stage]):
+                stall = ', "stall": true' if cycle >= busy_until else ''
+                record = (f'{{"cycle": {cycle}, "stage": "{STAGES[stage]}", '
+                          f'"instr": {text}, "threadId": {thread}{stall}}}')
+                heapq.heappush(pending, (cycle, self._seq, record))
+                self._seq += 1
+
+        # Later instructions are fetched no earlier than this one
+        self._flush(enter[FETCH])
+
+    def _flush(self, before_cycle=None):
+        """Write queued records for cycles before before_cycle (all if None)"""
+        pending = self._pending
+        out = []
+        while pending and (before_cycle is None or pending[0][0] < before_cycle):
+            out.append(heapq.heappop(pending)[2])
+        if not out:
+            return
+        sep = '\n  ' if self._first_record else ',\n  '
+        self._first_record = False
+        self._trace.write(sep + ',\n  '.join(out))
+
+    def close(self):
+        """Write any queued records and terminate the JSON array"""
+        if self._trace is None:
+            return
+        self._flush()
+        self._trace.write('\n]\n')
+        if self._owns_trace:
+            self._trace.close()
+        else:
+            self._trace.flush()
+        self._trace = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def summary(self) -> Dict:
+        """Cycle statistics, including CPI"""
+        s = dict(self.stats)
+        s['cpi'] = s['cycles'] / s['instructions'] if s['instructions'] else 0.0
+        return s
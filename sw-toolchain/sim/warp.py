@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+flux Warp Execution Engine
+Lockstep model of a whole warp for the flux simulator
+
+The register file is held as a single (num_threads, num_regs, 4) float32
+array and every instruction is applied to all threads at once, gated by
+the execution mask. Requires NumPy.
+"""
+
+import numpy as np
+
+from cfg import immediate_postdominators
+from observer import TraceObserver, hooks
+
+LANES = np.arange(4)
+
+# Reconvergence PC for paths that only rejoin at exit (HALT)
+EXIT_PC = -1
+
+# Register values are clamped to +/- this before becoming addresses, so a
+# huge float is simply out of range instead of overflowing int64
+ADDRESS_CLAMP = float(1 << 62)
+
+# Memory transaction size for coalescing (ISA spec, "Coalescing")
+SEGMENT_SIZE = 128
+SEGMENT_SHIFT = SEGMENT_SIZE.bit_length() - 1
+
+
+def coalescing_summary(coalescing):
+    """Add transactions per request and efficiency (bytes requested /
+    bytes transferred) to per-PC coalescing counters"""
+    report = {}
+    for pc, c in coalescing.items():
+        c = dict(c)
+        c['transactions_per_request'] = c['transactions'] / c['requests'] if c['requests'] else 0.0
+        moved = c['transactions'] * SEGMENT_SIZE
+        c['efficiency'] = c['bytes_requested'] / moved if moved else 1.0
+        report[pc] = c
+    return report
+
+
+class StackEntry:
+    """SIMT reconvergence stack entry: run mask from pc until rpc"""
+    __slots__ = ('pc', 'rpc', 'mask', 'branch_pc')
+
+    def __init__(self, pc, rpc, mask, branch_pc=None):
+        self.pc = pc
+        self.rpc = rpc
+        self.mask = mask
+        self.branch_pc = branch_pc
+
+
+class WarpEngine:
+    def __init__(self, sim):
+        self.sim = sim
+
+        # Register file: [thread, reg, lane] (4× FP32 per register)
+        sim.regfile = np.zeros((sim.num_threads, sim.num_regs, 4), dtype=np.float32)
+
+        # Execution mask: one bool per thread
+        sim.exec_mask = np.ones(sim.num_threads, dtype=bool)
+
+        # PC of the instruction being executed (top of the SIMT stack)
+        self.pc = 0
+
+        # SIMT reconvergence stack (empty when no launch is in flight)
+        self.stack = []
+        self.done = np.zeros(sim.num_threads, dtype=bool)
+        self.halted_threads = np.zeros(sim.num_threads, dtype=bool)
+        self.launch_mask = None
+
+        # Per-branch divergence statistics: pc -> counters
+        self.branch_stats = {}
+
+        # Per-LOAD/STORE coalescing statistics: pc -> counters
+        self.coalescing = {}
+
+        # Private address spaces (batch.py): thread t's address a maps to
+        # address_base[t] + a, for 0 <= a < address_limit. None: shared memory.
+        self.address_base = None
+        self.address_limit = 0
+
+        # Observer hooks fired from the handlers (set up by run())
+        self._mem_hooks = ()
+        self._branch_hooks = ()
+        self._halt_hooks = ()
+
+        # Immediate post-dominators of the current program
+        self._ipdom = None
+        self._ipdom_program = None
+
+    def regfile_shape(self):
+        return self.sim.regfile.shape
+
+    def regfile_bytes(self) -> bytes:
+        """Raw float32 register file (for checkpoints)"""
+        return self.sim.regfile.tobytes()
+
+    def get_state(self):
+        """JSON-serializable launch state (for checkpoints)"""
+        def mask(m):
+            return None if m is None else np.flatnonzero(m).tolist()
+        return {
+            'pc': self.pc,
+            'stack': [[e.pc, e.rpc, mask(e.mask), e.branch_pc] for e in self.stack],
+            'done': mask(self.done),
+            'halted_threads': mask(self.halted_threads),
+            'launch_mask': mask(self.launch_mask),
+            'branch_stats': [[pc, b] for pc, b in self.branch_stats.items()],
+            'coalescing': [[pc, c] for pc, c in self.coalescing.items()],
+        }
+
+    def set_state(self, state, regs: bytes, exec_mask):
+        """Restore get_state() output, the raw register file and exec_mask"""
+        sim = self.sim
+        def mask(threads):
+            if threads is None:
+                return None
+            m = np.zeros(sim.num_threads, dtype=bool)
+            m[threads] = True
+            return m
+        sim.regfile = np.frombuffer(regs, dtype=np.float32).reshape(sim.num_threads, sim.num_regs, 4).copy()
+        sim.exec_mask = np.array(exec_mask, dtype=bool)
+        self.pc = state['pc']
+        self.stack = [StackEntry(pc, rpc, mask(m), branch_pc) for pc, rpc, m, branch_pc in state['stack']]
+        self.done = mask(state['done'])
+        self.halted_threads = mask(state['halted_threads'])
+        self.launch_mask = mask(state['launch_mask'])
+        self.branch_stats = {pc: b for pc, b in state['branch_stats']}
+        self.coalescing = {pc: c for pc, c in state['coalescing']}
+
+    def memory_words(self):
+        """FP32 view of simulator memory (no copy)"""
+        return np.frombuffer(self.sim.mem_f32, dtype=np.float32)
+
+    def addresses(self, mask, reg, offset):
+        """Lane 0 of reg in every thread of mask plus offset, as int64 byte
+        addresses (or jump targets)
+        
+        A NaN or infinite register raises ValueError, as int() does on the
+        scalar path; huge finite values are clamped and end up out of range.
+        """
+        values = self.sim.regfile[mask, reg, 0]
+        finite = np.isfinite(values)
+        if not finite.all():
+            thread = int(np.flatnonzero(mask)[~finite][0])
+            raise ValueError(f"Non-finite address in R{reg} of thread {thread} at PC={self.pc:04x}")
+        return np.clip(values, -ADDRESS_CLAMP, ADDRESS_CLAMP).astype(np.int64) + offset
+
+    def valid_lanes(self, words, addrs, inside=None):
+        """Word indices of each 4-lane access and which lanes take part
+        
+        A lane takes part if its word is in memory and its thread is in
+        inside (all threads if None). With strict_memory, an access that is
+        partly outside memory raises IndexError through the same check as
+        FluxSimulator.read_memory/write_memory; otherwise its missing lanes
+        are masked off explicitly, so they read 0.0 and drop their writes,
+        as on the scalar path.
+        """
+        idx = (addrs >> 2)[:, None] + LANES
+        valid = (addrs[:, None] >= 0) & (idx < len(words))
+        if self.sim.strict_memory:
+            faulting = ~valid.all(axis=1)
+            if inside is not None:
+                faulting &= inside
+            if faulting.any():
+                self.sim._check_bounds(int(addrs[faulting][0]))
+        if inside is not None:
+            valid &= inside[:, None]
+        return idx, valid
+
+    def gather(self, words, addrs, inside=None):
+        """Read 4× FP32 at each byte address; lanes that do not take part
+        (see valid_lanes) read 0.0"""
+        idx, valid = self.valid_lanes(words, addrs, inside)
+        values = np.zeros(idx.shape, dtype=np.float32)
+        values[valid] = words[idx[valid]]
+        return values
+
+    def scatter(self, words, addrs, values, inside=None):
+        """Write 4× FP32 at each byte address; lanes that do not take part
+        (see valid_lanes) are dropped"""
+        idx, valid = self.valid_lanes(words, addrs, inside)
+        words[idx[valid]] = values[valid]
+
+    def coalesce(self, d, addrs):
+        """Group one warp-wide access into SEGMENT_SIZE transactions and
+        count them against the instruction's PC"""
+        stats = self.coalescing.get(self.pc)
+        if stats is None:
+            stats = self.coalescing[self.pc] = {
+                'mnemonic': d.mnemonic, 'requests': 0, 'accesses': 0,
+                'transactions': 0, 'bytes_requested': 0,
+            }
+        # A 16-byte access can straddle two segments
+        segments = np.unique(np.concatenate((addrs >> SEGMENT_SHIFT, (addrs + 15) >> SEGMENT_SHIFT)))
+        stats['requests'] += 1
+        stats['accesses'] += len(addrs)
+        stats['transactions'] += len(segments)
+        stats['bytes_requested'] += 4 * len(np.unique((addrs >> 2)[:, None] + LANES))
+
+    def private_addresses(self, addrs, mask):
+        """Map per-thread addresses into each thread's private address space
+        
+        Returns:
+            (addresses, inside): inside is None if every access fits in its
+            thread's space, else a bool per access. Accesses outside it are
+            masked off (they read 0.0 and drop their writes), or raise
+            IndexError with strict_memory.
+        """
+        if self.address_base is None:
+            return addrs, None
+        inside = (addrs >= 0) & (addrs <= self.address_limit - 16)
+        if inside.all():
+            return addrs + self.address_base[mask], None
+        if self.sim.strict_memory:
+            bad = int(addrs[~inside][0])
+            raise IndexError(f"Memory access out of bounds: {bad:#x} "
+                             f"(+16 bytes, address space size {self.address_limit:#x})")
+        return addrs + self.address_base[mask], inside
+
+    def load(self, addrs, inside=None):
+        """Warp-wide LOAD for the given per-thread byte addresses (accesses
+        not in inside read 0.0, see private_addresses)"""
+        sim = self.sim
+        if np.any(addrs & 3):
+            # Unaligned: fall back to byte-addressed scalar reads
+            rows = [sim.read_memory(a) if inside is None or inside[i] else [0.0] * 4
+                    for i, a in enumerate(addrs.tolist())]
+            return np.array(rows, dtype=np.float32).reshape(-1, 4)
+        sim.stats['memory_reads'] += len(addrs)
+        if sim.cache is not None:
+            for a in (addrs if inside is None else addrs[inside]).tolist():
+                sim.cache.access(a, 16, False)
+        return self.gather(self.memory_words(), addrs, inside)
+
+    def store(self, addrs, values, inside=None):
+        """Warp-wide STORE of per-thread values (accesses not in inside are
+        dropped, see private_addresses)"""
+        sim = self.sim
+        if np.any(addrs & 3):
+            for i, a in enumerate(addrs.tolist()):
+                if inside is None or inside[i]:
+                    sim.write_memory(a, values[i].tolist())
+            return
+        sim.stats['memory_writes'] += len(addrs)
+        if sim.cache is not None:
+            for a in (addrs if inside is None else addrs[inside]).tolist():
+                sim.cache.access(a, 16, True)
+        self.scatter(self.memory_words(), addrs, values, inside)
+
+    # === Warp instruction handlers (one per mnemonic, see HANDLERS) ===
+    # Each returns the branch target, or None to fall through to PC+4.
+
+    def _write(self, d, mask, result):
+        if d.rd:
+            self.sim.regfile[mask, d.rd] = result
+
+    def _add(self, d, mask):
+        regs = self.sim.regfile
+        self._write(d, mask, regs[mask, d.rs1] + regs[mask, d.rs2])
+
+    def _sub(self, d, mask):
+        regs = self.sim.regfile
+        self._write(d, mask, regs[mask, d.rs1] - regs[mask, d.rs2])
+
+    def _mul(self, d, mask):
+        regs = self.sim.regfile
+        self._write(d, mask, regs[mask, d.rs1] * regs[mask, d.rs2])
+
+    def _div(self, d, mask):
+        regs = self.sim.regfile
+        a, b = regs[mask, d.rs1], regs[mask, d.rs2]
+        self._write(d, mask, np.divide(a, b, out=np.zeros_like(a), where=b != 0))
+
+    def _rzero(self, d, mask):
+        self._write(d, mask, 0.0)
+
+    def _addi(self, d, mask):
+        self._write(d, mask, self.sim.regfile[mask, d.rs1] + np.float32(d.imm_i))
+
+    def _load(self, d, mask):
+        addrs = self.addresses(mask, d.rs1, d.imm_i)
+        self.coalesce(d, addrs)
+        if self._mem_hooks:
+            threads = np.flatnonzero(mask)
+            for hook in self._mem_hooks:
+                hook(self.sim, threads, self.pc, addrs, 16, False)
+        self._write(d, mask, self.load(*self.private_addresses(addrs, mask)))
+
+    def _store(self, d, mask):
+        addrs = self.addresses(mask, d.rs1, d.imm_s)
+        self.coalesce(d, addrs)
+        if self._mem_hooks:
+            threads = np.flatnonzero(mask)
+            for hook in self._mem_hooks:
+                hook(self.sim, threads, self.pc, addrs, 16, True)
+        addrs, inside = self.private_addresses(addrs, mask)
+        self.store(addrs, self.sim.regfile[mask, d.rs2], inside)
+
+    def reconvergence_pc(self, pc):
+        """Immediate post-dominator of the branch at pc (EXIT_PC if none)"""
+        program = self.sim._program()
+        if self._ipdom_program is not program:
+            self._ipdom = immediate_postdominators(program)
+            self._ipdom_program = program
+        rpc_idx = self._ipdom[pc // 4]
+        return EXIT_PC if rpc_idx >= len(program) else rpc_idx * 4
+
+    def _branch(self, d, mask, taken):
+        if self._branch_hooks:
+            threads = np.flatnonzero(mask)
+            for hook in self._branch_hooks:
+                hook(self.sim, threads, self.pc, d, taken)
+
+        stats = self.branch_stats.get(self.pc)
+        if stats is None:
+            stats = self.branch_stats[self.pc] = {
+                'executed': 0, 'divergent': 0, 'serialized': 0,
+                'reconverge_pc': self.reconvergence_pc(self.pc),
+            }
+        stats['executed'] += 1
+
+        if taken.all():
+            return self.pc + d.imm_b
+        if not taken.any():
+            return None
+
+        # Divergent: the current entry resumes at the reconvergence point
+        # once both paths have run; the fall-through path runs first.
+        stats['divergent'] += 1
+        taken_mask = np.zeros_like(mask)
+        taken_mask[mask] = taken
+        rpc = stats['reconverge_pc']
+        self.stack[-1].pc = rpc
+        self.stack.append(StackEntry(self.pc + d.imm_b, rpc, taken_mask, self.pc))
+        self.stack.append(StackEntry(self.pc + 4, rpc, mask & ~taken_mask, self.pc))
+        return None
+
+    def _beq(self, d, mask):
+        regs = self.sim.regfile
+        return self._branch(d, mask, regs[mask, d.rs1, 0] == regs[mask, d.rs2, 0])
+
+    def _bne(self, d, mask):
+        regs = self.sim.regfile
+        return self._branch(d, mask, regs[mask, d.rs1, 0] != regs[mask, d.rs2, 0])
+
+    def _link(self, d, mask):
+        self._write(d, mask, np.float32(self.pc + 4))
+
+    def _jumped(self, d, mask):
+        """Report an unconditional jump to the branch hooks"""
+        threads = np.flatnonzero(mask)
+        taken = np.ones(len(threads), dtype=bool)
+        for hook in self._branch_hooks:
+            hook(self.sim, threads, self.pc, d, taken)
+
+    def _jal(self, d, mask):
+        self._link(d, mask)
+        if self._branch_hooks:
+            self._jumped(d, mask)
+        return self.pc + d.imm_j
+
+    def _jalr(self, d, mask):
+        targets = self.addresses(mask, d.rs1, d.imm_i)
+        if np.any(targets != targets[0]):
+            raise RuntimeError(f"Divergent JALR at PC={self.pc:04x}: warp mode requires a uniform target")
+        self._link(d, mask)
+        if self._branch_hooks:
+            self._jumped(d, mask)
+        return int(targets[0])
+
+    def _halt(self, d, mask):
+        if self._halt_hooks:
+            threads = np.flatnonzero(mask)
+            for hook in self._halt_hooks:
+                hook(self.sim, threads, self.pc)
+        self.halted_threads |= mask
+        self.finish(mask, self.pc + 4)
+
+    def finish(self, mask, pc):
+        """Retire threads in mask for the rest of the launch"""
+        self.done |= mask
+        for t in np.flatnonzero(mask):
+            self.sim.pc[t] = pc
+
+    def _unknown(self, d, mask):
+        return None
+
+    HANDLERS = {
+        'ADD': _add, 'SUB': _sub, 'MUL': _mul, 'DIV': _div,
+        'RZERO': _rzero,
+        'ADDI': _addi,
+        'LOAD': _load, 'STORE': _store,
+        'BEQ': _beq, 'BNE': _bne,
+        'JAL': _jal, 'JALR': _jalr,
+        'HALT': _halt, 'UNKNOWN': _unknown,
+    }
+
+    def launch(self):
+        """Start a new launch: one stack entry holding exec_mask at its PC"""
+        sim = self.sim
+        mask = np.asarray(sim.exec_mask, dtype=bool).copy()
+        active = np.flatnonzero(mask)
+        if len(active) == 0:
+            return
+        self.launch_mask = mask
+        self.done[:] = False
+        self.halted_threads[:] = False
+        self.stack = [StackEntry(sim.pc[active[0]], EXIT_PC, mask)]
+
+    def run(self, max_steps: int = 1000, verbose: bool = False) -> int:
+        """Run the warp in lockstep until every thread halts.
+
+        Divergent branches push both paths onto the SIMT stack; each path
+        runs under its own mask until it reaches the branch's immediate
+        post-dominator, where the paths reconverge. Returns warp steps
+        (instructions issued). The simulator's observers see each warp
+        instruction once, with the array of active threads.
+        """
+        sim = self.sim
+        if sim.halted:
+            return 0
+        if not self.stack:
+            self.launch()
+        sim.regfile[:, 0] = 0.0  # R0 reads as zero even after direct register file writes
+
+        program = sim._program()
+        handlers = self.HANDLERS
+        stack = self.stack
+
+        observers = sim.observers
+        if verbose:
+            observers = [TraceObserver()] + observers
+        fetch = hooks(observers, 'on_fetch')
+        retire = hooks(observers, 'on_retire')
+        self._mem_hooks = hooks(observers, 'on_mem_access')
+        self._branch_hooks = hooks(observers, 'on_branch')
+        self._halt_hooks = hooks(observers, 'on_halt')
+
+        steps = 0
+        executed = 0
+        while stack and steps < max_steps:
+            top = stack[-1]
+            mask = top.mask & ~self.done
+            if top.pc == top.rpc or not mask.any():
+                stack.pop()  # Reconverged (or every thread retired)
+                continue
+
+            pc_idx = top.pc // 4
+            if not 0 <= pc_idx < len(program):
+                self.finish(mask, top.pc)  # Ran off the program
+                stack.pop()
+                continue
+
+            self.pc = top.pc
+            sim.exec_mask = mask
+            d = program[pc_idx]
+
+            if top.branch_pc is not None:
+                self.branch_stats[top.branch_pc]['serialized'] += 1
+
+            if fetch or retire:
+                threads = np.flatnonzero(mask)
+                for hook in fetch:
+                    hook(sim, threads, self.pc, d)
+
+            target = handlers[d.mnemonic](self, d, mask)
+            next_pc = self.pc + 4 if target is None else target
+            stack[-1].pc = next_pc
+            for hook in retire:
+                hook(sim, threads, self.pc, d, next_pc)
+            steps += 1
+            sim.step += 1
+            if d.mnemonic != 'HALT':
+                executed += 1
+
+        # HALT retires but is not counted as an executed instruction
+        sim.stats['instructions_executed'] += executed
+
+        # Publish per-thread PCs of threads still in flight
+        for entry in stack:
+            for t in np.flatnonzero(entry.mask & ~self.done):
+                sim.pc[t] = entry.pc
+
+        if not stack:
+            sim.exec_mask = self.launch_mask
+            sim.halted = bool(self.halted_threads.any())
+        return steps
@@ -0,0 +1,28 @@
+"""
+Toolchain unit tests (run with: python -m pytest sw-toolchain/tests)
+
+The assembler, simulator and firmware driver are plain scripts that
+import their siblings by name, so their directories go on sys.path here.
+"""
+
+import os
+import sys
+
+import pytest
+
+TOOLCHAIN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(TOOLCHAIN, 'asm'), os.path.join(TOOLCHAIN, 'sim'),
+             os.path.join(TOOLCHAIN, '..', 'hw-tools', 'firmware')):
+    path = os.path.normpath(path)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from assembler import FluxAssembler  # noqa: E402 (needs the path above)
+
+
+@pytest.fixture
+def assemble():
+    """assemble(source) -> machine code words, with a fresh FluxAssembler"""
+    def assemble(source):
+        return FluxAssembler().assemble(source)
+    return assemble
@@ -0,0 +1,71 @@
+"""Memory access log: ring buffer, chunked .npy columns"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from accesslog import COLUMNS, AccessLog, load_access_log  # noqa: E402
+from simulator import FluxSimulator  # noqa: E402
+
+# Three LOADs and a STORE per iteration, 5 iterations: 20 accesses
+PROGRAM = """
+    LI R1, 5
+loop:
+    LOAD R2, 0(R3)
+    LOAD R4, 16(R3)
+    LOAD R5, 32(R3)
+    STORE R2, 48(R3)
+    ADDI R3, R3, 64
+    ADDI R1, R1, -1
+    BNE R1, R0, loop
+    HALT
+"""
+
+
+def expected_accesses():
+    rows = []
+    for i in range(5):
+        for offset, write in ((0, 0), (16, 0), (32, 0), (48, 1)):
+            rows.append((64 * i + offset, write))
+    return rows
+
+
+def run(assemble, log):
+    sim = FluxSimulator(num_threads=1)
+    sim.instructions = assemble(PROGRAM)
+    sim.add_observer(log)
+    sim.run(max_steps=1000)
+
+
+def test_columns_round_trip_across_ring_wraps(assemble, tmp_path):
+    with AccessLog(str(tmp_path), capacity=6) as log:
+        run(assemble, log)
+    assert log.total == log.flushed == 20
+
+    for mmap in (True, False):
+        columns = load_access_log(str(tmp_path), mmap=mmap)
+        assert sorted(columns) == sorted(COLUMNS)
+        assert list(zip(columns['addr'].tolist(), columns['write'].tolist())) == expected_accesses()
+        assert columns['pc'].tolist()[:4] == [4, 8, 12, 16]
+        assert (np.diff(columns['step'].astype(np.int64)) > 0).all()
+        assert set(columns['size'].tolist()) == {16}
+        assert set(columns['thread'].tolist()) == {0}
+
+
+def test_in_memory_ring_keeps_most_recent(assemble):
+    log = AccessLog(capacity=6)
+    run(assemble, log)
+    events = log.events()
+    assert log.wrapped and log.total == 20
+    assert list(zip(events['addr'].tolist(), events['write'].tolist())) == expected_accesses()[-6:]
+
+
+def test_warp_accesses_split_across_flushes(tmp_path):
+    with AccessLog(str(tmp_path), capacity=5) as log:
+        log.record_many(7, np.arange(8), 12, np.arange(8) * 16, 16, True)
+        log.record(8, 3, 16, -4, 16, False)
+    columns = load_access_log(str(tmp_path))
+    assert columns['thread'].tolist() == list(range(8)) + [3]
+    assert columns['addr'].tolist() == [16 * t for t in range(8)] + [-4]
+    assert columns['step'].tolist() == [7] * 8 + [8]
+    assert columns['write'].tolist() == [1] * 8 + [0]
@@ -0,0 +1,50 @@
+"""Assembly cache keys, hits and the firmware driver's use of the cache"""
+
+import os
+
+import assembler
+from assembler import FluxAssembler
+
+SOURCE = "LI R1, 5\nHALT"
+
+
+def cache_entries(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+def test_hit_returns_same_program(tmp_path):
+    first = FluxAssembler().assemble_cached(SOURCE, str(tmp_path))
+    assert FluxAssembler().assemble_cached(SOURCE, str(tmp_path)) == first
+    assert len(cache_entries(tmp_path)) == 1
+
+
+def test_assembler_change_misses_cache(tmp_path, monkeypatch):
+    FluxAssembler().assemble_cached(SOURCE, str(tmp_path))
+    before = cache_entries(tmp_path)
+    monkeypatch.setattr(assembler, '_source_digest', '0' * 64)
+    FluxAssembler().assemble_cached(SOURCE, str(tmp_path))
+    assert len(cache_entries(tmp_path)) == 2
+    assert before[0] in cache_entries(tmp_path)
+
+
+def test_hit_leaves_source_mapping_empty(tmp_path):
+    miss = FluxAssembler()
+    miss.assemble_cached("start:\n" + SOURCE, str(tmp_path))
+    assert miss.line_numbers == [2, 3]
+
+    hit = FluxAssembler()
+    hit.assemble_cached("start:\n" + SOURCE, str(tmp_path))
+    assert hit.labels == miss.labels == {'start': 0}
+    assert hit.instructions == hit.line_numbers == []
+
+
+def test_run_program_does_not_write_cache(tmp_path, monkeypatch):
+    from firmware_driver import run_program
+
+    monkeypatch.setenv('FLUX_ASM_CACHE', str(tmp_path / 'cache'))
+    program = tmp_path / 'kernel.s'
+    program.write_text(SOURCE)
+    run_program(str(program), show_output=False)
+    assert not (tmp_path / 'cache').exists()
+    run_program(str(program), show_output=False, cached=True)
+    assert len(cache_entries(tmp_path / 'cache')) == 1
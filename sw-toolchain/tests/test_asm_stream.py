@@ -0,0 +1,77 @@
+"""Streaming single-pass assembly with backpatching"""
+
+import os
+
+import pytest
+
+from assembler import FluxAssembler
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+# Forward and backward branches, a forward JAL, a label used before and
+# after its definition, labels in .data, and .entry
+BRANCHES = """
+.entry start
+.data 0x400
+table: .word 1, 2
+.text
+    JAL R5, start
+back:
+    ADDI R1, R1, -1
+    BNE R1, R0, back
+    BEQ R1, R0, end
+start:
+    LI R1, 3
+    BEQ R1, R0, end
+    JAL back
+end:
+    HALT
+"""
+
+
+class Recorder:
+    def __init__(self):
+        self.emitted = {}
+
+    def on_emit(self, addr, word, source):
+        self.emitted[addr] = word
+
+
+def both(source):
+    """(two-pass assembler, its words, streaming assembler, its words)"""
+    two_pass, stream = FluxAssembler(), FluxAssembler()
+    return two_pass, two_pass.assemble(source), stream, list(stream.assemble_stream(source.split('\n')))
+
+
+@pytest.mark.parametrize('name', sorted(os.listdir(EXAMPLES)))
+def test_examples_match_two_pass(name):
+    with open(os.path.join(EXAMPLES, name)) as f:
+        source = f.read()
+    _, words, _, streamed = both(source)
+    assert streamed == words
+
+    from_file = FluxAssembler().assemble_file(os.path.join(EXAMPLES, name))
+    assert list(from_file) == words
+
+
+def test_forward_branches_are_backpatched():
+    two_pass, words, stream, streamed = both(BRANCHES)
+    assert streamed == words
+    assert stream.labels == two_pass.labels == {'table': 0x400, 'back': 4, 'start': 16, 'end': 28}
+    assert stream.entry == two_pass.entry == 16
+    assert stream.data == two_pass.data
+    assert not stream.fixups
+
+
+def test_observers_see_every_final_word():
+    stream = FluxAssembler()
+    recorder = Recorder()
+    stream.add_observer(recorder)
+    words = list(stream.assemble_stream(BRANCHES.split('\n')))
+    # Placeholders are reported when patched, so each address ends with its final word
+    assert [recorder.emitted[4 * i] for i in range(len(words))] == words
+
+
+def test_undefined_label_is_reported():
+    with pytest.raises(ValueError, match='Undefined label: nowhere'):
+        FluxAssembler().assemble_stream(["BNE R1, R0, nowhere", "HALT"])
@@ -0,0 +1,90 @@
+"""Assembler expression operands, immediate ranges, labels and macro/.set error handling"""
+
+import pytest
+
+
+@pytest.mark.parametrize('operand', ['-0x10', '-16', '-(8+8)', '-2*8', 'NEG'])
+def test_negative_immediates(operand, assemble):
+    source = f".set NEG, -16\nADDI R1, R1, {operand}"
+    assert assemble(source) == assemble("ADDI R1, R1, -16")
+
+
+def test_expressions_and_constants(assemble):
+    source = ".set N, 4\n.equ BASE, 0x100\nADDI R1, R0, (N << 2) | 1\nLOAD R2, BASE + N*4(R1)"
+    assert assemble(source) == assemble("ADDI R1, R0, 17\nLOAD R2, 272(R1)")
+
+
+def test_macro_and_rept_expansion(assemble):
+    source = """
+.macro inc reg, n
+    ADDI \\reg, \\reg, \\n
+.endm
+.rept 2
+    inc R1, 3
+.endr
+HALT
+"""
+    assert assemble(source) == assemble("ADDI R1, R1, 3\nADDI R1, R1, 3\nHALT")
+
+
+def test_recursive_macro_raises_value_error(assemble):
+    source = "NOP\n.macro loop\n    loop\n.endm\nloop\nHALT"
+    with pytest.raises(ValueError, match=r"Line 5: .*nested deeper"):
+        assemble(source)
+
+
+def test_constant_with_label_name_is_rejected(assemble):
+    source = "start:\n    ADDI R1, R1, 1\n.set start, 8\n    BNE R1, R2, start\nHALT"
+    with pytest.raises(ValueError, match="conflicts with a label"):
+        assemble(source)
+
+
+def test_label_with_constant_name_is_rejected(assemble):
+    source = ".set start, 8\nstart:\n    ADDI R1, R1, 1\nHALT"
+    with pytest.raises(ValueError, match="conflicts with a .set/.equ constant"):
+        assemble(source)
+
+
+@pytest.mark.parametrize('expression, value', [
+    ('-7 / 2', -3), ('7 / -2', -3), ('-7 % 2', -1), ('7 % -2', 1), ('(0 - 8) / 4', -2), ('7 // 2', 3),
+])
+def test_division_truncates_toward_zero(expression, value, assemble):
+    assert assemble(f"ADDI R1, R0, {expression}") == assemble(f"ADDI R1, R0, {value}")
+
+
+@pytest.mark.parametrize('source', ["LI R1, 2048", "LI R1, 0x7FF + 1", ".set BIG, 4096\nLI R1, BIG",
+                                    "ADDI R1, R0, -2049", "LOAD R2, 1024 * 2(R1)"])
+@pytest.mark.parametrize('stream', [False, True])
+def test_immediate_out_of_range_is_rejected(source, stream):
+    from assembler import FluxAssembler
+
+    source = "NOP\n" + source
+    with pytest.raises(ValueError, match=r"Line \d+: Immediate -?\d+ out of range \[-2048, 2047\]"):
+        if stream:
+            FluxAssembler().assemble_stream(source.split('\n'))
+        else:
+            FluxAssembler().assemble(source)
+
+
+def test_immediate_range_limits(assemble):
+    assert assemble("LI R1, 2047\nLI R2, -2048") == assemble("LI R1, 0x7FF\nLI R2, 0x800")
+
+
+@pytest.mark.parametrize('source', [
+    "top:\n    NOP\ntop:\n    HALT",
+    ".rept 2\nagain:\n    BNE R1, R0, again\n.endr\nHALT",
+])
+def test_duplicate_label_is_rejected(source, assemble):
+    with pytest.raises(ValueError, match=r"Line \d+: Duplicate label"):
+        assemble(source)
+
+
+def test_macro_arguments_split_outside_parentheses(assemble):
+    source = """
+.macro pair a, b
+    ADDI R1, R0, \\a
+    ADDI R2, R0, \\b
+.endm
+    pair (1 + 2) * (3 + 4), (8 - 2)
+"""
+    assert assemble(source) == assemble("ADDI R1, R0, 21\nADDI R2, R0, 6")
@@ -0,0 +1,91 @@
+"""run_async and the driver's start_execution_async: yielding, progress, cancellation and resuming"""
+
+import asyncio
+
+from simulator import FluxSimulator
+
+COUNTDOWN = "LI R1, 500\nloop:\nADDI R2, R2, 3\nADDI R1, R1, -1\nBNE R1, R0, loop\nHALT"
+SPIN = "top:\nADDI R1, R1, 1\nJAL R0, top"
+
+
+def simulator(words):
+    sim = FluxSimulator(num_threads=1)
+    sim.instructions = words
+    return sim
+
+
+def test_same_result_as_run_with_progress(assemble):
+    words = assemble(COUNTDOWN)
+    reference = simulator(words)
+    reference.run(max_steps=10000)
+
+    sim = simulator(words)
+    progress = []
+    steps = asyncio.run(sim.run_async(max_steps=10000, yield_every=400,
+                                      progress=lambda s, n: progress.append(n)))
+
+    assert steps == 1 + 3 * 500 + 1
+    assert progress == [400, 800, 1200, steps]
+    assert sim.regfile == reference.regfile
+    assert sim.stats == reference.stats and sim.step == reference.step
+    assert sim.halted
+
+
+def test_other_tasks_run_between_chunks(assemble):
+    sim = simulator(assemble(COUNTDOWN))
+    order = []
+
+    async def ticker():
+        for _ in range(3):
+            order.append('tick')
+            await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(sim.run_async(max_steps=10000, yield_every=500,
+                                           progress=lambda s, n: order.append(n)), ticker())
+
+    asyncio.run(main())
+    # The ticker gets in after every chunk instead of waiting for the whole run
+    assert order[:4] == [500, 'tick', 1000, 'tick']
+
+
+def test_cancel_stops_between_instructions_and_resumes(assemble):
+    sim = simulator(assemble(SPIN))
+    progress = []
+
+    async def main():
+        task = asyncio.create_task(sim.run_async(max_steps=10 ** 9, yield_every=100,
+                                                 progress=lambda s, n: progress.append(n)))
+        while len(progress) < 3:
+            await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(main())
+    assert sim.step == progress[-1] and sim.step % 100 == 0
+    # One ADDI per two instructions, and the PC sits at a loop boundary
+    assert sim.read_reg(0, 1)[0] == sim.step // 2
+    assert not sim.halted
+
+    before = sim.step
+    sim.run(max_steps=10)
+    assert sim.step == before + 10
+    assert sim.read_reg(0, 1)[0] == sim.step // 2
+
+
+def test_driver_start_execution_async(assemble):
+    from firmware_driver import FluxGPU
+
+    gpu = FluxGPU()
+    gpu.instructions = assemble("LOAD R1, 0(R10)\nLOAD R2, 0(R11)\nADD R3, R1, R2\nSTORE R3, 0(R12)\nHALT")
+    for reg, addr in ((10, 0x100), (11, 0x200), (12, 0x300)):
+        gpu.set_register(0, reg, [addr, 0, 0, 0])
+    gpu.write_memory(0x100, [1.0, 2.0, 3.0, 4.0])
+    gpu.write_memory(0x200, [5.0, 6.0, 7.0, 8.0])
+    asyncio.run(gpu.start_execution_async(yield_every=2))
+    assert gpu.halted
+    assert gpu.read_memory(0x300, 4) == [6.0, 8.0, 10.0, 12.0]
@@ -0,0 +1,76 @@
+"""Parallel batch assembly: output naming and agreement with the single-file CLI"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import assembler
+from assembler import assemble_batch
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+# Forward branches and references, macros, .rept and .data
+DIRECTIVES = """
+.set N, 3
+.macro step reg, n
+    ADDI \\reg, \\reg, \\n
+.endm
+    JAL start
+    LI R10, 0x2000
+.data 0x2000
+table: .float 1.0, 2.0
+.text
+start:
+.rept N
+    step R1, N*2
+.endr
+    BNE R1, R0, done
+    NOP
+done:
+    HALT
+"""
+
+
+def write_sources(tmp_path):
+    paths = []
+    for name in ('a', 'b'):
+        (tmp_path / name).mkdir()
+        path = tmp_path / name / 'vecadd.s'
+        path.write_text(f"LI R1, {len(paths) + 1}\nHALT\n")
+        paths.append(str(path))
+    return paths
+
+
+def test_same_basename_into_out_dir_is_rejected(tmp_path):
+    sources = write_sources(tmp_path)
+    out = tmp_path / 'out'
+    with pytest.raises(ValueError, match='would both write'):
+        assemble_batch(sources, out_dir=str(out), workers=1)
+    assert not out.exists()
+
+
+def test_same_basename_next_to_sources(tmp_path):
+    sources = write_sources(tmp_path)
+    results = assemble_batch(sources, workers=1)
+    assert [error for *_, error in results] == [None, None]
+    assert (tmp_path / 'a' / 'vecadd.bin').read_bytes() != (tmp_path / 'b' / 'vecadd.bin').read_bytes()
+
+
+def test_batch_matches_single_file_cli(tmp_path):
+    sources = [os.path.join(EXAMPLES, name) for name in sorted(os.listdir(EXAMPLES))]
+    (tmp_path / 'directives.s').write_text(DIRECTIVES)
+    sources.append(str(tmp_path / 'directives.s'))
+
+    results = assemble_batch(sources, out_dir=str(tmp_path / 'batch'), image=True, workers=2)
+    assert [error for *_, error in results] == [None] * len(sources)
+
+    (tmp_path / 'cli').mkdir()
+    for path in sources:
+        base = str(tmp_path / 'cli' / os.path.basename(path)[:-2])
+        subprocess.run([sys.executable, assembler.__file__, path, base, '--image'],
+                       check=True, stdout=subprocess.DEVNULL)
+        for ext in ('bin', 'hex', 'img'):
+            batch = tmp_path / 'batch' / f"{os.path.basename(base)}.{ext}"
+            assert batch.read_bytes() == open(f"{base}.{ext}", 'rb').read(), f"{path} .{ext}"
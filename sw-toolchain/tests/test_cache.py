@@ -0,0 +1,53 @@
+"""Cache model statistics, eviction policies and latencies"""
+
+import pytest
+
+from assembler import FluxAssembler
+from cache import Cache, CacheHierarchy
+from simulator import FluxSimulator
+
+LINE = 128
+A, B, C = 0, 2 * LINE, 4 * LINE  # All map to set 0 of a 2-set cache
+
+
+def one_level(policy):
+    return CacheHierarchy([Cache('L1', 4 * LINE, LINE, assoc=2, policy=policy, latency=1)],
+                          memory_latency=10)
+
+
+def test_print_memory_does_not_touch_cache_stats(capsys):
+    sim = FluxSimulator(num_threads=1, cache=CacheHierarchy.default())
+    sim.instructions = FluxAssembler().assemble("LI R1, 0x1000\nLOAD R2, 0(R1)\nLOAD R3, 16(R1)\nHALT")
+    sim.run()
+    sim.print_memory(0x1000, count=16)
+    assert '0x1000' in capsys.readouterr().out
+    assert sim.cache.levels[0].stats['reads'] == 2
+
+
+@pytest.mark.parametrize('policy, hits, latencies', [
+    ('lru', 2, [11, 11, 1, 11, 1]),   # the hit on A keeps it, B is evicted
+    ('fifo', 1, [11, 11, 1, 11, 11]),  # A is oldest and evicted despite the hit
+])
+def test_lru_and_fifo_evict_differently(policy, hits, latencies):
+    cache = one_level(policy)
+    assert [cache.access(addr) for addr in (A, B, A, C, A)] == latencies
+    stats = cache.summary()['L1']
+    assert (stats['hits'], stats['misses']) == (hits, 5 - hits)
+    assert stats['evictions'] == stats['misses'] - 2  # the first two misses fill the set
+
+
+def test_dirty_victims_are_written_back():
+    cache = one_level('lru')
+    cache.access(A, write=True)
+    cache.access(B)
+    cache.access(C)  # evicts dirty A
+    cache.access(A)  # evicts clean B
+    assert cache.levels[0].stats['writebacks'] == 1
+    assert cache.memory_stats == {'reads': 4, 'writes': 1}
+
+
+def test_access_spanning_lines_takes_slowest():
+    cache = one_level('lru')
+    cache.access(LINE)
+    assert cache.access(LINE - 8, size=16) == 11  # second line hits, first misses
+    assert cache.levels[0].stats['reads'] == 3
@@ -0,0 +1,51 @@
+"""Checkpoint save/restore"""
+
+from assembler import FluxAssembler
+from simulator import FluxSimulator
+
+PROGRAM = """
+    LOAD R1, 0(R10)
+    ADD R2, R1, R1
+    STORE R2, 0(R12)
+    HALT
+"""
+
+
+def make_sim():
+    sim = FluxSimulator(num_threads=1, memory_size=1 << 16)
+    sim.instructions = FluxAssembler().assemble(PROGRAM)
+    sim.init_memory(0x1000, [1.0, 2.0, 3.0, 4.0])
+    sim.write_reg(0, 10, [0x1000, 0, 0, 0])
+    sim.write_reg(0, 12, [0x2000, 0, 0, 0])
+    return sim
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'a.ckpt')
+    sim = make_sim()
+    sim.run(max_steps=2)
+    sim.save_checkpoint(path)
+
+    restored = FluxSimulator(num_threads=1)
+    restored.load_checkpoint(path)
+    restored.run(max_steps=10)
+    sim.run(max_steps=10)
+    assert restored.halted and sim.halted
+    assert restored.read_memory(0x2000) == sim.read_memory(0x2000) == [2.0, 4.0, 6.0, 8.0]
+
+
+def test_save_to_the_file_it_was_loaded_from(tmp_path):
+    path = str(tmp_path / 'a.ckpt')
+    make_sim().save_checkpoint(path)
+
+    sim = FluxSimulator(num_threads=1)
+    sim.load_checkpoint(path)  # memory is mapped from path
+    sim.run(max_steps=10)
+    sim.save_checkpoint(path)
+    assert sim.read_memory(0x2000) == [2.0, 4.0, 6.0, 8.0]
+
+    again = FluxSimulator(num_threads=1)
+    again.load_checkpoint(path)
+    assert again.halted
+    assert again.read_memory(0x2000) == [2.0, 4.0, 6.0, 8.0]
+    assert list(tmp_path.iterdir()) == [tmp_path / 'a.ckpt']  # no temp file left
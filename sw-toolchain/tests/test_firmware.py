@@ -0,0 +1,61 @@
+"""Firmware driver program image loading"""
+
+import struct
+
+import pytest
+
+from assembler import FluxAssembler
+from firmware_driver import FluxGPU, WRITE_MEM_MAX
+from loopback import LoopbackPort
+
+
+class RecordingPort(LoopbackPort):
+    """LoopbackPort that also keeps every packet the driver sends"""
+
+    def __init__(self, memory_size=64 * 1024):
+        super().__init__(memory_size)
+        self.sent = []
+
+    def write(self, packet):
+        self.sent.append(bytes(packet))
+        super().write(packet)
+
+
+def image(data):
+    return FluxAssembler().assemble_to_image(f".data 0x1000\n{data}\n.text\nHALT")
+
+
+def write_mem_packets(port):
+    """(addr, count) of every WRITE_MEM packet sent"""
+    return [(int.from_bytes(p[2:6], 'little'), int.from_bytes(p[6:8], 'little'))
+            for p in port.sent if p[1] == 0x90]
+
+
+def test_large_segment_is_split_into_packets():
+    size = (WRITE_MEM_MAX + 10) * 4
+    port = RecordingPort(memory_size=0x1000 + size)
+    gpu = FluxGPU('uart', port=port)
+    gpu.load_image(image(f".space {size - 4}\n.float 2.5"))
+    assert write_mem_packets(port) == [(0x1000, WRITE_MEM_MAX), (0x1000 + WRITE_MEM_MAX * 4, 10)]
+    assert struct.unpack_from('<f', port.memory, 0x1000 + size - 4) == (2.5,)
+
+
+@pytest.mark.parametrize('interface', ['simulation', 'uart'])
+def test_partial_word_segment_is_rejected(interface):
+    gpu = FluxGPU(interface, port=LoopbackPort() if interface == 'uart' else None)
+    with pytest.raises(ValueError, match='not a multiple of 4'):
+        gpu.load_image(image(".space 6"))
+
+
+def test_segment_past_simulated_memory_is_rejected():
+    gpu = FluxGPU('simulation')
+    size = len(gpu.memory)
+    with pytest.raises(ValueError, match='does not fit'):
+        gpu.load_image(image(f".space {size}"))
+    assert len(gpu.memory) == size
+
+
+def test_segment_is_loaded_into_simulated_memory():
+    gpu = FluxGPU('simulation')
+    gpu.load_image(image(".float 1.5, 2.5"))
+    assert struct.unpack_from('<2f', gpu.memory, 0x1000) == (1.5, 2.5)
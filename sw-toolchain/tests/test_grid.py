@@ -0,0 +1,32 @@
+"""Grid launch over shared memory"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from grid import VECADD, launch_grid  # noqa: E402
+
+ELEMENTS = 4 * 8 * 6  # 6 warps of 8 threads, 4 floats per thread
+
+
+def vecadd(assemble, workers):
+    size = ELEMENTS * 4
+    a = np.arange(ELEMENTS, dtype=np.float32)
+    b = np.full(ELEMENTS, 0.5, dtype=np.float32)
+    result = launch_grid(assemble(VECADD), 6, memory=a.tobytes() + b.tobytes(), memory_size=3 * size,
+                         args={5: [16.0] * 4, 10: [0] * 4, 11: [size, 0, 0, 0], 12: [2 * size, 0, 0, 0]},
+                         tid_reg=1, warp_size=8, workers=workers)
+    return result, a + b
+
+
+def test_results_do_not_depend_on_worker_count(assemble):
+    single, expected = vecadd(assemble, 1)
+    parallel, _ = vecadd(assemble, 3)
+
+    assert np.array_equal(single.read_floats(2 * ELEMENTS * 4, ELEMENTS), expected)
+    assert single.memory == parallel.memory
+    assert single.stats == parallel.stats
+    assert single.stats['warps_halted'] == 6
+    assert single.stats['instructions_executed'] == 6 * 8
+    assert single.coalescing == parallel.coalescing
+    assert [c['requests'] for c in single.coalescing.values()] == [6, 6, 6]
@@ -0,0 +1,31 @@
+"""Program image loading in the simulator"""
+
+import pytest
+
+from assembler import FluxAssembler
+from simulator import FluxSimulator
+
+
+def image(data):
+    return FluxAssembler().assemble_to_image(f".data 0x100\n{data}\n.text\nstart: LI R1, 1\nHALT")
+
+
+def test_image_loads_text_data_and_symbols(capsys):
+    sim = FluxSimulator(num_threads=1)
+    symbols = sim.load_image_bytes(image(".float 1.5, 2.5"))
+    assert capsys.readouterr().out == ''
+    assert symbols['start'] == 0
+    assert sim.segments == [(0x100, 8)]
+    assert sim.read_memory(0x100)[:2] == [1.5, 2.5]
+    assert len(sim.instructions) == 2
+
+
+@pytest.mark.parametrize('data, error', [
+    (".space 6", 'not a multiple of 4'),
+    (".space 1024", 'does not fit'),
+])
+def test_bad_segment_is_rejected(data, error):
+    sim = FluxSimulator(num_threads=1, memory_size=1024)
+    with pytest.raises(ValueError, match=error):
+        sim.load_image_bytes(image(data))
+    assert len(sim.instructions) == 0
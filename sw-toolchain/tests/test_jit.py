@@ -0,0 +1,41 @@
+"""Block JIT cache invalidation"""
+
+import pytest
+
+from assembler import FluxAssembler
+from simulator import FluxSimulator
+
+
+@pytest.mark.parametrize('jit', [False, True])
+def test_reassigned_program_runs_new_code(jit, assemble):
+    sim = FluxSimulator(num_threads=1)
+    sim.instructions = assemble("LI R1, 5\nHALT")
+    sim.run(jit=jit)
+    assert sim.read_reg(0, 1)[0] == 5
+
+    sim.instructions = assemble("LI R1, 7\nHALT")
+    sim.pc[0] = 0
+    sim.halted = False
+    sim.run(jit=jit)
+    assert sim.read_reg(0, 1)[0] == 7
+
+
+def test_reloaded_image_runs_new_code():
+    sim = FluxSimulator(num_threads=1)
+    sim.load_image_bytes(FluxAssembler().assemble_to_image("LI R1, 5\nHALT"))
+    sim.run(jit=True)
+    sim.load_image_bytes(FluxAssembler().assemble_to_image("LI R1, 7\nHALT"))
+    sim.halted = False
+    sim.run(jit=True)
+    assert sim.read_reg(0, 1)[0] == 7
+
+
+def test_patched_instruction_runs_new_code(assemble):
+    sim = FluxSimulator(num_threads=1)
+    sim.instructions = assemble("LI R1, 5\nHALT")
+    sim.run(jit=True)
+    sim.instructions[0] = assemble("LI R1, 9")[0]
+    sim.pc[0] = 0
+    sim.halted = False
+    sim.run(jit=True)
+    assert sim.read_reg(0, 1)[0] == 9
@@ -0,0 +1,116 @@
+"""Observer hooks in the scalar and warp run loops"""
+
+import pytest
+
+from observer import Observer, hooks
+from simulator import FluxSimulator
+
+PROGRAM = """
+    LI R1, 32
+    LOAD R2, 0(R1)
+    STORE R2, 16(R1)
+    BEQ R1, R0, skip
+    BNE R1, R0, skip
+    NOP
+skip:
+    HALT
+"""
+
+
+class Recorder(Observer):
+    def __init__(self):
+        self.events = []
+
+    def on_fetch(self, sim, thread, pc, d):
+        self.events.append(('fetch', pc, d.mnemonic, sim.step))
+
+    def on_mem_access(self, sim, thread, pc, addr, size, write):
+        self.events.append(('mem', pc, addr, size, write))
+
+    def on_branch(self, sim, thread, pc, d, taken):
+        self.events.append(('branch', pc, taken))
+
+    def on_halt(self, sim, thread, pc):
+        self.events.append(('halt', pc))
+
+    def on_retire(self, sim, thread, pc, d, next_pc):
+        self.events.append(('retire', pc, next_pc))
+
+
+class HaltOnly(Observer):
+    def __init__(self):
+        self.halts = 0
+
+    def on_halt(self, sim, thread, pc):
+        self.halts += 1
+
+
+def simulator(words, num_threads=1, **kwargs):
+    sim = FluxSimulator(num_threads=num_threads, **kwargs)
+    sim.instructions = words
+    return sim
+
+
+def test_hooks_fire_in_order(assemble):
+    recorder = Recorder()
+    sim = simulator(assemble(PROGRAM))
+    sim.add_observer(recorder)
+    sim.run()
+
+    assert recorder.events == [
+        ('fetch', 0, 'ADDI', 0), ('retire', 0, 4),
+        ('fetch', 4, 'LOAD', 1), ('mem', 4, 32, 16, False), ('retire', 4, 8),
+        ('fetch', 8, 'STORE', 2), ('mem', 8, 48, 16, True), ('retire', 8, 12),
+        ('fetch', 12, 'BEQ', 3), ('branch', 12, False), ('retire', 12, 16),
+        ('fetch', 16, 'BNE', 4), ('branch', 16, True), ('retire', 16, 24),
+        ('fetch', 24, 'HALT', 5), ('halt', 24), ('retire', 24, 28),
+    ]
+
+
+@pytest.mark.parametrize('jit', [False, True])
+def test_observed_run_matches_plain_run(jit, assemble):
+    words = assemble(PROGRAM)
+    plain = simulator(words)
+    plain.run(jit=jit)
+    observed = simulator(words)
+    observed.add_observer(Recorder())
+    observed.run(jit=jit)
+
+    assert observed.regfile == plain.regfile
+    assert bytes(observed.memory) == bytes(plain.memory)
+    assert observed.stats == plain.stats
+    assert observed.step == plain.step == 6
+
+
+def test_only_overridden_hooks_are_called(assemble):
+    halt_only = HaltOnly()
+    assert hooks([halt_only, Recorder()], 'on_fetch') != [] and hooks([halt_only], 'on_fetch') == []
+
+    sim = simulator(assemble(PROGRAM))
+    sim.add_observer(halt_only)
+    sim.run()
+    assert halt_only.halts == 1
+
+    sim.remove_observer(halt_only)
+    sim.pc[0], sim.halted = 0, False
+    sim.run()
+    assert halt_only.halts == 1
+
+
+def test_warp_hooks_get_thread_arrays(assemble):
+    pytest.importorskip('numpy')
+    recorder = Recorder()
+    sim = simulator(assemble("LOAD R2, 0(R1)\nBNE R1, R0, skip\nNOP\nskip:\nHALT"), 4, warp_mode=True)
+    for t in range(4):
+        sim.write_reg(t, 1, [16.0 * (t % 2), 0, 0, 0])
+    sim.add_observer(recorder)
+    sim.run_warp()
+
+    mem = [e for e in recorder.events if e[0] == 'mem']
+    assert len(mem) == 1 and mem[0][2].tolist() == [0, 16, 0, 16]
+    branch = [e for e in recorder.events if e[0] == 'branch']
+    assert len(branch) == 1 and branch[0][2].tolist() == [False, True, False, True]
+    # NOP (an ADDI) runs for the two threads that fall through, HALT once after reconverging
+    fetched = [e[2] for e in recorder.events if e[0] == 'fetch']
+    assert fetched == ['LOAD', 'BNE', 'ADDI', 'HALT']
+    assert [e for e in recorder.events if e[0] == 'halt'] == [('halt', 12)]
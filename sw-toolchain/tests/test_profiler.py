@@ -0,0 +1,15 @@
+"""Profiler source attribution"""
+
+import sys
+
+from profiler import source_lines
+
+
+def test_source_lines_does_not_grow_sys_path(tmp_path):
+    source = tmp_path / 'prog.s'
+    source.write_text("# comment\nLI R1, 5\n\nHALT\n")
+    assert source_lines(str(source)) == {0: (2, 'LI R1, 5'), 1: (4, 'HALT')}
+    length = len(sys.path)
+    source_lines(str(source))
+    source_lines(str(source))
+    assert len(sys.path) == length
@@ -0,0 +1,30 @@
+"""R0 reads as zero no matter what was written to it"""
+
+import pytest
+
+from simulator import FluxSimulator
+
+PROGRAM = "ADD R1, R0, R0\nADDI R2, R0, 3\nADDI R0, R0, 7\nADD R3, R0, R0\nHALT"
+
+
+@pytest.mark.parametrize('jit', [False, True])
+def test_direct_write_to_r0_is_ignored(jit, assemble):
+    sim = FluxSimulator(num_threads=1)
+    sim.instructions = assemble(PROGRAM)
+    sim.write_reg(0, 0, [5.0] * 4)
+    sim.regfile[0][0] = [5.0] * 4  # As a driver sharing the register file would
+    sim.run(jit=jit)
+    assert sim.read_reg(0, 1) == [0.0] * 4
+    assert sim.read_reg(0, 2) == [3.0] * 4
+    assert sim.read_reg(0, 3) == [0.0] * 4
+    assert sim.regfile[0][0] == [0.0] * 4
+
+
+def test_batch_regs_cannot_set_r0(assemble):
+    pytest.importorskip('numpy')
+    from batch import run_batch
+
+    words = assemble("ADD R1, R0, R0\nSTORE R1, 0(R2)\nHALT")
+    out = run_batch(words, {0x100: [[1.0], [2.0]]}, output=(0x100, 1),
+                    regs={0: [9.0] * 4, 2: [0x100] * 4})
+    assert out.tolist() == [[0.0], [0.0]]
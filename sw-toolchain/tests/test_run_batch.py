@@ -0,0 +1,75 @@
+"""Batched launch: one program over many private input datasets"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from batch import run_batch  # noqa: E402
+from simulator import FluxSimulator  # noqa: E402
+
+# out = (a + b) * R5, twice more if a == b: instances take different paths
+KERNEL = """
+    LOAD R1, 0x100(R0)
+    LOAD R2, 0x110(R0)
+    ADD R3, R1, R2
+    MUL R3, R3, R5
+    BNE R1, R2, done
+    ADD R3, R3, R3
+    ADD R3, R3, R3
+done:
+    STORE R3, 0x200(R0)
+    HALT
+"""
+COUNT = 11
+
+
+def datasets():
+    rng = np.random.default_rng(3)
+    a = rng.integers(-8, 8, (COUNT, 4)).astype(np.float32)
+    b = rng.integers(-8, 8, (COUNT, 4)).astype(np.float32)
+    b[::3] = a[::3]  # every third instance takes the other path
+    scale = np.repeat(np.arange(1, COUNT + 1, dtype=np.float32)[:, None], 4, axis=1)
+    return a, b, scale
+
+
+def scalar_run(words, a, b, scale):
+    sim = FluxSimulator(num_threads=1)
+    sim.instructions = words
+    sim.init_memory(0x100, a.tolist())
+    sim.init_memory(0x110, b.tolist())
+    sim.write_reg(0, 5, scale.tolist())
+    sim.run(max_steps=1000)
+    return sim.read_memory(0x200)
+
+
+@pytest.mark.parametrize('batch_size', [COUNT, 4, 1])
+def test_matches_one_scalar_run_per_instance(batch_size, assemble):
+    words = assemble(KERNEL)
+    a, b, scale = datasets()
+    out = run_batch(words, {0x100: a, 0x110: b}, (0x200, 4), regs={5: scale}, batch_size=batch_size)
+
+    assert out.shape == (COUNT, 4)
+    for i in range(COUNT):
+        assert out[i].tolist() == scalar_run(words, a[i], b[i], scale[i]), f"instance {i}"
+
+
+def test_shared_registers_and_list_inputs(assemble):
+    out = run_batch(assemble(KERNEL), {0x100: [[1.0], [2.0]], 0x110: [[1.0], [5.0]]}, (0x200, 1),
+                    regs={5: [3.0, 3.0, 3.0, 3.0]})
+    assert out[:, 0].tolist() == [24.0, 21.0]
+
+
+def test_instance_that_does_not_halt_raises(assemble):
+    words = assemble("LOAD R1, 0(R0)\nloop:\nBNE R1, R0, loop\nHALT")
+    with pytest.raises(RuntimeError, match='of 2 instances in batch 0..1 did not halt within 50 steps'):
+        run_batch(words, {0: [[0.0], [1.0]]}, (0, 1), max_steps=50)
+
+
+@pytest.mark.parametrize('inputs, output, match', [
+    ({0: [[1.0]], 16: [[1.0], [2.0]]}, (0, 1), 'has 2 datasets, expected 1'),
+    ({2: [[1.0]]}, (0, 1), 'Input address must be 4-byte aligned'),
+    ({0: [[1.0]]}, (6, 1), 'Output address must be 4-byte aligned'),
+])
+def test_invalid_layout_is_rejected(inputs, output, match, assemble):
+    with pytest.raises(ValueError, match=match):
+        run_batch(assemble("HALT"), inputs, output)
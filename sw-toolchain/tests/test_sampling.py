@@ -0,0 +1,100 @@
+"""Sampled simulation: BBVs, phase clustering and the CPI estimate"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from cache import CacheHierarchy  # noqa: E402
+from cfg import find_blocks  # noqa: E402
+from sampling import choose_phases, collect_bbvs, kmeans, run_sampled  # noqa: E402
+from simulator import FluxSimulator  # noqa: E402
+from timing import PipelineTiming  # noqa: E402
+
+# Two phases: a register-only loop, then a loop that streams through memory
+PHASES = """
+    LI R1, 300
+alu:
+    ADD R2, R2, R3
+    MUL R4, R2, R2
+    ADDI R1, R1, -1
+    BNE R1, R0, alu
+    LI R1, 300
+    LI R5, 0x1000
+mem:
+    LOAD R6, 0(R5)
+    STORE R6, 0x800(R5)
+    ADDI R5, R5, 64
+    ADDI R1, R1, -1
+    BNE R1, R0, mem
+    HALT
+"""
+
+
+def simulator(words, cache=None):
+    sim = FluxSimulator(num_threads=1, cache=cache)
+    sim.instructions = words
+    return sim
+
+
+def test_bbvs_count_block_executions(assemble):
+    sim = simulator(assemble("LI R1, 10\nloop: ADDI R1, R1, -1\nBNE R1, R0, loop\nHALT"))
+    bbvs, lengths = collect_bbvs(sim, 0, 5, 1000)
+
+    assert sum(lengths) == sim.step == 22
+    assert lengths[:-1] == [5] * 4
+    assert bbvs.sum(axis=1).tolist() == lengths
+    loop = find_blocks(sim._program()).index((1, 3))
+    assert bbvs[:, loop].sum() == 20
+
+
+def test_kmeans_is_deterministic_and_finds_phases():
+    rng = np.random.default_rng(1)
+    points = np.concatenate((rng.normal(0, 0.01, (20, 3)) + [1, 0, 0],
+                             rng.normal(0, 0.01, (30, 3)) + [0, 1, 0]))
+    first, second = kmeans(points, 2), kmeans(points, 2)
+    assert np.array_equal(first[0], second[0]) and first[2] == second[2]
+
+    labels, representatives = choose_phases(points)
+    assert len(representatives) == 2
+    assert len(set(labels[:20])) == 1 and len(set(labels[20:])) == 1
+    assert labels[0] != labels[20]
+
+
+def test_estimate_matches_full_detailed_run(assemble):
+    words = assemble(PHASES)
+    full = simulator(words, CacheHierarchy.default())
+    model = PipelineTiming()
+    full.run(max_steps=10 ** 6, timing=model)
+
+    results = [run_sampled(simulator(words), interval=100, warmup=200, cache=CacheHierarchy.default)
+               for _ in range(2)]
+    assert results[0] == results[1]
+    result = results[0]
+    assert result['phases'] == 2
+    assert result['instructions'] == model.stats['instructions']
+    assert result['estimated_cycles'] == pytest.approx(model.stats['cycles'], rel=0.02)
+
+
+def test_callers_cache_is_not_touched(assemble):
+    own = CacheHierarchy.default()
+    sim = simulator(assemble(PHASES), own)
+    run_sampled(sim, interval=100, cache=CacheHierarchy.default)
+    assert sim.cache is own
+    assert all(level.stats['reads'] == level.stats['writes'] == 0 for level in own.levels)
+
+
+def test_callers_cache_is_restored_on_error(assemble):
+    models = []
+
+    def failing_timing():
+        # The second sample fails, after the first one swapped in its cache
+        if models:
+            raise RuntimeError("timing model failed")
+        models.append(PipelineTiming())
+        return models[0]
+
+    own = CacheHierarchy.default()
+    sim = simulator(assemble(PHASES), own)
+    with pytest.raises(RuntimeError):
+        run_sampled(sim, interval=100, timing=failing_timing, cache=CacheHierarchy.default)
+    assert sim.cache is own
@@ -0,0 +1,63 @@
+"""Pipeline timing model and its streamed JSON trace"""
+
+import json
+
+from simulator import FluxSimulator
+from timing import STAGES, PipelineTiming
+
+PROGRAM = """
+    LI R1, 3
+loop:
+    LOAD R2, 0(R0)
+    ADD R3, R2, R2
+    ADDI R1, R1, -1
+    BNE R1, R0, loop
+    HALT
+"""
+
+
+def run(words, timing):
+    sim = FluxSimulator(num_threads=1)
+    sim.instructions = words
+    sim.run(max_steps=1000, timing=timing)
+    return sim
+
+
+def test_trace_is_valid_json_in_cycle_order(assemble, tmp_path):
+    path = tmp_path / 'trace.json'
+    with PipelineTiming(trace=str(path)) as timing:
+        run(assemble(PROGRAM), timing)
+
+    records = json.loads(path.read_text())
+    cycles = [r['cycle'] for r in records]
+    assert cycles == sorted(cycles)
+    assert max(cycles) == timing.stats['cycles'] - 1
+    # Every executed instruction passes through every stage
+    fetched = [r for r in records if r['stage'] == 'FETCH' and not r.get('stall')]
+    assert len(fetched) == timing.stats['instructions'] == 1 + 4 * 3 + 1
+    assert {r['stage'] for r in records} == set(STAGES)
+    assert {r['instr'] for r in fetched} >= {'LOAD R2, 0(R0)', 'HALT'}
+
+
+def test_hazards_are_counted(assemble):
+    timing = PipelineTiming()
+    run(assemble(PROGRAM), timing)
+    # ADD waits for the LOAD, and the two taken BNEs wait to resolve
+    assert timing.stats['data_stall_cycles'] > 0
+    assert timing.stats['control_stall_cycles'] > 0
+
+    independent = PipelineTiming()
+    run(assemble("ADD R3, R1, R2\nADD R4, R1, R2\nADD R5, R1, R2\nHALT"), independent)
+    assert independent.stats['data_stall_cycles'] == independent.stats['control_stall_cycles'] == 0
+    # The first instruction takes one cycle per stage, the other three one more each
+    assert independent.stats['cycles'] == len(STAGES) + 3
+
+
+def test_close_is_idempotent_and_trace_object_stays_open(assemble, tmp_path):
+    with open(tmp_path / 'trace.json', 'w') as f:
+        timing = PipelineTiming(trace=f)
+        run(assemble("HALT"), timing)
+        timing.close()
+        timing.close()
+        assert not f.closed
+    assert json.loads((tmp_path / 'trace.json').read_text())
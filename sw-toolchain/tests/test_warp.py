@@ -0,0 +1,216 @@
+"""Warp engine: SIMT divergence, reconvergence and agreement with the scalar path"""
+
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from simulator import FluxSimulator  # noqa: E402
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+THREADS = 4
+
+
+def example(name):
+    with open(os.path.join(EXAMPLES, name)) as f:
+        return f.read()
+
+
+def per_thread_registers(**regs):
+    """Setup writing reg = fn(thread) for every thread"""
+    def setup(sim):
+        for t in range(sim.num_threads):
+            for reg, fn in regs.items():
+                sim.write_reg(t, int(reg[1:]), [fn(t), 0.0, 0.0, 0.0])
+    return setup
+
+
+def disjoint_buffers(sim):
+    """Per-thread A/B/C vectors in R10/R11/R12, 16 bytes apart"""
+    for t in range(sim.num_threads):
+        sim.init_memory(0x1000 + 16 * t, [t + 1.0, t + 2.0, t + 3.0, t + 4.0])
+        sim.init_memory(0x2000 + 16 * t, [10.0 * t, 20.0, -3.0, 0.5])
+        sim.write_reg(t, 10, [0x1000 + 16 * t, 0, 0, 0])
+        sim.write_reg(t, 11, [0x2000 + 16 * t, 0, 0, 0])
+        sim.write_reg(t, 12, [0x3000 + 16 * t, 0, 0, 0])
+
+
+def run_scalar(words, setup=None):
+    sim = FluxSimulator(num_threads=THREADS)
+    sim.instructions = words
+    if setup:
+        setup(sim)
+    for t in range(THREADS):
+        sim.halted = False
+        sim.run(thread=t, max_steps=10000)
+    return sim
+
+
+def run_warp(words, setup=None):
+    sim = FluxSimulator(num_threads=THREADS, warp_mode=True)
+    sim.instructions = words
+    if setup:
+        setup(sim)
+    sim.run_warp(max_steps=10000)
+    return sim
+
+
+def assert_same_results(scalar, warp):
+    assert np.array_equal(np.array(scalar.regfile, dtype=np.float32), warp.regfile)
+    assert scalar.mem_f32.tobytes() == warp.mem_f32.tobytes()
+    assert warp.halted
+
+
+@pytest.mark.parametrize('name', ['vecadd.s', 'dotprod.s', 'loop.s', 'conditional.s'])
+def test_examples_match_scalar(name, assemble):
+    words = assemble(example(name))
+    assert_same_results(run_scalar(words, disjoint_buffers), run_warp(words, disjoint_buffers))
+
+
+IF_ELSE = """
+    BEQ R5, R0, even
+    ADDI R2, R0, 1
+    JAL join
+even:
+    ADDI R2, R0, 2
+join:
+    ADDI R3, R2, 10
+    HALT
+"""
+
+
+def test_if_else_reconverges_at_ipdom(assemble):
+    words = assemble(IF_ELSE)
+    setup = per_thread_registers(R5=lambda t: t % 2)
+    sim = run_warp(words, setup)
+
+    assert sim.regfile[:, 2, 0].tolist() == [2, 1, 2, 1]
+    assert sim.regfile[:, 3, 0].tolist() == [12, 11, 12, 11]
+    stats = sim.warp.branch_stats[0]
+    assert stats['divergent'] == 1
+    assert stats['reconverge_pc'] == 4 * 4  # join
+    # BEQ, then ADDI+JAL and ADDI on the two paths, then join and HALT once
+    assert sim.step == 6
+    assert_same_results(run_scalar(words, setup), sim)
+
+
+LOOP = """
+loop:
+    ADDI R1, R1, 1
+    ADDI R5, R5, -1
+    BNE R5, R0, loop
+    ADDI R2, R1, 100
+    HALT
+"""
+
+
+def test_lanes_leave_loop_on_different_iterations(assemble):
+    words = assemble(LOOP)
+    setup = per_thread_registers(R5=lambda t: t + 1)
+    sim = run_warp(words, setup)
+
+    assert sim.regfile[:, 1, 0].tolist() == [1, 2, 3, 4]
+    assert sim.regfile[:, 2, 0].tolist() == [101, 102, 103, 104]
+    assert sim.warp.branch_stats[8]['divergent'] == 3
+    assert_same_results(run_scalar(words, setup), sim)
+
+
+def test_uniform_jalr_jumps(assemble):
+    words = assemble("LI R5, 12\nJALR R1, R5, 0\nLI R2, 1\nLI R3, 2\nHALT")
+    sim = run_warp(words)
+    assert sim.regfile[:, 2, 0].tolist() == [0] * THREADS
+    assert sim.regfile[:, 3, 0].tolist() == [2] * THREADS
+    assert sim.regfile[:, 1, 0].tolist() == [8] * THREADS
+    assert_same_results(run_scalar(words), sim)
+
+
+def test_divergent_jalr_raises(assemble):
+    words = assemble("JALR R1, R5, 0\nHALT\nHALT")
+    with pytest.raises(RuntimeError, match='Divergent JALR'):
+        run_warp(words, per_thread_registers(R5=lambda t: 4 + 4 * (t % 2)))
+
+
+MEMORY_SIZE = 4096
+
+
+@pytest.mark.parametrize('address', [MEMORY_SIZE - 8, MEMORY_SIZE - 6, -16])
+@pytest.mark.parametrize('warp', [False, True])
+def test_strict_memory_faults_in_both_engines(address, warp, assemble):
+    sim = FluxSimulator(num_threads=2, warp_mode=warp, memory_size=MEMORY_SIZE, strict_memory=True)
+    sim.instructions = assemble("LOAD R2, 0(R1)\nHALT")
+    for t in range(2):
+        sim.write_reg(t, 1, [address, 0, 0, 0])
+    with pytest.raises(IndexError, match='out of bounds'):
+        sim.run_warp() if warp else sim.run()
+
+
+def test_partly_outside_access_masks_lanes_like_scalar(assemble):
+    # Thread 0 is in range, thread 1 straddles the end of memory
+    words = assemble("LOAD R2, 0(R1)\nADDI R3, R0, 5\nSTORE R3, 16(R1)\nHALT")
+
+    def setup(sim):
+        sim.init_memory(MEMORY_SIZE - 32, [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0])
+        sim.write_reg(0, 1, [MEMORY_SIZE - 48, 0, 0, 0])
+        sim.write_reg(1, 1, [MEMORY_SIZE - 8, 0, 0, 0])
+
+    scalar = FluxSimulator(num_threads=2, memory_size=MEMORY_SIZE)
+    warp = FluxSimulator(num_threads=2, warp_mode=True, memory_size=MEMORY_SIZE)
+    for sim in (scalar, warp):
+        sim.instructions = words
+        setup(sim)
+    for t in range(2):
+        scalar.halted = False
+        scalar.run(thread=t)
+    warp.run_warp()
+
+    assert warp.regfile[1, 2].tolist() == [7.0, 8.0, 0.0, 0.0]
+    assert_same_results(scalar, warp)
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf')])
+def test_non_finite_address_raises(value, assemble):
+    sim = FluxSimulator(num_threads=2, warp_mode=True)
+    sim.instructions = assemble("LOAD R2, 0(R1)\nHALT")
+    sim.regfile[1, 1, 0] = value
+    with pytest.raises(ValueError, match='Non-finite address in R1 of thread 1'):
+        sim.run_warp()
+
+
+@pytest.mark.parametrize('strict', [False, True])
+def test_private_address_space_bounds(strict, assemble):
+    from batch import run_batch
+
+    # Instance 1 loads and stores past the end of its 64-byte space
+    words = assemble("LOAD R2, 0(R1)\nSTORE R2, 16(R0)\nSTORE R2, 48(R1)\nHALT")
+    inputs = {0: [[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0]]}
+    regs = {1: [[0, 0, 0, 0], [56, 0, 0, 0]]}
+    if strict:
+        with pytest.raises(IndexError, match='address space size 0x40'):
+            run_batch(words, inputs, (0, 12), regs=regs, address_space=64, strict_memory=True)
+        return
+    out = run_batch(words, inputs, (0, 16), regs=regs, address_space=64)
+    assert out[0].tolist() == [1, 2, 3, 4] * 2 + [0] * 4 + [1, 2, 3, 4]
+    assert out[1].tolist() == [5, 6, 7, 8] + [0] * 12
+
+
+@pytest.mark.parametrize('stride, transactions, bytes_requested', [
+    (16, 1, 64),     # contiguous: one 128-byte segment
+    (128, 4, 64),    # one segment per thread
+    (0, 1, 16),      # broadcast: every thread reads the same 16 bytes
+    (40, 2, 64),     # thread 3's access at 120 straddles into the next segment
+])
+def test_coalescing_counts_segments(stride, transactions, bytes_requested, assemble):
+    from warp import SEGMENT_SIZE, coalescing_summary
+
+    words = assemble("LOAD R2, 0(R1)\nSTORE R2, 1024(R1)\nHALT")
+    sim = run_warp(words, per_thread_registers(R1=lambda t: stride * t))
+    report = coalescing_summary(sim.warp.coalescing)
+
+    assert sorted(report) == [0, 4]
+    for pc, mnemonic in ((0, 'LOAD'), (4, 'STORE')):
+        c = report[pc]
+        assert c['mnemonic'] == mnemonic
+        assert (c['requests'], c['accesses']) == (1, THREADS)
+        assert (c['transactions'], c['bytes_requested']) == (transactions, bytes_requested)
+        assert c['efficiency'] == bytes_requested / (transactions * SEGMENT_SIZE)